@@ -0,0 +1,113 @@
+"""Бенчмарк рендерингу персоналізованих листів.
+
+Порівнює три способи для однієї розсилки (за замовчуванням 10 000 листів):
+
+* ``parse-per-send`` — новий Environment і розбір шаблону на кожен лист;
+* ``auto-reload`` — спільний Environment, але stat файлу на кожен get_template;
+* ``cached-batch`` — ``EmailTemplates.render_many`` (скомпільований шаблон на пачку).
+
+Запуск у контейнері бекенду (потрібні змінні оточення застосунку)::
+
+    python -m benchmarks.email_rendering --count 10000
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import argparse
+import tempfile
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from src.modules.notifications.email_templates import EmailTemplates
+
+BASE_TEMPLATE = """<!DOCTYPE html>
+<html><body>
+<h2>{% block title %}{% endblock %}</h2>
+{% block content %}{% endblock %}
+<p style="color:#888">{{ firm_name }} · {{ support_email }}</p>
+</body></html>
+"""
+
+DIGEST_TEMPLATE = """{% extends "base.html" %}
+{% block title %}Вітаємо, {{ user_name }}!{% endblock %}
+{% block content %}
+<p>Нових повідомлень: {{ items|length }}</p>
+<ul>
+{% for item in items %}
+  <li><b>{{ item.title }}</b> — {{ item.message|truncate(80) }}</li>
+{% endfor %}
+</ul>
+{% if overdue %}<p>Прострочених задач: {{ overdue }}</p>{% endif %}
+{% endblock %}
+"""
+
+TEMPLATE = "digest.html"
+SHARED = {"firm_name": "Адвокатське об'єднання", "support_email": "support@example.com"}
+
+def make_contexts(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "user_name": f"Користувач {i}",
+            "items": [
+                {"title": f"Задача #{i}-{n}", "message": "Термін виконання наближається, перевірте матеріали справи " * 2}
+                for n in range(5)
+            ],
+            "overdue": i % 3,
+        }
+        for i in range(count)
+    ]
+
+def _environment(directory: str, auto_reload: bool) -> Environment:
+    return Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=auto_reload,
+    )
+
+def parse_per_send(directory: str, contexts: List[Dict[str, Any]]) -> List[str]:
+    return [
+        _environment(directory, True).get_template(TEMPLATE).render({**SHARED, **context})
+        for context in contexts
+    ]
+
+def auto_reload(directory: str, contexts: List[Dict[str, Any]]) -> List[str]:
+    env = _environment(directory, True)
+    return [env.get_template(TEMPLATE).render({**SHARED, **context}) for context in contexts]
+
+def cached_batch(directory: str, contexts: List[Dict[str, Any]]) -> List[str]:
+    templates = EmailTemplates(directory, check_interval=2.0)
+    templates.precompile()
+    bodies: List[str] = []
+    for start in range(0, len(contexts), 500):
+        bodies.extend(templates.render_many(TEMPLATE, contexts[start:start + 500], SHARED))
+    return bodies
+
+def measure(name: str, func: Callable, directory: str, contexts: List[Dict[str, Any]]) -> float:
+    started = time.perf_counter()
+    bodies = func(directory, contexts)
+    elapsed = time.perf_counter() - started
+    assert len(bodies) == len(contexts)
+    print(f"{name:<16} {elapsed:8.3f} s {len(contexts) / elapsed:10.0f} emails/s")
+    return elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--skip-parse", action="store_true", help="без найповільнішого варіанту")
+    args = parser.parse_args()
+
+    contexts = make_contexts(args.count)
+    with tempfile.TemporaryDirectory() as directory:
+        Path(directory, "base.html").write_text(BASE_TEMPLATE, encoding="utf-8")
+        Path(directory, TEMPLATE).write_text(DIGEST_TEMPLATE, encoding="utf-8")
+        print(f"Rendering {args.count} personalized emails")
+        results = {}
+        if not args.skip_parse:
+            results["parse-per-send"] = measure("parse-per-send", parse_per_send, directory, contexts)
+        results["auto-reload"] = measure("auto-reload", auto_reload, directory, contexts)
+        results["cached-batch"] = measure("cached-batch", cached_batch, directory, contexts)
+        baseline = results.get("parse-per-send", results["auto-reload"])
+        print(f"speedup vs baseline: {baseline / results['cached-batch']:.1f}x")
+
+if __name__ == "__main__":
+    main()
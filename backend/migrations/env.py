@@ -19,6 +19,13 @@ fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Матеріалізовані представлення керуються вручну в міграціях"""
+    if type_ == "table" and object.info.get("is_view"):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Офлайн-міграції (без підключення до БД)"""
     url = config.get_main_option("sqlalchemy.url")
@@ -27,6 +34,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -51,6 +59,7 @@ def do_run_migrations(connection: AsyncConnection):
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,51 @@
+"""Range column with GiST indexes for calendar conflicts
+
+Revision ID: a2d4e6f8b013
+Revises: f18d3c6a9b47
+Create Date: 2026-10-19 16:42:10.418302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2d4e6f8b013'
+down_revision: Union[str, None] = 'f18d3c6a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # btree_gist потрібен для рівності по uuid/varchar у GiST-індексах
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.add_column('calendar_events', sa.Column('room', sa.String(length=100), nullable=True))
+    # Колонки часу без часового поясу, тому tsrange; генерується з start_time/end_time
+    op.execute("""
+        ALTER TABLE calendar_events
+        ADD COLUMN span tsrange
+        GENERATED ALWAYS AS (tsrange(start_time, end_time, '[)')) STORED
+    """)
+
+    op.execute("""
+        CREATE INDEX ix_calendar_events_creator_span
+        ON calendar_events USING gist (created_by_id, span)
+        WHERE status <> 'cancelled'
+    """)
+    # Одна переговорна не може бути заброньована на перетинні проміжки
+    op.execute("""
+        ALTER TABLE calendar_events
+        ADD CONSTRAINT ex_calendar_events_room_span
+        EXCLUDE USING gist (room WITH =, span WITH &&)
+        WHERE (room IS NOT NULL AND status <> 'cancelled')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE calendar_events DROP CONSTRAINT ex_calendar_events_room_span")
+    op.drop_index('ix_calendar_events_creator_span', table_name='calendar_events')
+    op.drop_column('calendar_events', 'span')
+    op.drop_column('calendar_events', 'room')
@@ -0,0 +1,41 @@
+"""Series columns for materialized recurring tasks
+
+Revision ID: a7c3e5f9d482
+Revises: f2c4e6a8b391
+Create Date: 2026-10-19 20:12:47.318405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f9d482'
+down_revision: Union[str, None] = 'f2c4e6a8b391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('tasks', 'recurrence_pattern', type_=sa.String(length=255), existing_type=sa.String(length=50))
+    op.add_column('tasks', sa.Column('materialized_until', sa.DateTime(), nullable=True))
+    op.add_column('tasks', sa.Column('series_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('tasks', sa.Column('occurrence_date', sa.Date(), nullable=True))
+    op.create_foreign_key(
+        'tasks_series_id_fkey', 'tasks', 'tasks', ['series_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_unique_constraint('uq_tasks_series_occurrence', 'tasks', ['series_id', 'occurrence_date'])
+    op.create_index('ix_tasks_recurring_series', 'tasks', ['id'], postgresql_where=sa.text('is_recurring'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_recurring_series', table_name='tasks')
+    op.drop_constraint('uq_tasks_series_occurrence', 'tasks', type_='unique')
+    op.drop_constraint('tasks_series_id_fkey', 'tasks', type_='foreignkey')
+    op.drop_column('tasks', 'occurrence_date')
+    op.drop_column('tasks', 'series_id')
+    op.drop_column('tasks', 'materialized_until')
+    op.alter_column('tasks', 'recurrence_pattern', type_=sa.String(length=50), existing_type=sa.String(length=255))
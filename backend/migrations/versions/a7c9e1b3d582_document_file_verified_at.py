@@ -0,0 +1,28 @@
+"""Verification timestamp for document checksums
+
+Revision ID: a7c9e1b3d582
+Revises: f5b7d9e1a368
+Create Date: 2026-10-19 23:48:12.305917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1b3d582'
+down_revision: Union[str, None] = 'f5b7d9e1a368'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('file_verified_at', sa.DateTime(), nullable=True))
+    # Файли, завантажені через API, вже мають порахований на льоту хеш
+    op.execute("UPDATE documents SET file_verified_at = now() WHERE file_sha256 IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'file_verified_at')
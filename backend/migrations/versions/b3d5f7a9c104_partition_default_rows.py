@@ -0,0 +1,94 @@
+"""Move DEFAULT partition rows when creating monthly partitions
+
+Revision ID: b3d5f7a9c104
+Revises: a7c9e1b3d582
+Create Date: 2026-10-20 10:14:37.520618
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d5f7a9c104'
+down_revision: Union[str, None] = 'a7c9e1b3d582'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Партицію не можна створити, поки в DEFAULT є рядки її діапазону: таблиця
+    # створюється окремо, рядки переносяться з DEFAULT, потім ATTACH.
+    # Місяць, відновлений з архіву (суфікс _restored), уже покритий.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent text, from_month date, months integer)
+        RETURNS integer AS $$
+        DECLARE
+            month_start date := date_trunc('month', from_month)::date;
+            month_end date;
+            partition_name text;
+            default_name text := parent || '_default';
+            key_column text;
+            created integer := 0;
+        BEGIN
+            SELECT a.attname INTO key_column
+            FROM pg_partitioned_table p
+            JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+            WHERE p.partrelid = parent::regclass;
+
+            FOR i IN 1..months LOOP
+                month_end := (month_start + interval '1 month')::date;
+                partition_name := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+                IF to_regclass(partition_name) IS NULL AND to_regclass(partition_name || '_restored') IS NULL THEN
+                    IF to_regclass(default_name) IS NULL THEN
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                            partition_name, parent, month_start, month_end
+                        );
+                    ELSE
+                        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', partition_name, parent);
+                        EXECUTE format(
+                            'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                            'INSERT INTO %I SELECT * FROM moved',
+                            default_name, key_column, month_start, key_column, month_end, partition_name
+                        );
+                        EXECUTE format(
+                            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                            parent, partition_name, month_start, month_end
+                        );
+                    END IF;
+                    created := created + 1;
+                END IF;
+                month_start := month_end;
+            END LOOP;
+            RETURN created;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent text, from_month date, months integer)
+        RETURNS integer AS $$
+        DECLARE
+            month_start date := date_trunc('month', from_month)::date;
+            partition_name text;
+            created integer := 0;
+        BEGIN
+            FOR i IN 1..months LOOP
+                partition_name := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+                IF to_regclass(partition_name) IS NULL THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, parent, month_start, (month_start + interval '1 month')::date
+                    );
+                    created := created + 1;
+                END IF;
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+            RETURN created;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
@@ -0,0 +1,52 @@
+"""Calendar recurrence exceptions and longer recurrence rules
+
+Revision ID: b5e7a9c1d324
+Revises: a2d4e6f8b013
+Create Date: 2026-10-19 17:20:33.905117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e7a9c1d324'
+down_revision: Union[str, None] = 'a2d4e6f8b013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # RRULE не вміщується в 50 символів
+    op.alter_column('calendar_events', 'recurrence_pattern',
+                    existing_type=sa.String(length=50),
+                    type_=sa.String(length=255))
+
+    op.create_table(
+        'calendar_event_exceptions',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('original_start', sa.DateTime(), nullable=False),
+        sa.Column('is_cancelled', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('location', sa.String(length=200), nullable=True),
+        sa.Column('room', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['calendar_events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'original_start', name='uq_calendar_event_exceptions_occurrence')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('calendar_event_exceptions')
+    op.alter_column('calendar_events', 'recurrence_pattern',
+                    existing_type=sa.String(length=255),
+                    type_=sa.String(length=50))
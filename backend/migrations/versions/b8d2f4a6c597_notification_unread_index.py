@@ -0,0 +1,35 @@
+"""Partial unread index for notifications
+
+Revision ID: b8d2f4a6c597
+Revises: a7c3e5f9d482
+Create Date: 2026-10-19 20:48:13.502219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a6c597'
+down_revision: Union[str, None] = 'a7c3e5f9d482'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Індекс на партиціонованій таблиці створюється для кожної партиції
+    op.create_index(
+        'ix_notifications_user_unread',
+        'notifications',
+        ['user_id', 'created_at', 'id'],
+        postgresql_where=sa.text('is_read IS false')
+    )
+    # Замінено частковим індексом вище
+    op.drop_index('ix_notifications_user_is_read', table_name='notifications')
+
+
+def downgrade() -> None:
+    op.create_index('ix_notifications_user_is_read', 'notifications', ['user_id', 'is_read'])
+    op.drop_index('ix_notifications_user_unread', table_name='notifications')
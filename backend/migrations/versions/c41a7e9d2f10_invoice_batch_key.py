@@ -0,0 +1,36 @@
+"""Invoice batch key for month-end invoicing
+
+Revision ID: c41a7e9d2f10
+Revises: b3ef88803054
+Create Date: 2026-10-19 09:12:04.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41a7e9d2f10'
+down_revision: Union[str, None] = 'b3ef88803054'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('batch_key', sa.String(length=64), nullable=True))
+    op.create_index('ix_invoices_batch_key', 'invoices', ['batch_key'], unique=True)
+    # Пошук невиставленого часу під час місячного білінгу
+    op.create_index(
+        'ix_time_entries_unbilled',
+        'time_entries',
+        ['case_id', 'start_time'],
+        postgresql_where=sa.text('billable AND NOT billed'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_time_entries_unbilled', table_name='time_entries')
+    op.drop_index('ix_invoices_batch_key', table_name='invoices')
+    op.drop_column('invoices', 'batch_key')
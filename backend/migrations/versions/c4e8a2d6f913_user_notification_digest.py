@@ -0,0 +1,29 @@
+"""Notification digest preference for users
+
+Revision ID: c4e8a2d6f913
+Revises: b8d2f4a6c597
+Create Date: 2026-10-19 21:36:52.104728
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f913'
+down_revision: Union[str, None] = 'b8d2f4a6c597'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('notification_digest', sa.String(length=10), nullable=False, server_default='immediate')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'notification_digest')
@@ -0,0 +1,28 @@
+"""Calendar feed token for users
+
+Revision ID: c8f1b3d5e746
+Revises: b5e7a9c1d324
+Create Date: 2026-10-19 18:02:47.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f1b3d5e746'
+down_revision: Union[str, None] = 'b5e7a9c1d324'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('calendar_feed_token', sa.String(length=80), nullable=True))
+    op.create_index('ix_users_calendar_feed_token', 'users', ['calendar_feed_token'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_calendar_feed_token', table_name='users')
+    op.drop_column('users', 'calendar_feed_token')
@@ -0,0 +1,25 @@
+"""Index hearings by date for conflict checks
+
+Revision ID: d3a6c8e0f159
+Revises: c8f1b3d5e746
+Create Date: 2026-10-19 18:47:12.660384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a6c8e0f159'
+down_revision: Union[str, None] = 'c8f1b3d5e746'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_hearings_hearing_date', 'hearings', ['hearing_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_hearings_hearing_date', table_name='hearings')
@@ -0,0 +1,63 @@
+"""Accounts-receivable aging materialized view
+
+Revision ID: d7b2f05e8a31
+Revises: c41a7e9d2f10
+Create Date: 2026-10-19 11:40:27.503918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b2f05e8a31'
+down_revision: Union[str, None] = 'c41a7e9d2f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Статуси зберігаються як імена членів InvoiceStatus
+    op.execute("""
+        CREATE MATERIALIZED VIEW ar_aging AS
+        SELECT
+            client_id,
+            COALESCE(SUM(balance_due) FILTER (WHERE days_overdue <= 0), 0) AS current_amount,
+            COALESCE(SUM(balance_due) FILTER (WHERE days_overdue BETWEEN 1 AND 30), 0) AS days_1_30,
+            COALESCE(SUM(balance_due) FILTER (WHERE days_overdue BETWEEN 31 AND 60), 0) AS days_31_60,
+            COALESCE(SUM(balance_due) FILTER (WHERE days_overdue BETWEEN 61 AND 90), 0) AS days_61_90,
+            COALESCE(SUM(balance_due) FILTER (WHERE days_overdue > 90), 0) AS days_over_90,
+            SUM(balance_due) AS total_due,
+            COUNT(*) AS invoice_count,
+            MIN(due_date) AS oldest_due_date,
+            now()::timestamp AS refreshed_at
+        FROM (
+            SELECT
+                client_id,
+                balance_due,
+                due_date,
+                COALESCE(current_date - due_date::date, 0) AS days_overdue
+            FROM invoices
+            WHERE status NOT IN ('DRAFT', 'PAID', 'CANCELLED')
+              AND balance_due > 0
+        ) open_invoices
+        GROUP BY client_id
+        WITH DATA
+    """)
+    # Унікальний індекс обов'язковий для REFRESH ... CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ux_ar_aging_client_id ON ar_aging (client_id)")
+    op.execute("CREATE INDEX ix_ar_aging_total_due ON ar_aging (total_due DESC)")
+    # Вибірка відкритих рахунків під час оновлення представлення
+    op.create_index(
+        'ix_invoices_open_balance',
+        'invoices',
+        ['client_id', 'due_date'],
+        postgresql_where=sa.text("balance_due > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoices_open_balance', table_name='invoices')
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS ar_aging")
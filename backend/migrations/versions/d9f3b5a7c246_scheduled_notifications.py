@@ -0,0 +1,52 @@
+"""Durable table for the scheduled notification queue
+
+Revision ID: d9f3b5a7c246
+Revises: c4e8a2d6f913
+Create Date: 2026-10-19 22:04:17.318640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3b5a7c246'
+down_revision: Union[str, None] = 'c4e8a2d6f913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Типи переліків уже створені для таблиці notifications
+    notification_type = postgresql.ENUM(name='notificationtype', create_type=False)
+    notification_priority = postgresql.ENUM(name='notificationpriority', create_type=False)
+    op.create_table(
+        'scheduled_notifications',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('type', notification_type, nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('priority', notification_priority, nullable=False),
+        sa.Column('related_entity_type', sa.String(length=50)),
+        sa.Column('related_entity_id', postgresql.UUID(as_uuid=True)),
+        sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+        sa.Column('dispatched_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_scheduled_notifications_user_id', 'scheduled_notifications', ['user_id'])
+    op.create_index(
+        'ix_scheduled_notifications_pending',
+        'scheduled_notifications',
+        ['scheduled_for'],
+        postgresql_where=sa.text('dispatched_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_notifications_pending', table_name='scheduled_notifications')
+    op.drop_index('ix_scheduled_notifications_user_id', table_name='scheduled_notifications')
+    op.drop_table('scheduled_notifications')
@@ -0,0 +1,32 @@
+"""Partial index for batched retention of read notifications
+
+Revision ID: e2a4c6b8d035
+Revises: d9f3b5a7c246
+Create Date: 2026-10-19 22:31:05.649182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a4c6b8d035'
+down_revision: Union[str, None] = 'd9f3b5a7c246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset-обхід старих прочитаних без сканування партицій
+    op.create_index(
+        'ix_notifications_read_created',
+        'notifications',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('is_read IS true')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_read_created', table_name='notifications')
@@ -0,0 +1,35 @@
+"""Indexes for bank statement reconciliation
+
+Revision ID: e5c09a4b7d62
+Revises: d7b2f05e8a31
+Create Date: 2026-10-19 13:05:51.270641
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c09a4b7d62'
+down_revision: Union[str, None] = 'd7b2f05e8a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Відсіювання вже імпортованих рядків виписки; унікальність — ключ ON CONFLICT
+    op.create_index(
+        'ix_payments_bank_reference',
+        'payments',
+        ['bank_reference'],
+        unique=True,
+        postgresql_where=sa.text('bank_reference IS NOT NULL'),
+    )
+    op.create_index('ix_payments_invoice_id', 'payments', ['invoice_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_invoice_id', table_name='payments')
+    op.drop_index('ix_payments_bank_reference', table_name='payments')
@@ -0,0 +1,27 @@
+"""Indexes for the task board
+
+Revision ID: e6b9d1f3a270
+Revises: d3a6c8e0f159
+Create Date: 2026-10-19 19:15:40.127733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b9d1f3a270'
+down_revision: Union[str, None] = 'd3a6c8e0f159'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_status_created', 'tasks', ['status', 'created_at', 'id'])
+    op.create_index('ix_tasks_assignee_status_created', 'tasks', ['assigned_to_id', 'status', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_assignee_status_created', table_name='tasks')
+    op.drop_index('ix_tasks_status_created', table_name='tasks')
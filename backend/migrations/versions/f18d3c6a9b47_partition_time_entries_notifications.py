@@ -0,0 +1,137 @@
+"""Monthly range partitioning for time_entries and notifications
+
+Revision ID: f18d3c6a9b47
+Revises: e5c09a4b7d62
+Create Date: 2026-10-19 14:22:10.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f18d3c6a9b47'
+down_revision: Union[str, None] = 'e5c09a4b7d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# таблиця -> колонка-ключ партиції
+PARTITIONED_TABLES = {
+    "time_entries": "start_time",
+    "notifications": "created_at",
+}
+MONTHS_AHEAD = 3
+# LIKE не копіює зовнішні ключі — відновлюються явно: таблиця -> [(колонка, ціль)]
+FOREIGN_KEYS = {
+    "time_entries": [("user_id", "users"), ("case_id", "cases"), ("task_id", "tasks")],
+    "notifications": [("user_id", "users")],
+}
+
+
+def _create_foreign_keys(table: str) -> None:
+    for column, target in FOREIGN_KEYS[table]:
+        op.create_foreign_key(f"{table}_{column}_fkey", table, target, [column], ["id"])
+
+
+def _partition_table(table: str, column: str) -> None:
+    legacy = f"{table}_legacy"
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"UPDATE {legacy} SET {column} = now() WHERE {column} IS NULL")
+    op.execute(f"""
+        CREATE TABLE {table} (
+            LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (id, {column})
+        ) PARTITION BY RANGE ({column})
+    """)
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    # Партиції від найстарішого рядка до MONTHS_AHEAD місяців уперед
+    op.execute(f"""
+        DO $$
+        DECLARE
+            first_month date := COALESCE(
+                (SELECT date_trunc('month', MIN({column}))::date FROM {legacy}),
+                date_trunc('month', now())::date
+            );
+        BEGIN
+            PERFORM ensure_monthly_partitions(
+                '{table}',
+                first_month,
+                ((date_part('year', age(date_trunc('month', now()), first_month)) * 12
+                  + date_part('month', age(date_trunc('month', now()), first_month)))::int)
+                + 1 + {MONTHS_AHEAD}
+            );
+        END $$;
+    """)
+    # Страховка для рядків поза створеними діапазонами
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    # CASCADE прибирає й FK invoice_items.time_entry_id -> time_entries.id: посилання
+    # на партиціоновану таблицю мусить включати ключ партиції, тому він не відновлюється
+    op.execute(f"DROP TABLE {legacy} CASCADE")
+    _create_foreign_keys(table)
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent text, from_month date, months integer)
+        RETURNS integer AS $$
+        DECLARE
+            month_start date := date_trunc('month', from_month)::date;
+            partition_name text;
+            created integer := 0;
+        BEGIN
+            FOR i IN 1..months LOOP
+                partition_name := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+                IF to_regclass(partition_name) IS NULL THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, parent, month_start, (month_start + interval '1 month')::date
+                    );
+                    created := created + 1;
+                END IF;
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+            RETURN created;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table, column in PARTITIONED_TABLES.items():
+        _partition_table(table, column)
+
+    # Партиціоновані індекси (створюються на кожній партиції)
+    op.create_index('ix_time_entries_user_start', 'time_entries', ['user_id', 'start_time'])
+    op.create_index('ix_time_entries_case_start', 'time_entries', ['case_id', 'start_time'])
+    op.create_index(
+        'ix_time_entries_unbilled',
+        'time_entries',
+        ['case_id', 'start_time'],
+        postgresql_where=sa.text('billable AND NOT billed'),
+    )
+    op.create_index('ix_notifications_user_created', 'notifications', ['user_id', 'created_at'])
+    op.create_index('ix_notifications_user_is_read', 'notifications', ['user_id', 'is_read'])
+    op.create_index('ix_invoice_items_time_entry_id', 'invoice_items', ['time_entry_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoice_items_time_entry_id', table_name='invoice_items')
+    for table, column in PARTITIONED_TABLES.items():
+        op.execute(f"CREATE TABLE {table}_flat (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {table}_flat SELECT * FROM {table}")
+        op.execute(f"DROP TABLE {table} CASCADE")
+        op.execute(f"ALTER TABLE {table}_flat RENAME TO {table}")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+        _create_foreign_keys(table)
+    op.create_index(
+        'ix_time_entries_unbilled',
+        'time_entries',
+        ['case_id', 'start_time'],
+        postgresql_where=sa.text('billable AND NOT billed'),
+    )
+    op.create_foreign_key(
+        'invoice_items_time_entry_id_fkey', 'invoice_items', 'time_entries',
+        ['time_entry_id'], ['id'],
+    )
+    op.execute("DROP FUNCTION IF EXISTS ensure_monthly_partitions(text, date, integer)")
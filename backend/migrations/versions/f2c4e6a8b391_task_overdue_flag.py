@@ -0,0 +1,38 @@
+"""Overdue flag and partial due_date index for tasks
+
+Revision ID: f2c4e6a8b391
+Revises: e6b9d1f3a270
+Create Date: 2026-10-19 19:41:05.883216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c4e6a8b391'
+down_revision: Union[str, None] = 'e6b9d1f3a270'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('is_overdue', sa.Boolean(), nullable=False, server_default=sa.false()))
+    # Enum зберігає імена членів
+    op.create_index(
+        'ix_tasks_open_due_date',
+        'tasks',
+        ['due_date'],
+        postgresql_where=sa.text("status NOT IN ('DONE', 'CANCELLED')")
+    )
+    op.execute("""
+        UPDATE tasks SET is_overdue = true
+        WHERE status NOT IN ('DONE', 'CANCELLED') AND due_date < now() AT TIME ZONE 'utc'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_open_due_date', table_name='tasks')
+    op.drop_column('tasks', 'is_overdue')
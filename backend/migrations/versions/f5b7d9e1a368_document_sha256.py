@@ -0,0 +1,26 @@
+"""SHA-256 of uploaded document files
+
+Revision ID: f5b7d9e1a368
+Revises: e2a4c6b8d035
+Create Date: 2026-10-19 23:02:44.871236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b7d9e1a368'
+down_revision: Union[str, None] = 'e2a4c6b8d035'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('file_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'file_sha256')
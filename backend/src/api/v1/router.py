@@ -9,6 +9,7 @@ from ...modules.documents.router import router as documents_router
 from ...modules.calendar.router import router as calendar_router
 from ...modules.tasks.router import router as tasks_router
 from ...modules.invoices.router import router as invoices_router
+from ...modules.payments.router import router as payments_router
 from ...modules.hearings.router import router as hearings_router
 from ...modules.time_tracking.router import router as time_tracking_router
 from ...modules.notifications.router import router as notifications_router
@@ -28,6 +29,7 @@ api_router.include_router(documents_router, prefix="/documents", tags=["Document
 api_router.include_router(calendar_router, prefix="/calendar", tags=["Calendar"])
 api_router.include_router(tasks_router, prefix="/tasks", tags=["Tasks"])
 api_router.include_router(invoices_router, prefix="/invoices", tags=["Invoices"])
+api_router.include_router(payments_router, prefix="/payments", tags=["Payments"])
 api_router.include_router(hearings_router, prefix="/hearings", tags=["Hearings"])
 api_router.include_router(time_tracking_router, prefix="/time-tracking", tags=["Time Tracking"])
 api_router.include_router(notifications_router, prefix="/notifications", tags=["Notifications"])
@@ -1,4 +1,6 @@
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init
 from src.core.config import settings
 
 # Створення екземпляра Celery
@@ -25,8 +27,76 @@ celery_app.conf.update(
     task_max_retries=3,
     worker_send_task_events=True,
     task_send_sent_event=True,
+    task_routes={
+        # Рендеринг має власний пул процесів — воркер черги запускається з --pool=threads
+        'src.celery.tasks.render_invoices': {'queue': 'rendering'},
+        # Пул SMTP-з'єднань живе у процесі воркера — окрема черга з невеликою конкурентністю
+        'src.celery.tasks.deliver_emails': {'queue': 'email'},
+    },
 )
 
+@worker_init.connect
+def precompile_email_templates(**kwargs):
+    """Компіляція email-шаблонів до форку дочірніх процесів воркера"""
+    from src.modules.notifications.email_templates import email_templates
+    email_templates.precompile()
+
+# Періодичні завдання (celery beat)
+celery_app.conf.beat_schedule = {
+    'refresh-ar-aging': {
+        'task': 'src.celery.tasks.refresh_ar_aging',
+        'schedule': float(settings.AR_AGING_REFRESH_INTERVAL),
+    },
+    'maintain-partitions': {
+        'task': 'src.celery.tasks.maintain_partitions',
+        'schedule': 86400.0,  # Щодня
+    },
+    'deliver-emails': {
+        'task': 'src.celery.tasks.deliver_emails',
+        'schedule': float(settings.EMAIL_DELIVERY_INTERVAL),
+    },
+    'dispatch-reminders': {
+        'task': 'src.celery.tasks.dispatch_reminders',
+        'schedule': float(settings.REMINDER_DISPATCH_INTERVAL),
+    },
+    'flush-notification-digests': {
+        'task': 'src.celery.tasks.flush_notification_digests',
+        'schedule': float(settings.NOTIFICATION_DIGEST_FLUSH_INTERVAL),
+    },
+    'dispatch-scheduled-notifications': {
+        'task': 'src.celery.tasks.dispatch_scheduled_notifications',
+        'schedule': float(settings.NOTIFICATION_SCHEDULE_DISPATCH_INTERVAL),
+    },
+    'reconcile-scheduled-notifications': {
+        'task': 'src.celery.tasks.reconcile_scheduled_notifications',
+        'schedule': float(settings.NOTIFICATION_SCHEDULE_RECONCILE_INTERVAL),
+    },
+    'reconcile-unread-counters': {
+        'task': 'src.celery.tasks.reconcile_unread_counters',
+        'schedule': float(settings.NOTIFICATION_UNREAD_RECONCILE_INTERVAL),
+    },
+    'scan-overdue-tasks': {
+        'task': 'src.celery.tasks.scan_overdue_tasks',
+        'schedule': float(settings.TASK_OVERDUE_SCAN_INTERVAL),
+    },
+    'materialize-recurring-tasks': {
+        'task': 'src.celery.tasks.materialize_recurring_tasks',
+        'schedule': crontab(hour=2, minute=15),
+    },
+    'purge-read-notifications': {
+        'task': 'src.celery.tasks.purge_read_notifications',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'reconcile-reminders': {
+        'task': 'src.celery.tasks.reconcile_reminders',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'sweep-upload-intents': {
+        'task': 'src.celery.tasks.sweep_upload_intents',
+        'schedule': crontab(minute=40),
+    },
+}
+
 # Автоматичне виявлення завдань
 celery_app.autodiscover_tasks([
     'src.celery.tasks',
@@ -1,25 +1,82 @@
-from celery import Celery
+from celery import Celery, group
 from src.core.config import settings
+from src.core.database import db_manager
+from src.core.exceptions import DatabaseException, ExternalServiceException
+import asyncio
 import logging
 from datetime import datetime, timedelta
+from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
 # Імпорт завдань з celery_app
 from .celery_app import celery_app
 
+async def _run_with_cleanup(coro):
+    from src.core.redis import close_redis
+    try:
+        return await coro
+    finally:
+        # Клієнт Redis прив'язаний до event loop, який asyncio.run закриє
+        await close_redis()
+
+def run_async(coro):
+    """Виконати корутину в синхронному Celery-завданні"""
+    if not db_manager.is_initialized:
+        db_manager.init_db(str(settings.DATABASE_URL))
+    return asyncio.run(_run_with_cleanup(coro))
+
 @celery_app.task(bind=True, max_retries=3)
 def send_email(self, to_email: str, subject: str, template_name: str, context: dict):
-    """Завдання для відправки email"""
+    """Рендеринг листа і постановка в чергу доставки (див. deliver_emails)"""
+    from src.core.redis import get_sync_redis
+    from src.modules.notifications.mailer import OutgoingEmail, enqueue_emails_sync, render_template
     try:
-        # Тут буде логіка відправки email
-        logger.info(f"Sending email to {to_email}: {subject}")
-        # Імітація відправки
-        return f"Email sent to {to_email}"
+        html = render_template(template_name, context)
+        enqueue_emails_sync(get_sync_redis(), [OutgoingEmail(to_email=to_email, subject=subject, html=html)])
+        return f"Email queued for {to_email}"
     except Exception as exc:
-        logger.error(f"Failed to send email to {to_email}: {exc}")
+        logger.error(f"Failed to queue email to {to_email}: {exc}")
         raise self.retry(exc=exc, countdown=60)
 
+@celery_app.task(bind=True, max_retries=3)
+def send_bulk_email(self, template_name: str, subject: str, recipients: list, shared_context: dict = None, offset: int = 0):
+    """Масова розсилка: рендеринг пачками одним скомпільованим шаблоном.
+
+    recipients — [{"to_email": ..., "context": {...}}], shared_context — спільні змінні.
+    Повтор продовжує з першої непоставленої пачки (offset), а не з початку.
+    """
+    from src.core.redis import get_sync_redis
+    from src.modules.notifications.mailer import enqueue_emails_sync, render_emails
+    start = offset
+    try:
+        while start < len(recipients):
+            end = start + settings.EMAIL_RENDER_BATCH_SIZE
+            emails = render_emails(template_name, subject, recipients[start:end], shared_context)
+            enqueue_emails_sync(get_sync_redis(), emails)
+            start = end
+        return f"{len(recipients) - offset} emails queued"
+    except Exception as exc:
+        logger.error(f"Failed to queue bulk email {template_name}: {exc}")
+        raise self.retry(
+            exc=exc,
+            countdown=60,
+            args=(template_name, subject, recipients, shared_context, start)
+        )
+
+@celery_app.task
+def deliver_emails():
+    """Розсилка черги email через пул SMTP-з'єднань процесу"""
+    from src.modules.notifications.mailer import deliver_queued_emails
+    try:
+        result = deliver_queued_emails()
+        if result.get("taken"):
+            logger.info(f"Email delivery: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Email delivery failed: {exc}")
+        return "Email delivery failed"
+
 @celery_app.task
 def cleanup_old_sessions():
     """Завдання для очищення старих сесій"""
@@ -63,4 +120,314 @@ def process_document_analysis(document_id: int):
         return f"Document {document_id} analysis completed"
     except Exception as exc:
         logger.error(f"Document analysis failed: {exc}")
-        return "Analysis failed"
\ No newline at end of file
+        return "Analysis failed"
+
+# -----------------------------
+# Пакетне виставлення рахунків
+# -----------------------------
+async def _get_unbilled_clients(period: str):
+    from src.modules.invoices.service import InvoiceService
+    async with db_manager.get_async_db() as db:
+        return await InvoiceService(db).get_clients_with_unbilled_time(period)
+
+async def _invoice_client(client_id: str, period: str, due_days: int):
+    from src.modules.invoices.service import InvoiceService
+    async with db_manager.get_async_db() as db:
+        return await InvoiceService(db).create_from_time_entries(UUID(client_id), period, due_days)
+
+@celery_app.task
+def generate_month_end_invoices(period: str, due_days: int = settings.BILLING_DUE_DAYS):
+    """Місячне виставлення рахунків: окреме завдання на кожного клієнта.
+
+    Не chunks: там усі клієнти чанку виконуються в одному завданні, і retry
+    одного з них обриває решту.
+    """
+    client_ids = run_async(_get_unbilled_clients(period))
+    if not client_ids:
+        logger.info(f"No unbilled time for period {period}")
+        return {"period": period, "clients": 0}
+    
+    job = group(
+        invoice_client_time.s(str(client_id), period, due_days) for client_id in client_ids
+    )
+    result = job.apply_async()
+    logger.info(f"Month-end invoicing for {period}: {len(client_ids)} clients queued")
+    return {"period": period, "clients": len(client_ids), "group_id": result.id}
+
+@celery_app.task(bind=True, max_retries=3)
+def invoice_client_time(self, client_id: str, period: str, due_days: int):
+    """Рахунок одного клієнта за період; безпечний для повторного виконання"""
+    try:
+        invoice_id = run_async(_invoice_client(client_id, period, due_days))
+        return str(invoice_id) if invoice_id else None
+    except DatabaseException as exc:
+        logger.error(f"Failed to invoice client {client_id} for {period}: {exc.detail}")
+        raise self.retry(exc=exc, countdown=60)
+
+# -----------------------------
+# Рендеринг PDF рахунків
+# -----------------------------
+async def _get_render_contexts(invoice_ids, period):
+    from src.modules.invoices.service import InvoiceService
+    from src.modules.invoices.rendering import build_invoice_context
+    async with db_manager.get_async_db() as db:
+        invoices = await InvoiceService(db).get_for_render(
+            [UUID(i) for i in invoice_ids] if invoice_ids else None, period
+        )
+        return [build_invoice_context(invoice) for invoice in invoices]
+
+@celery_app.task(bind=True, max_retries=3)
+def render_invoices(self, invoice_ids: list = None, period: str = None):
+    """Рендер PDF рахунків у пулі процесів; вже збережені PDF пропускаються"""
+    from src.modules.invoices.rendering import render_and_store
+    try:
+        contexts = run_async(_get_render_contexts(invoice_ids, period))
+        return render_and_store(contexts)
+    except Exception as exc:
+        logger.error(f"Invoice rendering failed: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+
+# -----------------------------
+# Дебіторська заборгованість
+# -----------------------------
+async def _refresh_ar_aging():
+    from src.modules.invoices.service import InvoiceService
+    async with db_manager.get_async_db() as db:
+        await InvoiceService(db).refresh_ar_aging()
+
+@celery_app.task
+def refresh_ar_aging():
+    """REFRESH MATERIALIZED VIEW CONCURRENTLY ar_aging (за розкладом і після платежів)"""
+    try:
+        run_async(_refresh_ar_aging())
+        return "AR aging refreshed"
+    except Exception as exc:
+        logger.error(f"AR aging refresh failed: {exc}")
+        return "AR aging refresh failed"
+
+# -----------------------------
+# Партиції та архівування
+# -----------------------------
+async def _maintain_partitions():
+    from src.core.partitioning import PartitionManager
+    retention = {
+        "time_entries": settings.TIME_ENTRIES_RETENTION_MONTHS,
+        "notifications": settings.NOTIFICATIONS_RETENTION_MONTHS,
+    }
+    async with db_manager.get_async_db() as db:
+        manager = PartitionManager(db)
+        created = await manager.ensure_future_partitions()
+        archived = {
+            table: await manager.archive_expired(table, months)
+            for table, months in retention.items()
+        }
+        return {"created": created, "archived": archived}
+
+async def _restore_partition(table: str, month: str):
+    from src.core.partitioning import PartitionManager
+    async with db_manager.get_async_db() as db:
+        return await PartitionManager(db).restore_partition(
+            table, datetime.strptime(month, "%Y-%m").date()
+        )
+
+@celery_app.task
+def maintain_partitions():
+    """Щоденно: партиції наперед + архівування старих у MinIO"""
+    try:
+        result = run_async(_maintain_partitions())
+        logger.info(f"Partition maintenance: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Partition maintenance failed: {exc}")
+        return "Partition maintenance failed"
+
+@celery_app.task
+def restore_partition(table: str, month: str):
+    """Відновлення архівованої партиції (month — YYYY-MM)"""
+    return run_async(_restore_partition(table, month))
+
+# -----------------------------
+# Нагадування
+# -----------------------------
+async def _dispatch_reminders():
+    from src.modules.notifications.reminders import ReminderDispatcher
+    async with db_manager.get_async_db() as db:
+        return await ReminderDispatcher(db).dispatch()
+
+async def _reconcile_reminders():
+    from src.modules.notifications.reminders import ReminderDispatcher
+    async with db_manager.get_async_db() as db:
+        return await ReminderDispatcher(db).reconcile()
+
+@celery_app.task
+def dispatch_reminders():
+    """Щохвилини: прострочені нагадування з Redis -> сповіщення"""
+    try:
+        result = run_async(_dispatch_reminders())
+        if result["sent"] or result["requeued"]:
+            logger.info(f"Reminders dispatched: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Reminder dispatch failed: {exc}")
+        return "Reminder dispatch failed"
+
+@celery_app.task
+def reconcile_reminders():
+    """Щоночі: звірка черги нагадувань з БД"""
+    try:
+        return run_async(_reconcile_reminders())
+    except Exception as exc:
+        logger.error(f"Reminder reconciliation failed: {exc}")
+        return "Reminder reconciliation failed"
+
+async def _flush_notification_digests():
+    from src.modules.notifications.delivery import flush_digests
+    async with db_manager.get_async_db() as db:
+        return await flush_digests(db)
+
+@celery_app.task
+def flush_notification_digests():
+    """Запис дайджестів груп повідомлень, вікно яких закінчилось"""
+    try:
+        result = run_async(_flush_notification_digests())
+        if result["groups"]:
+            logger.info(f"Notification digests flushed: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Notification digest flush failed: {exc}")
+        return "Notification digest flush failed"
+
+async def _dispatch_scheduled_notifications():
+    from src.modules.notifications.scheduled import ScheduledNotificationDispatcher
+    async with db_manager.get_async_db() as db:
+        return await ScheduledNotificationDispatcher(db).dispatch()
+
+async def _reconcile_scheduled_notifications():
+    from src.modules.notifications.scheduled import ScheduledNotificationDispatcher
+    async with db_manager.get_async_db() as db:
+        return await ScheduledNotificationDispatcher(db).reconcile()
+
+@celery_app.task
+def dispatch_scheduled_notifications():
+    """Видача відкладених повідомлень, строк яких настав"""
+    try:
+        result = run_async(_dispatch_scheduled_notifications())
+        if result["sent"] or result["requeued"]:
+            logger.info(f"Scheduled notifications dispatched: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Scheduled notification dispatch failed: {exc}")
+        return "Scheduled notification dispatch failed"
+
+@celery_app.task
+def reconcile_scheduled_notifications():
+    """Звірка черги відкладених повідомлень з БД"""
+    try:
+        return run_async(_reconcile_scheduled_notifications())
+    except Exception as exc:
+        logger.error(f"Scheduled notification reconciliation failed: {exc}")
+        return "Scheduled notification reconciliation failed"
+
+async def _purge_read_notifications():
+    from src.modules.notifications.retention import NotificationRetention
+    async with db_manager.get_async_db() as db:
+        return await NotificationRetention(db).run()
+
+@celery_app.task
+def purge_read_notifications():
+    """Щоночі: пакетне видалення старих прочитаних повідомлень з архівом у MinIO"""
+    try:
+        return run_async(_purge_read_notifications())
+    except Exception as exc:
+        logger.error(f"Notification retention failed: {exc}")
+        return "Notification retention failed"
+
+async def _reconcile_unread_counters():
+    from src.modules.notifications.counters import reconcile_unread
+    async with db_manager.get_async_db() as db:
+        return await reconcile_unread(db)
+
+@celery_app.task
+def reconcile_unread_counters():
+    """Звірка лічильників непрочитаних повідомлень у Redis з БД"""
+    try:
+        result = run_async(_reconcile_unread_counters())
+        if result["repaired"]:
+            logger.warning(f"Unread counters drifted: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Unread counter reconciliation failed: {exc}")
+        return "Unread counter reconciliation failed"
+
+# -----------------------------
+# Документи
+# -----------------------------
+async def _verify_document_checksum(document_id: str):
+    from src.modules.documents.service import DocumentService
+    async with db_manager.get_async_db() as db:
+        return await DocumentService(db).verify_checksum(UUID(document_id))
+
+@celery_app.task(bind=True, max_retries=3)
+def verify_document_checksum(self, document_id: str):
+    """SHA-256 файлу, завантаженого напряму в MinIO, проти заявленого клієнтом"""
+    try:
+        verified = run_async(_verify_document_checksum(document_id))
+        if verified is False:
+            logger.warning(f"Document {document_id} rejected: checksum mismatch")
+        return verified
+    except (DatabaseException, ExternalServiceException) as exc:
+        logger.error(f"Failed to verify document {document_id}: {exc.detail}")
+        raise self.retry(exc=exc, countdown=300)
+
+async def _sweep_upload_intents():
+    from src.modules.documents.uploads import sweep_expired
+    return await sweep_expired()
+
+@celery_app.task
+def sweep_upload_intents():
+    """Скасування прострочених прямих завантажень і видалення їхніх даних з MinIO"""
+    try:
+        result = run_async(_sweep_upload_intents())
+        if result["expired"]:
+            logger.info(f"Upload intents swept: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Upload intent sweep failed: {exc}")
+        return "Upload intent sweep failed"
+
+# -----------------------------
+# Задачі
+# -----------------------------
+async def _scan_overdue_tasks():
+    from src.modules.tasks.service import TaskService
+    async with db_manager.get_async_db() as db:
+        return await TaskService(db).scan_overdue()
+
+@celery_app.task
+def scan_overdue_tasks():
+    """Позначення прострочених задач і зведені сповіщення виконавцям"""
+    try:
+        result = run_async(_scan_overdue_tasks())
+        if result["overdue"]:
+            logger.info(f"Overdue scan: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Overdue scan failed: {exc}")
+        return "Overdue scan failed"
+
+async def _materialize_recurring_tasks():
+    from src.modules.tasks.recurrence import RecurringTaskMaterializer
+    async with db_manager.get_async_db() as db:
+        return await RecurringTaskMaterializer(db).materialize()
+
+@celery_app.task
+def materialize_recurring_tasks():
+    """Створення екземплярів повторюваних задач на горизонт уперед"""
+    try:
+        result = run_async(_materialize_recurring_tasks())
+        logger.info(f"Recurring tasks materialized: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Recurring task materialization failed: {exc}")
+        return "Recurring task materialization failed"
+
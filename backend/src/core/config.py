@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings  # Виправлений імпорт
 from pydantic import AnyHttpUrl, validator, PostgresDsn, RedisDsn
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 import secrets
 
 class Settings(BaseSettings):
@@ -26,6 +26,8 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET: str = "lawyer-crm"
     MINIO_SECURE: bool = False
+    MINIO_PUBLIC_ENDPOINT: Optional[str] = None  # адреса MinIO для браузера (presigned URL), напр. https://files.example.com
+    MINIO_REGION: str = "us-east-1"
 
     # SMTP для email
     SMTP_HOST: Optional[str] = None
@@ -34,6 +36,19 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAIL_FROM: Optional[str] = None
     EMAIL_TEMPLATES_DIR: str = "./email-templates"
+    EMAIL_TEMPLATE_CHECK_INTERVAL: float = 2.0  # секунд між перевірками mtime шаблонів
+    EMAIL_RENDER_BATCH_SIZE: int = 500  # листів на пачку рендерингу масової розсилки
+    SMTP_STARTTLS: bool = True  # False — для локального SMTP-приймача (напр. aiosmtpd)
+    SMTP_TIMEOUT: int = 30  # секунд
+    EMAIL_SMTP_POOL_SIZE: int = 4  # постійних з'єднань на процес воркера
+    EMAIL_SMTP_IDLE_TIMEOUT: int = 60  # секунд простою до перевірки з'єднання NOOP
+    EMAIL_BATCH_SIZE: int = 200  # листів з черги за один прохід
+    EMAIL_DELIVERY_INTERVAL: int = 5  # секунд
+    EMAIL_DEFAULT_DOMAIN_RATE: int = 120  # листів на хвилину на домен отримувача
+    EMAIL_DOMAIN_RATE_LIMITS: Dict[str, int] = {}  # окремі ліміти, напр. {"gmail.com": 300}
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_DELAY: int = 30  # секунд, подвоюється з кожною спробою
+    EMAIL_VISIBILITY_TIMEOUT: int = 600  # секунд до повернення в чергу пачки воркера, що впав
 
     # Налаштування додатку
     ENVIRONMENT: str = "development"
@@ -80,9 +95,67 @@ class Settings(BaseSettings):
 
     # Додаткові налаштування
     UPLOAD_MAX_FILE_SIZE: int = 104857600  # 100MB
+    UPLOAD_PART_SIZE: int = 5242880  # 5MB — мінімальна частина multipart upload S3
+    UPLOAD_PART_CONCURRENCY: int = 2  # частин одного файлу в передачі одночасно
+    UPLOAD_DIRECT_MAX_FILE_SIZE: int = 5368709120  # 5GB — пряме завантаження в MinIO в обхід API
+    UPLOAD_DIRECT_PART_SIZE: int = 16777216  # 16MB — частина для клієнта, якщо файл більший
+    UPLOAD_INTENT_EXPIRES: int = 3600  # секунд дії presigned URL і наміру завантаження
     SESSION_TIMEOUT: int = 3600
     PASSWORD_RESET_TIMEOUT: int = 3600
 
+    # Пакетне виставлення рахунків
+    BILLING_DUE_DAYS: int = 14
+
+    # Рендеринг PDF рахунків
+    INVOICE_RENDER_WORKERS: int = 0  # 0 — за кількістю ядер
+    INVOICE_PDF_URL_EXPIRES: int = 3600
+
+    # Дебіторська заборгованість (AR aging)
+    AR_AGING_REFRESH_INTERVAL: int = 900  # секунд, плановий REFRESH
+    AR_AGING_REFRESH_DEBOUNCE: int = 30  # секунд, об'єднання оновлень після платежів
+
+    # Партиціонування та архівування (time_entries, notifications)
+    PARTITION_MONTHS_AHEAD: int = 3
+    TIME_ENTRIES_RETENTION_MONTHS: int = 36
+    NOTIFICATIONS_RETENTION_MONTHS: int = 12
+
+    # Календар
+    CALENDAR_OCCURRENCE_CACHE_TTL: int = 86400  # секунд, кеш розгорнутих повторень за місяць
+    CALENDAR_FEED_PAST_DAYS: int = 90  # глибина минулих подій у iCalendar-фіді
+    CALENDAR_FEED_CACHE_TTL: int = 604800  # секунд
+
+    # Нагадування
+    REMINDER_HEARING_OFFSETS: List[int] = [1440, 120]  # хвилин до засідання
+    REMINDER_DISPATCH_INTERVAL: int = 60  # секунд
+    REMINDER_BATCH_SIZE: int = 500
+    REMINDER_VISIBILITY_TIMEOUT: int = 300  # секунд до повторної спроби після збою воркера
+
+    # Повідомлення
+    NOTIFICATION_UNREAD_RECONCILE_INTERVAL: int = 900  # секунд між звірками лічильників непрочитаних
+    NOTIFICATION_PUSH_HEARTBEAT: int = 25  # секунд між ping у WebSocket/SSE
+    NOTIFICATION_PUSH_QUEUE_SIZE: int = 100  # подій у черзі з'єднання до примусового перепідключення
+    NOTIFICATION_PUSH_REPLAY_SIZE: int = 200  # останніх подій користувача для відновлення після розриву
+    NOTIFICATION_PUSH_REPLAY_TTL: int = 604800  # секунд
+    NOTIFICATION_COALESCE_WINDOW: int = 120  # секунд, вікно злиття для режиму immediate
+    NOTIFICATION_DIGEST_DAILY_HOUR: int = 6  # година UTC щоденного дайджесту
+    NOTIFICATION_DIGEST_MAX_ITEMS: int = 10  # заголовків у тексті дайджесту
+    NOTIFICATION_DIGEST_BATCH_SIZE: int = 500  # груп за прохід
+    NOTIFICATION_DIGEST_FLUSH_INTERVAL: int = 30  # секунд
+    NOTIFICATION_SCHEDULE_DISPATCH_INTERVAL: int = 30  # секунд
+    NOTIFICATION_SCHEDULE_BATCH_SIZE: int = 500  # відкладених повідомлень на транзакцію
+    NOTIFICATION_SCHEDULE_VISIBILITY_TIMEOUT: int = 300  # секунд до повторної спроби після збою воркера
+    NOTIFICATION_SCHEDULE_RECONCILE_INTERVAL: int = 3600  # секунд між звірками черги з БД
+    NOTIFICATION_RETENTION_DAYS: int = 90  # прочитані старші за це видаляються
+    NOTIFICATION_RETENTION_ARCHIVE: bool = True  # перед видаленням зберігати в MinIO (NDJSON.gz)
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 5000  # рядків на транзакцію
+    NOTIFICATION_RETENTION_BATCH_PAUSE: float = 0.5  # секунд між пакетами (вакуум і репліки встигають)
+    NOTIFICATION_RETENTION_MAX_SECONDS: int = 1800  # бюджет одного запуску, решта — наступного дня
+
+    # Задачі
+    TASK_OVERDUE_SCAN_INTERVAL: int = 300  # секунд
+    TASK_RECURRENCE_HORIZON_DAYS: int = 60  # на скільки днів уперед створювати повторення
+    TASK_RECURRENCE_BATCH_SIZE: int = 1000  # шаблонів серій на транзакцію
+
     # Сервіси
     SENTRY_DSN: Optional[str] = None
     STRIPE_SECRET_KEY: Optional[str] = None
@@ -46,6 +46,10 @@ class DatabaseManager:
         AsyncSessionLocal = self._async_session_local
         logger.info("✅ Асинхронне підключення до БД ініціалізовано.")
 
+    @property
+    def is_initialized(self) -> bool:
+        return self._async_engine is not None
+
     @property
     def async_engine(self):
         if self._async_engine is None:
@@ -30,6 +30,18 @@ class ValidationException(LawyerCRMException):
     def __init__(self, detail: str = "Validation error"):
         super().__init__(detail=detail, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
+class ConflictException(LawyerCRMException):
+    """Виняток для конфліктів із наявними даними"""
+    
+    def __init__(self, detail: str = "Conflict"):
+        super().__init__(detail=detail, status_code=status.HTTP_409_CONFLICT)
+
+class PayloadTooLargeException(LawyerCRMException):
+    """Виняток для завеликих завантажень"""
+    
+    def __init__(self, detail: str = "Payload too large"):
+        super().__init__(detail=detail, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
 class DatabaseException(LawyerCRMException):
     """Виняток для помилок бази даних"""
     
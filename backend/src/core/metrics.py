@@ -0,0 +1,65 @@
+"""Метрики фонових завдань для Prometheus.
+
+Celery-воркери працюють в окремих контейнерах, тому значення зберігаються в
+Redis (хеш ``metrics:jobs:{job}``) і віддаються ендпоінтом ``/metrics``
+бекенду, який уже опитує Prometheus. Лічильники накопичуються
+(``HINCRBYFLOAT``), gauge перезаписуються.
+"""
+from typing import Dict, List, Optional
+import logging
+
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+JOB_PREFIX = "metrics:jobs"
+METRIC_NAMESPACE = "lawyer_crm_job"
+_COUNTER = "counter"
+_GAUGE = "gauge"
+
+async def record_job_metrics(
+    job: str,
+    counters: Optional[Dict[str, float]] = None,
+    gauges: Optional[Dict[str, float]] = None
+) -> None:
+    """Запис метрик завдання; недоступний Redis не повинен ламати саме завдання"""
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for name, value in (counters or {}).items():
+                pipe.hincrbyfloat(f"{JOB_PREFIX}:{job}", f"{_COUNTER}:{name}", value)
+            if gauges:
+                pipe.hset(f"{JOB_PREFIX}:{job}", mapping={f"{_GAUGE}:{name}": value for name, value in gauges.items()})
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record metrics for job {job}: {e}")
+
+class _SnapshotCollector:
+    """Колектор з уже прочитаних значень (collect() у prometheus_client синхронний)"""
+
+    def __init__(self, families: List):
+        self.families = families
+
+    def collect(self):
+        return self.families
+
+async def render_metrics() -> bytes:
+    """Метрики всіх завдань у текстовому форматі Prometheus"""
+    redis = get_redis()
+    families: Dict[str, object] = {}
+    async for key in redis.scan_iter(match=f"{JOB_PREFIX}:*", count=100):
+        job = key[len(JOB_PREFIX) + 1:]
+        for field, value in (await redis.hgetall(key)).items():
+            kind, _, name = field.partition(":")
+            metric = f"{METRIC_NAMESPACE}_{name}"
+            if metric not in families:
+                if kind == _COUNTER:
+                    families[metric] = CounterMetricFamily(metric, f"Background job counter {name}", labels=["job"])
+                else:
+                    families[metric] = GaugeMetricFamily(metric, f"Background job gauge {name}", labels=["job"])
+            families[metric].add_metric([job], float(value))
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(_SnapshotCollector(list(families.values())))
+    return generate_latest(registry)
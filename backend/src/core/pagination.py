@@ -0,0 +1,19 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+from .exceptions import ValidationException
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    """Непрозорий keyset-курсор (час, id) для пагінації без OFFSET"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationException("Invalid cursor")
@@ -0,0 +1,175 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import Dict, List, Tuple
+import asyncio
+import gzip
+import logging
+import re
+import shutil
+import tempfile
+
+from .config import settings
+from .exceptions import ValidationException
+from .storage import get_minio_client
+
+logger = logging.getLogger(__name__)
+
+# Партиціоновані за місяцями таблиці: таблиця -> колонка-ключ партиції
+PARTITIONED_TABLES: Dict[str, str] = {
+    "time_entries": "start_time",
+    "notifications": "created_at",
+}
+
+ARCHIVE_PREFIX = "archive/partitions"
+# Відновлені з архіву партиції не підпадають під _PARTITION_RE і не архівуються повторно
+RESTORED_SUFFIX = "_restored"
+
+_PARTITION_RE = re.compile(r"^(?P<table>[a-z_]+)_p(?P<month>\d{6})$")
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+def archive_key(table: str, partition: str) -> str:
+    return f"{ARCHIVE_PREFIX}/{table}/{partition}.csv.gz"
+
+def _check_table(table: str) -> None:
+    # Імена таблиць підставляються в DDL — дозволені лише відомі
+    if table not in PARTITIONED_TABLES:
+        raise ValidationException(f"Table {table} is not partitioned")
+
+class PartitionManager:
+    """Місячні партиції: створення наперед, архівування старих у MinIO та відновлення"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _driver_connection(self):
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
+    async def ensure_future_partitions(self, months_ahead: int = None) -> Dict[str, int]:
+        """Створює партиції поточного та наступних місяців (ідемпотентно)"""
+        months = (months_ahead if months_ahead is not None else settings.PARTITION_MONTHS_AHEAD) + 1
+        created = {}
+        for table in PARTITIONED_TABLES:
+            result = await self.db.execute(
+                text("SELECT ensure_monthly_partitions(:table, date_trunc('month', now())::date, :months)"),
+                {"table": table, "months": months}
+            )
+            created[table] = result.scalar() or 0
+        await self.db.commit()
+        return created
+
+    async def list_partitions(self, table: str) -> List[Tuple[str, date]]:
+        """Приєднані місячні партиції таблиці (без DEFAULT і відновлених з архіву)"""
+        _check_table(table)
+        result = await self.db.execute(
+            text("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table
+            """),
+            {"table": table}
+        )
+        partitions = []
+        for name in result.scalars().all():
+            match = _PARTITION_RE.match(name)
+            if match and match.group("table") == table:
+                month = match.group("month")
+                partitions.append((name, date(int(month[:4]), int(month[4:]), 1)))
+        return sorted(partitions, key=lambda item: item[1])
+
+    async def archive_expired(self, table: str, retention_months: int) -> List[str]:
+        """Архівує в MinIO і від'єднує партиції, старші за період зберігання"""
+        today = date.today()
+        cutoff = add_months(date(today.year, today.month, 1), -retention_months)
+        archived = []
+        for name, month in await self.list_partitions(table):
+            if month >= cutoff:
+                break
+            await self.archive_partition(table, name)
+            archived.append(name)
+        return archived
+
+    async def archive_partition(self, table: str, partition: str) -> str:
+        """COPY партиції у стиснений CSV в MinIO, потім DETACH + DROP.
+
+        Вивантаження відбувається до від'єднання: якщо завантаження в MinIO
+        впаде, партиція залишиться на місці і наступний запуск повторить спробу.
+        SHARE-блокування до кінця транзакції не дає запізнілим записам потрапити
+        в партицію між COPY та DROP — вони чекають коміту і вже не потрапляють у неї.
+        """
+        _check_table(table)
+        key = archive_key(table, partition)
+        await self.db.execute(text(f"LOCK TABLE {partition} IN SHARE MODE"))
+        driver = await self._driver_connection()
+        with tempfile.TemporaryFile() as tmp:
+            with gzip.GzipFile(fileobj=tmp, mode="wb") as archive:
+                await driver.copy_from_table(partition, output=archive, format="csv", header=True)
+            size = tmp.tell()
+            tmp.seek(0)
+            await asyncio.to_thread(
+                get_minio_client().put_object,
+                settings.MINIO_BUCKET,
+                key,
+                tmp,
+                size,
+                content_type="application/gzip"
+            )
+
+        await self.db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+        await self.db.execute(text(f"DROP TABLE {partition}"))
+        await self.db.commit()
+        logger.info(f"Partition {partition} archived to {key} ({size} bytes)")
+        return key
+
+    async def restore_partition(self, table: str, month: date) -> str:
+        """Відновлює архівовану партицію з MinIO і приєднує її назад"""
+        _check_table(table)
+        month = date(month.year, month.month, 1)
+        archived = partition_name(table, month)
+        key = archive_key(table, archived)
+        partition = f"{archived}{RESTORED_SUFFIX}"
+
+        def _download(target) -> None:
+            response = get_minio_client().get_object(settings.MINIO_BUCKET, key)
+            try:
+                shutil.copyfileobj(response, target)
+            finally:
+                response.close()
+                response.release_conn()
+
+        driver = await self._driver_connection()
+        with tempfile.TemporaryFile() as tmp:
+            await asyncio.to_thread(_download, tmp)
+            tmp.seek(0)
+            await self.db.execute(text(f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS)"))
+            with gzip.GzipFile(fileobj=tmp, mode="rb") as archive:
+                await driver.copy_to_table(partition, source=archive, format="csv", header=True)
+        # Рядки місяця, що потрапили в DEFAULT після архівування, блокують ATTACH
+        await self.db.execute(
+            text(f"""
+                WITH moved AS (
+                    DELETE FROM {table}_default
+                    WHERE {PARTITIONED_TABLES[table]} >= :start AND {PARTITIONED_TABLES[table]} < :end
+                    RETURNING *
+                )
+                INSERT INTO {partition} SELECT * FROM moved
+            """),
+            {"start": month, "end": add_months(month, 1)}
+        )
+        await self.db.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        await self.db.commit()
+        logger.info(f"Partition {partition} restored from {key}")
+        return partition
@@ -0,0 +1,31 @@
+from functools import lru_cache
+from typing import Optional
+from redis import asyncio as aioredis
+import redis
+
+from .config import settings
+
+_async_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> aioredis.Redis:
+    """Асинхронний клієнт Redis для FastAPI (один пул з'єднань на процес)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.from_url(
+            str(settings.REDIS_URL),
+            encoding="utf8",
+            decode_responses=True
+        )
+    return _async_client
+
+async def close_redis() -> None:
+    """Закриває асинхронний клієнт (Celery: кожне завдання має власний event loop)"""
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.close()
+
+@lru_cache(maxsize=1)
+def get_sync_redis() -> redis.Redis:
+    """Синхронний клієнт Redis для Celery-воркерів"""
+    return redis.Redis.from_url(str(settings.REDIS_URL), decode_responses=True)
@@ -0,0 +1,212 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from io import BytesIO
+from typing import AsyncIterator, List, Optional, Set
+from urllib.parse import urlparse
+import asyncio
+import hashlib
+import logging
+
+from minio import Minio
+from minio.datatypes import Part
+from minio.error import S3Error
+
+from .config import settings
+from .exceptions import PayloadTooLargeException
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_minio_client() -> Minio:
+    """Спільний клієнт MinIO (потокобезпечний, перевикористовує HTTP-з'єднання)"""
+    return Minio(
+        settings.MINIO_ENDPOINT.replace('http://', '').replace('https://', ''),
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=settings.MINIO_SECURE
+    )
+
+@lru_cache(maxsize=1)
+def get_presign_client() -> Minio:
+    """Клієнт для presigned URL з публічною адресою MinIO.
+
+    Підпис залежить від хоста, тому URL для браузера підписуються клієнтом
+    з MINIO_PUBLIC_ENDPOINT. Регіон задано явно — підпис не потребує запиту
+    до сервера, який може бути недоступний з бекенду за публічною адресою.
+    """
+    if not settings.MINIO_PUBLIC_ENDPOINT:
+        return get_minio_client()
+    endpoint = urlparse(settings.MINIO_PUBLIC_ENDPOINT)
+    return Minio(
+        endpoint.netloc or endpoint.path,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=endpoint.scheme == "https",
+        region=settings.MINIO_REGION
+    )
+
+def object_exists(object_name: str, bucket: str = None) -> bool:
+    """Перевірка наявності об'єкта в сховищі (HEAD-запит)"""
+    try:
+        get_minio_client().stat_object(bucket or settings.MINIO_BUCKET, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return False
+        raise
+
+@dataclass
+class StoredObject:
+    object_name: str
+    size: int
+    sha256: str
+    etag: str
+
+async def stream_to_storage(
+    chunks: AsyncIterator[bytes],
+    object_name: str,
+    content_type: Optional[str] = None,
+    max_size: Optional[int] = None,
+    bucket: str = None
+) -> StoredObject:
+    """Потокове завантаження в MinIO частинами multipart upload.
+
+    Дані читаються по мірі надходження: у пам'яті одна частина, що
+    заповнюється, і не більше ``UPLOAD_PART_CONCURRENCY`` частин у передачі.
+    SHA-256 рахується на льоту, ліміт розміру перевіряється після кожного
+    фрагмента — завелике завантаження переривається одразу, а незавершений
+    multipart upload скасовується. Файл, що вміщується в одну частину,
+    завантажується одним PUT.
+    """
+    client = get_minio_client()
+    bucket = bucket or settings.MINIO_BUCKET
+    content_type = content_type or "application/octet-stream"
+    max_size = max_size if max_size is not None else settings.UPLOAD_MAX_FILE_SIZE
+    part_size = settings.UPLOAD_PART_SIZE
+    slots = asyncio.Semaphore(settings.UPLOAD_PART_CONCURRENCY)
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    upload_id: Optional[str] = None
+    uploads: List[asyncio.Task] = []
+    in_flight: Set[asyncio.Task] = set()
+
+    async def upload_part(number: int, data: bytes) -> Part:
+        try:
+            # Приватний API minio: публічний put_object не дає керувати частинами
+            etag = await asyncio.to_thread(client._upload_part, bucket, object_name, data, None, upload_id, number)
+            return Part(number, etag)
+        finally:
+            slots.release()
+
+    async def submit(data: bytes) -> None:
+        nonlocal upload_id
+        if upload_id is None:
+            upload_id = await asyncio.to_thread(
+                client._create_multipart_upload, bucket, object_name, {"Content-Type": content_type}
+            )
+        # Чекаємо вільний слот — так обмежується пам'ять на завантаження
+        await slots.acquire()
+        for task in [task for task in in_flight if task.done()]:
+            in_flight.discard(task)
+            task.result()  # помилка частини перериває завантаження одразу
+        task = asyncio.create_task(upload_part(len(uploads) + 1, data))
+        uploads.append(task)
+        in_flight.add(task)
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_size:
+                raise PayloadTooLargeException(f"File exceeds {max_size} bytes")
+            hasher.update(chunk)
+            buffer += chunk
+            while len(buffer) >= part_size:
+                data = bytes(buffer[:part_size])
+                del buffer[:part_size]
+                await submit(data)
+
+        if upload_id is None:
+            result = await asyncio.to_thread(
+                client.put_object, bucket, object_name, BytesIO(bytes(buffer)), len(buffer), content_type=content_type
+            )
+        else:
+            if buffer:
+                await submit(bytes(buffer))
+                buffer.clear()
+            parts = await asyncio.gather(*uploads)
+            result = await asyncio.to_thread(client._complete_multipart_upload, bucket, object_name, upload_id, parts)
+    except BaseException:
+        for task in uploads:
+            task.cancel()
+        await asyncio.gather(*uploads, return_exceptions=True)
+        if upload_id is not None:
+            try:
+                await asyncio.to_thread(client._abort_multipart_upload, bucket, object_name, upload_id)
+            except Exception as e:
+                # Незавершені частини прибере lifecycle-правило бакета
+                logger.warning(f"Failed to abort multipart upload of {object_name}: {e}")
+        raise
+    return StoredObject(object_name=object_name, size=size, sha256=hasher.hexdigest(), etag=result.etag)
+
+async def remove_object(object_name: str, bucket: str = None) -> None:
+    await asyncio.to_thread(get_minio_client().remove_object, bucket or settings.MINIO_BUCKET, object_name)
+
+def presigned_put_url(object_name: str, expires: int, bucket: str = None) -> str:
+    return get_presign_client().presigned_put_object(
+        bucket or settings.MINIO_BUCKET, object_name, expires=timedelta(seconds=expires)
+    )
+
+def start_multipart_upload(object_name: str, content_type: str, bucket: str = None) -> str:
+    return get_minio_client()._create_multipart_upload(
+        bucket or settings.MINIO_BUCKET, object_name, {"Content-Type": content_type}
+    )
+
+def presigned_part_urls(object_name: str, upload_id: str, parts: int, expires: int, bucket: str = None) -> List[str]:
+    """URL для PUT кожної частини (номери з 1)"""
+    client = get_presign_client()
+    return [
+        client.get_presigned_url(
+            "PUT",
+            bucket or settings.MINIO_BUCKET,
+            object_name,
+            expires=timedelta(seconds=expires),
+            extra_query_params={"partNumber": str(number), "uploadId": upload_id}
+        )
+        for number in range(1, parts + 1)
+    ]
+
+def list_uploaded_parts(object_name: str, upload_id: str, bucket: str = None) -> List[Part]:
+    """Частини multipart upload, які клієнт уже завантажив, за номером"""
+    client = get_minio_client()
+    bucket = bucket or settings.MINIO_BUCKET
+    uploaded: List[Part] = []
+    marker = None
+    while True:
+        result = client._list_parts(bucket, object_name, upload_id, max_parts=1000, part_number_marker=marker)
+        uploaded.extend(result.parts)
+        if not result.is_truncated:
+            break
+        marker = result.next_part_number_marker
+    return sorted(uploaded, key=lambda part: part.part_number)
+
+def complete_uploaded_parts(object_name: str, upload_id: str, parts: List[Part], bucket: str = None) -> None:
+    get_minio_client()._complete_multipart_upload(bucket or settings.MINIO_BUCKET, object_name, upload_id, parts)
+
+def abort_multipart_upload(object_name: str, upload_id: str, bucket: str = None) -> None:
+    get_minio_client()._abort_multipart_upload(bucket or settings.MINIO_BUCKET, object_name, upload_id)
+
+def object_sha256(object_name: str, bucket: str = None, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 об'єкта потоком (для фонової перевірки, без завантаження в пам'ять)"""
+    response = get_minio_client().get_object(bucket or settings.MINIO_BUCKET, object_name)
+    hasher = hashlib.sha256()
+    try:
+        for chunk in response.stream(chunk_size):
+            hasher.update(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+    return hasher.hexdigest()
@@ -5,15 +5,18 @@ from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioredis
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from .core.config import settings
 from .core.database import db_manager, Base, get_db
 from .core.security import security_service
 from .api.v1.router import api_router
+from .core.metrics import render_metrics
+from .modules.notifications.push import notification_hub
 
 # -----------------------------
 # 🔥 Вимкнути валідацію host у dev-режимі
@@ -60,6 +63,7 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("🛑 Shutting down application...")
+    await notification_hub.close()
     await FastAPICache.close()
 
 # -----------------------------
@@ -110,6 +114,14 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# -----------------------------
+# 🔥 Метрики Prometheus (фонові завдання)
+# -----------------------------
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=await render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # -----------------------------
 # 🔥 Глобальна обробка помилок
 # -----------------------------
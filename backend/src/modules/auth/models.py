@@ -29,6 +29,12 @@ class User(Base):
     # Роль користувача
     role = Column(SQLEnum(UserRole), default=UserRole.LAWYER)  # ← використовуємо з enums
 
+    # Режим дайджесту повідомлень: immediate, hourly, daily
+    notification_digest = Column(String(10), default="immediate", server_default="immediate", nullable=False)
+
+    # Токен підписки на iCalendar-фід
+    calendar_feed_token = Column(String(80), unique=True, index=True, nullable=True)
+
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
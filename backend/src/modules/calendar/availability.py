@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+from heapq import merge
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+def merge_busy(*calendars: Iterable[Interval]) -> List[Interval]:
+    """Об'єднання відсортованих списків зайнятості в непересічні інтервали.
+
+    Кожен календар має бути відсортований за початком; злиття через heap
+    дає O(N log k) для k календарів і N подій сумарно.
+    """
+    merged: List[Interval] = []
+    for start, end in merge(*calendars):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def working_windows(
+    window_start: datetime,
+    window_end: datetime,
+    day_start: time,
+    day_end: time,
+    weekdays_only: bool = True
+) -> Iterator[Interval]:
+    """Робочі проміжки кожного дня в межах вікна"""
+    day = window_start.date()
+    while day <= window_end.date():
+        if not weekdays_only or day.weekday() < 5:
+            start = max(datetime.combine(day, day_start, window_start.tzinfo), window_start)
+            end = min(datetime.combine(day, day_end, window_start.tzinfo), window_end)
+            if start < end:
+                yield start, end
+        day += timedelta(days=1)
+
+def free_intervals(busy: Sequence[Interval], windows: Iterable[Interval]) -> Iterator[Interval]:
+    """Лінійний прохід (sweep line) по злитій зайнятості та робочих вікнах"""
+    i = 0
+    for window_start, window_end in windows:
+        # Події, що закінчилися до початку вікна, більше не знадобляться
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        cursor = window_start
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] > cursor:
+                yield cursor, busy[j][0]
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < window_end:
+            yield cursor, window_end
+
+def find_slots(
+    busy: Sequence[Interval],
+    windows: Iterable[Interval],
+    duration: timedelta,
+    limit: Optional[int] = None,
+    step: Optional[timedelta] = None
+) -> List[Interval]:
+    """Перші ``limit`` вільних слотів тривалістю ``duration``"""
+    step = step or duration
+    slots: List[Interval] = []
+    for free_start, free_end in free_intervals(busy, windows):
+        slot_start = free_start
+        while slot_start + duration <= free_end:
+            slots.append((slot_start, slot_start + duration))
+            if limit is not None and len(slots) >= limit:
+                return slots
+            slot_start += step
+    return slots
@@ -0,0 +1,327 @@
+"""Підписний iCalendar-фід користувача (події, засідання, дедлайни задач).
+
+Фід кешується в Redis як хеш ``calendar:feed:{user_id}`` з окремими полями
+на кожну секцію. Зміна подій/засідань/задач видаляє лише свою секцію та ETag,
+тож перебудовується тільки вона. Незмінене опитування — один HMGET і 304.
+Кожне скидання збільшує лічильник версії ``calendar:feed:{user_id}:version``;
+перебудова записує кеш, лише якщо версія не змінилась з моменту її початку,
+тож фід, зібраний до паралельної зміни, не потрапляє в кеш під новим ETag.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+import hashlib
+import hmac
+import logging
+import secrets
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models, ical
+from .recurrence import parse_rule
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.core.redis import get_redis
+from src.modules.auth.models import User
+from src.modules.hearings.models import Hearing, HearingStatus, parse_duration
+from src.modules.tasks.models import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_PREFIX = "calendar:feed"
+SECTIONS = ("events", "hearings", "tasks")
+UID_DOMAIN = "lawyer-crm"
+
+# Запис кешу фіду, якщо версія не змінилась: KEYS = feed, version; ARGV = version, ttl, field, value, ...
+_STORE_IF_CURRENT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+def feed_cache_key(user_id: UUID) -> str:
+    return f"{FEED_CACHE_PREFIX}:{user_id}"
+
+def feed_version_key(user_id: UUID) -> str:
+    return f"{FEED_CACHE_PREFIX}:{user_id}:version"
+
+def new_feed_token(user_id: UUID) -> str:
+    # Префікс з id користувача дозволяє знайти кеш без звернення до БД
+    return f"{user_id.hex}{secrets.token_urlsafe(24)}"
+
+def parse_feed_token(token: str) -> Optional[UUID]:
+    try:
+        return UUID(hex=token[:32])
+    except ValueError:
+        return None
+
+def tokens_match(expected: Optional[str], token: str) -> bool:
+    return bool(expected) and hmac.compare_digest(expected, token)
+
+async def invalidate_feed(user_id: Optional[UUID], *sections: str) -> None:
+    """Скидає закешовані секції фіду (усі, якщо не вказано) та його ETag"""
+    if user_id is None:
+        return
+    fields = [f"section:{section}" for section in (sections or SECTIONS)]
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.incr(feed_version_key(user_id))
+            pipe.hdel(feed_cache_key(user_id), "etag", *fields)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to invalidate calendar feed for {user_id}: {e}")
+
+class CalendarFeedService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def rotate_token(self, user_id: UUID) -> str:
+        """Новий токен фіду; старі підписки перестають працювати"""
+        token = new_feed_token(user_id)
+        try:
+            await self.db.execute(
+                update(User).where(User.id == user_id).values(calendar_feed_token=token)
+            )
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error rotating calendar feed token: {e}")
+            raise DatabaseException("Failed to rotate calendar feed token")
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                pipe.incr(feed_version_key(user_id))
+                pipe.delete(feed_cache_key(user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to drop calendar feed cache for {user_id}: {e}")
+        return token
+
+    async def get_cached_etag(self, user_id: UUID, token: str) -> Optional[str]:
+        """ETag закешованого фіду, якщо токен збігається (без звернення до БД)"""
+        try:
+            cached_token, etag = await get_redis().hmget(feed_cache_key(user_id), "token", "etag")
+        except Exception as e:
+            logger.warning(f"Calendar feed cache unavailable: {e}")
+            return None
+        return etag if tokens_match(cached_token, token) else None
+
+    async def _token_is_valid(self, user_id: UUID, token: str) -> bool:
+        try:
+            result = await self.db.execute(
+                select(User.calendar_feed_token).where(
+                    and_(User.id == user_id, User.is_active.is_(True))
+                )
+            )
+            return tokens_match(result.scalar_one_or_none(), token)
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking calendar feed token: {e}")
+            raise DatabaseException("Failed to check calendar feed token")
+
+    async def build(self, user_id: UUID, token: str) -> Optional[Tuple[str, List[str]]]:
+        """(ETag, частини тіла) фіду; перебудовуються лише відсутні в кеші секції"""
+        key = feed_cache_key(user_id)
+        fields = ["token"] + [f"section:{section}" for section in SECTIONS]
+        redis = get_redis()
+        try:
+            # Версія читається разом із кешем, до звернення до БД
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.get(feed_version_key(user_id))
+                pipe.hmget(key, fields)
+                version, cached = await pipe.execute()
+            version = version or "0"
+        except Exception as e:
+            logger.warning(f"Calendar feed cache unavailable: {e}")
+            redis, cached = None, [None] * len(fields)
+
+        if not tokens_match(cached[0], token) and not await self._token_is_valid(user_id, token):
+            return None
+
+        since = datetime.utcnow() - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+        builders = {
+            "events": self._build_events,
+            "hearings": self._build_hearings,
+            "tasks": self._build_tasks,
+        }
+        sections: Dict[str, str] = {}
+        for section, value in zip(SECTIONS, cached[1:]):
+            sections[section] = value if value is not None else await builders[section](user_id, since)
+
+        digest = hashlib.sha256()
+        for section in SECTIONS:
+            digest.update(sections[section].encode("utf-8"))
+        etag = f'"{digest.hexdigest()[:32]}"'
+
+        if redis is not None:
+            try:
+                args = ["token", token, "etag", etag]
+                for section in SECTIONS:
+                    args.extend((f"section:{section}", sections[section]))
+                stored = await redis.eval(
+                    _STORE_IF_CURRENT_SCRIPT, 2, key, feed_version_key(user_id),
+                    version, settings.CALENDAR_FEED_CACHE_TTL, *args
+                )
+                if not stored:
+                    # Фід змінився під час перебудови — наступне опитування збере його наново
+                    logger.debug(f"Calendar feed for {user_id} changed during rebuild, not cached")
+            except Exception as e:
+                logger.warning(f"Failed to cache calendar feed for {user_id}: {e}")
+
+        chunks = [ical.calendar_header("Lawyer CRM")]
+        chunks.extend(sections[section] for section in SECTIONS)
+        chunks.append(ical.CALENDAR_FOOTER)
+        return etag, chunks
+
+    async def _build_events(self, user_id: UUID, since: datetime) -> str:
+        event = models.CalendarEvent
+        try:
+            result = await self.db.execute(
+                select(event)
+                .where(
+                    and_(
+                        event.created_by_id == user_id,
+                        event.status != "cancelled",
+                        or_(
+                            and_(event.is_recurring.isnot(True), event.end_time >= since),
+                            and_(
+                                event.is_recurring.is_(True),
+                                or_(event.recurrence_end.is_(None), event.recurrence_end >= since)
+                            )
+                        )
+                    )
+                )
+                .order_by(event.start_time.asc())
+            )
+            events = result.scalars().all()
+            recurring_ids = [item.id for item in events if item.is_recurring]
+            exceptions: Dict[UUID, List[models.CalendarEventException]] = {}
+            if recurring_ids:
+                result = await self.db.execute(
+                    select(models.CalendarEventException)
+                    .where(models.CalendarEventException.event_id.in_(recurring_ids))
+                    .order_by(models.CalendarEventException.original_start.asc())
+                )
+                for exception in result.scalars().all():
+                    exceptions.setdefault(exception.event_id, []).append(exception)
+        except SQLAlchemyError as e:
+            logger.error(f"Error building calendar feed events: {e}")
+            raise DatabaseException("Failed to build calendar feed")
+
+        parts = []
+        for item in events:
+            uid = f"event-{item.id}@{UID_DOMAIN}"
+            rrule = None
+            if item.is_recurring and item.recurrence_pattern:
+                try:
+                    rrule = ical.format_rule(parse_rule(item.recurrence_pattern, item.recurrence_end))
+                except ValueError:
+                    rrule = None
+            common = dict(
+                stamp=item.updated_at,
+                status="CONFIRMED" if item.status == "confirmed" else "TENTATIVE" if item.status == "scheduled" else None,
+                categories=item.type.value if item.type else None,
+            )
+            series_exceptions = exceptions.get(item.id, []) if rrule else []
+            parts.append(ical.vevent(
+                uid,
+                item.title,
+                item.start_time,
+                item.end_time,
+                all_day=bool(item.all_day),
+                description=item.description,
+                location=item.room or item.location,
+                rrule=rrule,
+                exdates=[exception.original_start for exception in series_exceptions if exception.is_cancelled],
+                **common
+            ))
+            duration = item.end_time - item.start_time
+            for exception in series_exceptions:
+                if exception.is_cancelled:
+                    continue
+                start = exception.start_time or exception.original_start
+                parts.append(ical.vevent(
+                    uid,
+                    exception.title or item.title,
+                    start,
+                    exception.end_time or start + duration,
+                    description=exception.description or item.description,
+                    location=exception.room or exception.location or item.room or item.location,
+                    recurrence_id=exception.original_start,
+                    **common
+                ))
+        return "".join(parts)
+
+    async def _build_hearings(self, user_id: UUID, since: datetime) -> str:
+        try:
+            result = await self.db.execute(
+                select(Hearing)
+                .where(
+                    and_(
+                        Hearing.created_by_id == user_id,
+                        Hearing.status != HearingStatus.CANCELLED,
+                        Hearing.hearing_date >= since
+                    )
+                )
+                .order_by(Hearing.hearing_date.asc())
+            )
+            hearings = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error building calendar feed hearings: {e}")
+            raise DatabaseException("Failed to build calendar feed")
+
+        parts = []
+        for hearing in hearings:
+            location = ", ".join(part for part in (hearing.location, hearing.courtroom) if part)
+            details = [
+                f"Справа: {hearing.case_number}" if hearing.case_number else None,
+                f"Суддя: {hearing.judge}" if hearing.judge else None,
+                hearing.description,
+            ]
+            parts.append(ical.vevent(
+                f"hearing-{hearing.id}@{UID_DOMAIN}",
+                hearing.title,
+                hearing.hearing_date,
+                hearing.hearing_date + parse_duration(hearing.duration),
+                stamp=hearing.updated_at,
+                description="\n".join(detail for detail in details if detail) or None,
+                location=location or None,
+                status="CONFIRMED" if hearing.status == HearingStatus.CONFIRMED else "TENTATIVE",
+                categories="hearing",
+            ))
+        return "".join(parts)
+
+    async def _build_tasks(self, user_id: UUID, since: datetime) -> str:
+        try:
+            result = await self.db.execute(
+                select(Task)
+                .where(
+                    and_(
+                        Task.assigned_to_id == user_id,
+                        Task.due_date.isnot(None),
+                        Task.due_date >= since,
+                        Task.status.notin_([TaskStatus.DONE, TaskStatus.CANCELLED])
+                    )
+                )
+                .order_by(Task.due_date.asc())
+            )
+            tasks = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error building calendar feed tasks: {e}")
+            raise DatabaseException("Failed to build calendar feed")
+
+        return "".join(
+            ical.vevent(
+                f"task-{task.id}@{UID_DOMAIN}",
+                f"Дедлайн: {task.title}",
+                task.due_date.date(),
+                all_day=True,
+                stamp=task.updated_at,
+                description=task.description,
+                categories="task",
+            )
+            for task in tasks
+        )
@@ -0,0 +1,112 @@
+"""Мінімальний генератор iCalendar (RFC 5545) для підписних фідів"""
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+from .recurrence import RecurrenceRule
+
+PRODID = "-//Lawyer CRM//Calendar Feed//UK"
+CRLF = "\r\n"
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+def fold_line(line: str) -> str:
+    """Перенесення рядків довших за 75 октетів (продовження з пробілу)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Не розриваємо багатобайтовий символ UTF-8
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74
+    return (CRLF + " ").join(parts)
+
+def format_datetime(value: datetime) -> str:
+    # Час у БД зберігається в UTC без часового поясу
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+def format_date(value: date) -> str:
+    return value.strftime("%Y%m%d")
+
+def format_rule(rule: RecurrenceRule) -> str:
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append(f"UNTIL={format_datetime(rule.until)}")
+    if rule.by_day:
+        parts.append("BYDAY=" + ",".join(WEEKDAY_CODES[day] for day in rule.by_day))
+    if rule.by_month_day:
+        parts.append("BYMONTHDAY=" + ",".join(str(day) for day in rule.by_month_day))
+    return ";".join(parts)
+
+def vevent(
+    uid: str,
+    summary: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    all_day: bool = False,
+    stamp: Optional[datetime] = None,
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+    status: Optional[str] = None,
+    categories: Optional[str] = None,
+    rrule: Optional[str] = None,
+    exdates: Iterable[datetime] = (),
+    recurrence_id: Optional[datetime] = None
+) -> str:
+    """Один компонент VEVENT у вигляді готового до запису тексту"""
+    lines: List[str] = ["BEGIN:VEVENT", f"UID:{uid}"]
+    lines.append(f"DTSTAMP:{format_datetime(stamp or datetime.utcnow())}")
+    if recurrence_id is not None:
+        lines.append(f"RECURRENCE-ID:{format_datetime(recurrence_id)}")
+    if all_day:
+        lines.append(f"DTSTART;VALUE=DATE:{format_date(start)}")
+    else:
+        lines.append(f"DTSTART:{format_datetime(start)}")
+        if end is not None:
+            lines.append(f"DTEND:{format_datetime(end)}")
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    for exdate in exdates:
+        lines.append(f"EXDATE:{format_datetime(exdate)}")
+    lines.append(f"SUMMARY:{escape_text(summary)}")
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    if location:
+        lines.append(f"LOCATION:{escape_text(location)}")
+    if status:
+        lines.append(f"STATUS:{status}")
+    if categories:
+        lines.append(f"CATEGORIES:{escape_text(categories)}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) + CRLF for line in lines)
+
+def calendar_header(name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+        "X-PUBLISHED-TTL:PT15M",
+    ]
+    return "".join(fold_line(line) + CRLF for line in lines)
+
+CALENDAR_FOOTER = "END:VCALENDAR" + CRLF
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Enum, Computed, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, TSRANGE, ExcludeConstraint
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -43,14 +43,17 @@ class CalendarEvent(Base):
     end_time = Column(DateTime, nullable=False)
     all_day = Column(Boolean, default=False)
     timezone = Column(String(50), default="Europe/Kyiv")
+    # Проміжок [start_time, end_time) для GiST-індексу перетинів
+    span = Column(TSRANGE, Computed("tsrange(start_time, end_time, '[)')", persisted=True))
     
     # Повторення
     is_recurring = Column(Boolean, default=False)
-    recurrence_pattern = Column(String(50))  # daily, weekly, monthly, yearly
+    recurrence_pattern = Column(String(255))  # daily, weekly, monthly, yearly або RRULE
     recurrence_end = Column(DateTime)
     
     # Локація
     location = Column(String(200))
+    room = Column(String(100))  # ресурс без подвійного бронювання (переговорна)
     online_meeting_link = Column(String(500))
     
     # Учасники
@@ -69,4 +72,47 @@ class CalendarEvent(Base):
     # Relationships
     case = relationship("Case")
     client = relationship("Client")
-    created_by = relationship("User")
\ No newline at end of file
+    created_by = relationship("User")
+
+    __table_args__ = (
+        Index(
+            "ix_calendar_events_creator_span",
+            "created_by_id",
+            "span",
+            postgresql_using="gist",
+            postgresql_where=text("status <> 'cancelled'")
+        ),
+        ExcludeConstraint(
+            ("room", "="),
+            ("span", "&&"),
+            name="ex_calendar_events_room_span",
+            using="gist",
+            where=text("room IS NOT NULL AND status <> 'cancelled'")
+        ),
+    )
+
+class CalendarEventException(Base):
+    """Скасування або зміна одного повторення серії"""
+    __tablename__ = "calendar_event_exceptions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("calendar_events.id", ondelete="CASCADE"), nullable=False)
+    original_start = Column(DateTime, nullable=False)  # початок повторення за правилом
+    is_cancelled = Column(Boolean, default=False, nullable=False)
+
+    # Перевизначені поля (None — як у серії)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    title = Column(String(200))
+    description = Column(Text)
+    location = Column(String(200))
+    room = Column(String(100))
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    event = relationship("CalendarEvent")
+
+    __table_args__ = (
+        UniqueConstraint("event_id", "original_start", name="uq_calendar_event_exceptions_occurrence"),
+    )
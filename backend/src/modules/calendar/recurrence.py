@@ -0,0 +1,160 @@
+"""Розгортання повторюваних подій у вікно перегляду.
+
+Підтримується підмножина RRULE (RFC 5545): FREQ=DAILY|WEEKLY|MONTHLY|YEARLY,
+INTERVAL, COUNT, UNTIL, BYDAY (для WEEKLY) та BYMONTHDAY (для MONTHLY).
+Старі значення ``daily``/``weekly``/``monthly``/``yearly`` трактуються як
+відповідний FREQ. Генерація стрибає одразу до періоду, що містить початок
+вікна, тому вартість пропорційна кількості видимих повторень, а не довжині серії.
+"""
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+# Захист від правил без жодного можливого повторення (напр. 30 лютого)
+MAX_EMPTY_PERIODS = 1000
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    by_day: Tuple[int, ...] = ()
+    by_month_day: Tuple[int, ...] = ()
+
+def _parse_until(value: str) -> datetime:
+    value = value.rstrip("Z")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid UNTIL value: {value}")
+
+def parse_rule(pattern: str, recurrence_end: Optional[datetime] = None) -> RecurrenceRule:
+    """Розбір правила повторення; ValueError для непідтримуваних частин"""
+    pattern = (pattern or "").strip()
+    if pattern.upper().startswith("RRULE:"):
+        pattern = pattern[6:]
+    if pattern.upper() in FREQUENCIES:
+        pattern = f"FREQ={pattern}"
+
+    parts = {}
+    for part in filter(None, pattern.upper().split(";")):
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid rule part: {part}")
+        parts[key] = value
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported frequency: {freq}")
+    interval = int(parts.pop("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    count = int(parts["COUNT"]) if "COUNT" in parts else None
+    parts.pop("COUNT", None)
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be positive")
+    until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    if recurrence_end and (until is None or recurrence_end < until):
+        until = recurrence_end
+
+    by_day: Tuple[int, ...] = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is supported only for WEEKLY rules")
+        try:
+            by_day = tuple(sorted({WEEKDAYS[day] for day in parts.pop("BYDAY").split(",")}))
+        except KeyError as e:
+            raise ValueError(f"Invalid BYDAY value: {e}")
+
+    by_month_day: Tuple[int, ...] = ()
+    if "BYMONTHDAY" in parts:
+        if freq != "MONTHLY":
+            raise ValueError("BYMONTHDAY is supported only for MONTHLY rules")
+        by_month_day = tuple(sorted({int(day) for day in parts.pop("BYMONTHDAY").split(",")}))
+        if any(day == 0 or not -31 <= day <= 31 for day in by_month_day):
+            raise ValueError("BYMONTHDAY must be within 1..31 or -31..-1")
+
+    if parts:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+    return RecurrenceRule(freq, interval, count, until, by_day, by_month_day)
+
+def _month_index(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+def _daily(dtstart: datetime, rule: RecurrenceRule, lo: datetime) -> Iterator[Tuple[int, datetime]]:
+    step = timedelta(days=rule.interval)
+    k = max(0, -(-(lo - dtstart) // step))  # ceil
+    while True:
+        yield k, dtstart + k * step
+        k += 1
+
+def _weekly(dtstart: datetime, rule: RecurrenceRule, lo: datetime) -> Iterator[Tuple[int, datetime]]:
+    days = rule.by_day or (dtstart.weekday(),)
+    anchor = dtstart - timedelta(days=dtstart.weekday())  # понеділок першого тижня
+    period = timedelta(weeks=rule.interval)
+    # Дні першого тижня до dtstart не є повтореннями
+    skipped = sum(1 for day in days if anchor + timedelta(days=day) < dtstart)
+    k = max(0, (lo - anchor) // period)
+    while True:
+        week = anchor + k * period
+        for position, day in enumerate(days):
+            start = week + timedelta(days=day)
+            if start >= dtstart:
+                yield k * len(days) + position - skipped, start
+        k += 1
+
+def _monthly(dtstart: datetime, rule: RecurrenceRule, lo: datetime, step_months: int) -> Iterator[Tuple[int, datetime]]:
+    days = rule.by_month_day or (dtstart.day,)
+    first_month = _month_index(dtstart)
+    # Через пропуск неіснуючих дат номер повторення не обчислюється арифметично,
+    # тому з COUNT рахуємо від початку серії (COUNT сам обмежує кількість)
+    k = 0 if rule.count else max(0, (_month_index(lo) - first_month) // step_months)
+    ordinal = 0
+    empty = 0
+    while empty < MAX_EMPTY_PERIODS:
+        year, month = divmod(first_month + k * step_months, 12)
+        month += 1
+        last_day = monthrange(year, month)[1]
+        produced = False
+        for day in sorted(last_day + 1 + d if d < 0 else d for d in days):
+            if not 1 <= day <= last_day:
+                continue
+            start = datetime.combine(date(year, month, day), dtstart.time())
+            if start >= dtstart:
+                produced = True
+                yield ordinal, start
+                ordinal += 1
+        empty = 0 if produced else empty + 1
+        k += 1
+
+def iter_occurrences(
+    dtstart: datetime,
+    rule: RecurrenceRule,
+    window_start: datetime,
+    window_end: datetime
+) -> Iterator[datetime]:
+    """Початки повторень у [window_start, window_end) з урахуванням COUNT/UNTIL"""
+    if rule.freq == "DAILY":
+        candidates = _daily(dtstart, rule, window_start)
+    elif rule.freq == "WEEKLY":
+        candidates = _weekly(dtstart, rule, window_start)
+    elif rule.freq == "MONTHLY":
+        candidates = _monthly(dtstart, rule, window_start, rule.interval)
+    else:
+        candidates = _monthly(dtstart, rule, window_start, 12 * rule.interval)
+
+    for ordinal, start in candidates:
+        if start >= window_end:
+            return
+        if rule.until is not None and start > rule.until:
+            return
+        if rule.count is not None and ordinal >= rule.count:
+            return
+        if start >= window_start:
+            yield start
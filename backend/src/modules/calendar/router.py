@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import UUID
 
 from . import service, schemas
+from .feed import CalendarFeedService, parse_feed_token
 from src.core.database import get_db
 from src.core.security import get_current_user
 from src.modules.auth.models import User
@@ -20,7 +22,7 @@ async def create_event(
     calendar_service = service.CalendarService(db)
     return await calendar_service.create(event_data, current_user.id)
 
-@router.get("/events", response_model=List[schemas.CalendarEventResponse])
+@router.get("/events", response_model=List[schemas.CalendarOccurrenceResponse])
 async def get_events(
     start_date: datetime = Query(...),
     end_date: datetime = Query(...),
@@ -51,6 +53,27 @@ async def get_event(
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
+@router.put("/events/{event_id}/exceptions", response_model=schemas.CalendarEventExceptionResponse)
+async def save_event_exception(
+    event_id: UUID,
+    exception_data: schemas.CalendarEventExceptionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    calendar_service = service.CalendarService(db)
+    return await calendar_service.add_exception(event_id, exception_data, current_user.id)
+
+@router.delete("/events/{event_id}/exceptions/{exception_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_event_exception(
+    event_id: UUID,
+    exception_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    calendar_service = service.CalendarService(db)
+    if not await calendar_service.delete_exception(event_id, exception_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Exception not found")
+
 @router.get("/available-slots", response_model=List[schemas.CalendarView])
 async def get_available_slots(
     date: datetime = Query(...),
@@ -62,6 +85,18 @@ async def get_available_slots(
     slots = await calendar_service.get_available_slots(date, current_user.id, duration_minutes)
     return [{"events": [], "busy_slots": [], "available_slots": slots}]
 
+@router.post("/free-busy", response_model=List[schemas.FreeBusyResult])
+async def find_free_busy(
+    request: schemas.FreeBusyBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    for query in request.queries:
+        if query.end <= query.start or query.end - query.start > timedelta(days=62):
+            raise HTTPException(status_code=422, detail="Window must be positive and at most 62 days")
+    calendar_service = service.CalendarService(db)
+    return await calendar_service.find_common_slots(request.queries)
+
 @router.get("/conflicts", response_model=List[schemas.CalendarEventResponse])
 async def check_conflicts(
     start_time: datetime = Query(...),
@@ -70,4 +105,64 @@ async def check_conflicts(
     current_user: User = Depends(get_current_user)
 ):
     calendar_service = service.CalendarService(db)
-    return await calendar_service.check_conflicts(start_time, end_time, current_user.id)
\ No newline at end of file
+    return await calendar_service.check_conflicts(start_time, end_time, current_user.id)
+
+@router.post("/conflicts/batch", response_model=List[schemas.ConflictCheckResult])
+async def check_conflicts_batch(
+    request: schemas.ConflictCheckRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    for item in request.items:
+        if item.end_time <= item.start_time:
+            raise HTTPException(status_code=422, detail="end_time must be after start_time")
+    calendar_service = service.CalendarService(db)
+    return await calendar_service.check_conflicts_batch(request.items, current_user.id)
+
+@router.post("/feed/token", response_model=schemas.CalendarFeedTokenResponse)
+async def rotate_feed_token(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    feed_service = CalendarFeedService(db)
+    token = await feed_service.rotate_token(current_user.id)
+    return {"token": token, "url": str(request.url_for("get_calendar_feed", token=token))}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+@router.get("/feed/{token}.ics", name="get_calendar_feed")
+async def get_calendar_feed(
+    token: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Публічний фід за токеном для підписки з календарних застосунків"""
+    user_id = parse_feed_token(token)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    
+    if_none_match = request.headers.get("if-none-match")
+    feed_service = CalendarFeedService(db)
+    headers = {"Cache-Control": "private, no-cache"}
+    # Незмінений фід: лише Redis, без звернення до БД
+    etag = await feed_service.get_cached_etag(user_id, token)
+    if etag and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": etag})
+    
+    feed = await feed_service.build(user_id, token)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    etag, chunks = feed
+    headers["ETag"] = etag
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return StreamingResponse(
+        iter(chunks),
+        media_type="text/calendar; charset=utf-8",
+        headers={**headers, "Content-Disposition": 'inline; filename="calendar.ics"'}
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, time
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 from enum import Enum
@@ -36,11 +36,12 @@ class CalendarEventBase(BaseModel):
     
     # Локація
     location: Optional[str] = Field(None, max_length=200)
+    room: Optional[str] = Field(None, max_length=100)
     online_meeting_link: Optional[str] = Field(None, max_length=500)
     
     # Повторення
     is_recurring: bool = False
-    recurrence_pattern: Optional[str] = Field(None, max_length=50)
+    recurrence_pattern: Optional[str] = Field(None, max_length=255)
     recurrence_end: Optional[datetime] = None
     
     # Учасники та нагадування
@@ -60,6 +61,7 @@ class CalendarEventUpdate(BaseModel):
     end_time: Optional[datetime] = None
     status: Optional[str] = Field(None, pattern="^(scheduled|confirmed|cancelled|completed)$")
     location: Optional[str] = Field(None, max_length=200)
+    room: Optional[str] = Field(None, max_length=100)
     online_meeting_link: Optional[str] = Field(None, max_length=500)
 
 class CalendarEventResponse(CalendarEventBase):
@@ -75,4 +77,65 @@ class CalendarEventResponse(CalendarEventBase):
 class CalendarView(BaseModel):
     events: List[CalendarEventResponse]
     busy_slots: List[Dict[str, datetime]]
-    available_slots: List[Dict[str, datetime]]
\ No newline at end of file
+    available_slots: List[Dict[str, datetime]]
+
+class FreeBusyQuery(BaseModel):
+    user_ids: List[UUID] = Field(..., min_items=1, max_items=50)
+    start: datetime
+    end: datetime
+    duration_minutes: int = Field(60, ge=5, le=480)
+    step_minutes: Optional[int] = Field(None, ge=5, le=480)  # крок між слотами, за замовчуванням — тривалість
+    limit: int = Field(10, ge=1, le=200)
+    working_hours_start: time = time(9, 0)
+    working_hours_end: time = time(18, 0)
+    weekdays_only: bool = True
+
+class FreeBusyBatchRequest(BaseModel):
+    queries: List[FreeBusyQuery] = Field(..., min_items=1, max_items=100)
+
+class FreeBusyResult(BaseModel):
+    user_ids: List[UUID]
+    busy_slots: List[Dict[str, datetime]]
+    available_slots: List[Dict[str, datetime]]
+
+class ConflictCheckItem(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    room: Optional[str] = Field(None, max_length=100)
+    user_id: Optional[UUID] = None  # за замовчуванням — поточний користувач
+
+class ConflictCheckRequest(BaseModel):
+    items: List[ConflictCheckItem] = Field(..., min_items=1, max_items=500)
+
+class ConflictCheckResult(BaseModel):
+    index: int
+    start_time: datetime
+    end_time: datetime
+    room: Optional[str] = None
+    conflicts: List[CalendarEventResponse]
+
+class CalendarOccurrenceResponse(CalendarEventResponse):
+    occurrence_start: Optional[datetime] = None  # початок повторення за правилом серії
+    exception_id: Optional[UUID] = None
+
+class CalendarEventExceptionCreate(BaseModel):
+    original_start: datetime
+    is_cancelled: bool = False
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    title: Optional[str] = Field(None, max_length=200)
+    description: Optional[str] = None
+    location: Optional[str] = Field(None, max_length=200)
+    room: Optional[str] = Field(None, max_length=100)
+
+class CalendarEventExceptionResponse(CalendarEventExceptionCreate):
+    id: UUID
+    event_id: UUID
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class CalendarFeedTokenResponse(BaseModel):
+    token: str
+    url: str
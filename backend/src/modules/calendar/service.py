@@ -1,18 +1,64 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, and_, or_, values, column, String, DateTime, Integer
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import selectinload
 from uuid import UUID
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from collections import defaultdict
 import json
 
 from . import models, schemas
-from src.core.exceptions import NotFoundException, DatabaseException
+from .availability import Interval, merge_busy, working_windows, find_slots
+from .recurrence import RecurrenceRule, parse_rule, iter_occurrences
+from .feed import invalidate_feed
+from src.modules.notifications.reminders import schedule_event_reminders
+from src.core.config import settings
+from src.core.exceptions import NotFoundException, DatabaseException, ConflictException, ValidationException
+from src.core.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
+# Обмеження ExcludeConstraint на переговорні
+ROOM_EXCLUSION_CONSTRAINT = "ex_calendar_events_room_span"
+
+OCCURRENCE_CACHE_PREFIX = "calendar:occurrences"
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def month_starts(start: datetime, end: datetime) -> List[datetime]:
+    """Перші дні місяців, що перетинаються з [start, end)"""
+    month = datetime(start.year, start.month, 1)
+    months = []
+    while month < end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+def occurrence_cache_key(event: models.CalendarEvent, month: datetime) -> str:
+    # updated_at у ключі: зміна серії робить старі записи недосяжними (їх прибере TTL)
+    version = int((event.updated_at or event.created_at or datetime.min).timestamp())
+    return f"{OCCURRENCE_CACHE_PREFIX}:{event.id}:{version}:{month:%Y%m}"
+
+def serialize_event(event: models.CalendarEvent) -> Dict[str, Any]:
+    data = {
+        column.key: getattr(event, column.key)
+        for column in models.CalendarEvent.__table__.columns
+        if column.key != "span"
+    }
+    for field in ("attendees", "reminders"):
+        if isinstance(data[field], str):
+            data[field] = json.loads(data[field])
+    return data
+
+# Робочі години за замовчуванням
+WORKDAY_START = time(9, 0)
+WORKDAY_END = time(18, 0)
+
 class CalendarService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -27,6 +73,24 @@ class CalendarService:
             logger.error(f"Error fetching calendar event: {e}")
             raise DatabaseException("Failed to fetch calendar event")
     
+    def _window_filter(self, start: datetime, end: datetime):
+        """Звичайні події, що перетинають вікно, та серії, які можуть дати повторення у вікні"""
+        event = models.CalendarEvent
+        return or_(
+            and_(
+                event.is_recurring.isnot(True),
+                event.span.overlaps(self._span(start, end))
+            ),
+            and_(
+                event.is_recurring.is_(True),
+                event.start_time < end,
+                or_(
+                    event.recurrence_end.is_(None),
+                    event.recurrence_end + (event.end_time - event.start_time) > start
+                )
+            )
+        )
+    
     async def get_all(
         self, 
         start_date: datetime,
@@ -34,14 +98,10 @@ class CalendarService:
         user_id: Optional[UUID] = None,
         event_type: Optional[str] = None,
         case_id: Optional[UUID] = None
-    ) -> List[models.CalendarEvent]:
+    ) -> List[Dict[str, Any]]:
+        """Події та розгорнуті повторення серій, що потрапляють у вікно"""
         try:
-            query = select(models.CalendarEvent).where(
-                and_(
-                    models.CalendarEvent.start_time >= start_date,
-                    models.CalendarEvent.end_time <= end_date
-                )
-            )
+            query = select(models.CalendarEvent).where(self._window_filter(start_date, end_date))
             
             if user_id:
                 query = query.where(models.CalendarEvent.created_by_id == user_id)
@@ -53,12 +113,228 @@ class CalendarService:
             result = await self.db.execute(
                 query.order_by(models.CalendarEvent.start_time.asc())
             )
-            return result.scalars().all()
+            events = result.scalars().all()
         except SQLAlchemyError as e:
             logger.error(f"Error fetching calendar events: {e}")
             raise DatabaseException("Failed to fetch calendar events")
+        return await self.expand_occurrences(events, start_date, end_date)
+    
+    def _rule_for(self, event: models.CalendarEvent) -> Optional[RecurrenceRule]:
+        if not event.is_recurring or not event.recurrence_pattern:
+            return None
+        try:
+            return parse_rule(event.recurrence_pattern, event.recurrence_end)
+        except ValueError as e:
+            # Серія з непідтримуваним правилом показується як одна подія
+            logger.warning(f"Unsupported recurrence for event {event.id}: {e}")
+            return None
+    
+    async def _series_starts(
+        self,
+        series: List[Tuple[models.CalendarEvent, RecurrenceRule]],
+        start: datetime,
+        end: datetime
+    ) -> Dict[UUID, List[datetime]]:
+        """Початки повторень серій за місяцями вікна з кешем у Redis (event, month)"""
+        requests = []
+        for event, rule in series:
+            duration = event.end_time - event.start_time
+            for month in month_starts(start - duration, end):
+                requests.append((event, rule, month))
+        if not requests:
+            return {}
+        
+        keys = [occurrence_cache_key(event, month) for event, _, month in requests]
+        redis = get_redis()
+        try:
+            cached = await redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"Occurrence cache unavailable: {e}")
+            redis, cached = None, [None] * len(keys)
+        
+        starts: Dict[UUID, List[datetime]] = defaultdict(list)
+        misses = {}
+        for key, hit, (event, rule, month) in zip(keys, cached, requests):
+            if hit is not None:
+                month_occurrences = [datetime.fromisoformat(value) for value in json.loads(hit)]
+            else:
+                month_occurrences = list(iter_occurrences(event.start_time, rule, month, next_month(month)))
+                misses[key] = json.dumps([value.isoformat() for value in month_occurrences])
+            starts[event.id].extend(month_occurrences)
+        
+        if misses and redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key, value in misses.items():
+                        pipe.set(key, value, ex=settings.CALENDAR_OCCURRENCE_CACHE_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Failed to cache occurrences: {e}")
+        return starts
+    
+    async def _get_exceptions(
+        self,
+        event_ids: List[UUID],
+        start: datetime,
+        end: datetime
+    ) -> List[models.CalendarEventException]:
+        exception = models.CalendarEventException
+        try:
+            result = await self.db.execute(
+                select(exception).where(
+                    and_(
+                        exception.event_id.in_(event_ids),
+                        or_(
+                            and_(exception.original_start >= start, exception.original_start < end),
+                            and_(exception.start_time < end, exception.end_time > start)
+                        )
+                    )
+                )
+            )
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching calendar event exceptions: {e}")
+            raise DatabaseException("Failed to fetch calendar event exceptions")
+    
+    async def expand_occurrences(
+        self,
+        events: List[models.CalendarEvent],
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Розгортає серії у вікно [start, end) з урахуванням скасувань і змін"""
+        occurrences = []
+        series = []
+        for event in events:
+            rule = self._rule_for(event)
+            if rule is None:
+                if event.start_time < end and event.end_time > start:
+                    occurrences.append(serialize_event(event))
+            else:
+                series.append((event, rule))
+        if not series:
+            return occurrences
+        
+        longest = max(event.end_time - event.start_time for event, _ in series)
+        series_starts = await self._series_starts(series, start, end)
+        exceptions = {
+            (item.event_id, item.original_start): item
+            for item in await self._get_exceptions([event.id for event, _ in series], start - longest, end)
+        }
+        
+        def add_occurrence(event, original_start, exception=None):
+            base = serialize_event(event)
+            base["occurrence_start"] = original_start
+            occurrence_start = original_start
+            occurrence_end = original_start + (event.end_time - event.start_time)
+            if exception is not None:
+                base["exception_id"] = exception.id
+                if exception.start_time is not None:
+                    # Перенесене повторення без нового кінця зберігає тривалість
+                    occurrence_end = exception.start_time + (occurrence_end - occurrence_start)
+                    occurrence_start = exception.start_time
+                occurrence_end = exception.end_time or occurrence_end
+                for field in ("title", "description", "location", "room"):
+                    if getattr(exception, field) is not None:
+                        base[field] = getattr(exception, field)
+            if occurrence_start < end and occurrence_end > start:
+                base["start_time"] = occurrence_start
+                base["end_time"] = occurrence_end
+                occurrences.append(base)
+        
+        for event, _ in series:
+            seen = set()
+            for original_start in series_starts.get(event.id, []):
+                seen.add(original_start)
+                exception = exceptions.get((event.id, original_start))
+                if exception is not None and exception.is_cancelled:
+                    continue
+                add_occurrence(event, original_start, exception)
+            # Повторення, перенесені у вікно з-поза нього
+            for (event_id, original_start), exception in exceptions.items():
+                if event_id == event.id and original_start not in seen and not exception.is_cancelled:
+                    add_occurrence(event, original_start, exception)
+        
+        occurrences.sort(key=lambda item: item["start_time"])
+        return occurrences
+    
+    async def add_exception(
+        self,
+        event_id: UUID,
+        exception_data: schemas.CalendarEventExceptionCreate,
+        user_id: UUID
+    ) -> models.CalendarEventException:
+        """Скасування або зміна одного повторення (повторний виклик перезаписує)"""
+        event = await self.get_by_id(event_id)
+        # Чужа подія — як відсутня
+        if not event or event.created_by_id != user_id:
+            raise NotFoundException("Calendar event")
+        rule = self._rule_for(event)
+        original_start = exception_data.original_start
+        if rule is None or not any(iter_occurrences(event.start_time, rule, original_start, original_start + timedelta(microseconds=1))):
+            raise ValidationException("original_start is not an occurrence of this event")
+        
+        exception_values = exception_data.dict()
+        duration = event.end_time - event.start_time
+        if exception_values["start_time"] is not None and exception_values["end_time"] is None:
+            exception_values["end_time"] = exception_values["start_time"] + duration
+        if exception_values["end_time"] is not None:
+            if exception_values["start_time"] is None:
+                # Зберігаємо обидві межі — інакше перенесення не знайде вибірка за перетином
+                exception_values["start_time"] = original_start
+            if exception_values["end_time"] <= exception_values["start_time"]:
+                raise ValidationException("end_time must be after start_time")
+        try:
+            result = await self.db.execute(
+                pg_insert(models.CalendarEventException)
+                .values(event_id=event_id, **exception_values)
+                .on_conflict_do_update(
+                    constraint="uq_calendar_event_exceptions_occurrence",
+                    set_={**exception_values, "updated_at": datetime.utcnow()}
+                )
+                .returning(models.CalendarEventException)
+            )
+            exception = result.scalar_one()
+            await self.db.commit()
+            await invalidate_feed(event.created_by_id, "events")
+            return exception
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error saving calendar event exception: {e}")
+            raise DatabaseException("Failed to save calendar event exception")
+    
+    async def delete_exception(self, event_id: UUID, exception_id: UUID, user_id: UUID) -> bool:
+        try:
+            result = await self.db.execute(
+                select(models.CalendarEventException)
+                .options(selectinload(models.CalendarEventException.event))
+                .where(
+                    and_(
+                        models.CalendarEventException.id == exception_id,
+                        models.CalendarEventException.event_id == event_id
+                    )
+                )
+            )
+            exception = result.scalar_one_or_none()
+            if not exception or exception.event.created_by_id != user_id:
+                return False
+            owner_id = exception.event.created_by_id
+            await self.db.delete(exception)
+            await self.db.commit()
+            await invalidate_feed(owner_id, "events")
+            return True
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error deleting calendar event exception: {e}")
+            raise DatabaseException("Failed to delete calendar event exception")
     
     async def create(self, event_data: schemas.CalendarEventCreate, user_id: UUID) -> models.CalendarEvent:
+        if event_data.is_recurring:
+            try:
+                parse_rule(event_data.recurrence_pattern, event_data.recurrence_end)
+            except ValueError as e:
+                raise ValidationException(f"Invalid recurrence pattern: {e}")
+        
         try:
             # Convert lists to JSON strings
             attendees_json = json.dumps(event_data.attendees or []) if event_data.attendees else None
@@ -74,64 +350,170 @@ class CalendarService:
             self.db.add(db_event)
             await self.db.commit()
             await self.db.refresh(db_event)
+            await invalidate_feed(user_id, "events")
+            await schedule_event_reminders(db_event)
             return db_event
+        except IntegrityError as e:
+            await self.db.rollback()
+            if ROOM_EXCLUSION_CONSTRAINT in str(e.orig):
+                raise ConflictException(f"Room {event_data.room} is already booked for this time")
+            logger.error(f"Calendar event integrity error: {e}")
+            raise DatabaseException("Failed to create calendar event")
         except SQLAlchemyError as e:
             await self.db.rollback()
             logger.error(f"Error creating calendar event: {e}")
             raise DatabaseException("Failed to create calendar event")
     
+    @staticmethod
+    def _span(start: datetime, end: datetime):
+        return func.tsrange(start, end, "[)")
+    
     async def check_conflicts(self, start_time: datetime, end_time: datetime, user_id: UUID) -> List[models.CalendarEvent]:
         try:
             result = await self.db.execute(
-                select(models.CalendarEvent).where(
+                select(models.CalendarEvent)
+                .where(
                     and_(
                         models.CalendarEvent.created_by_id == user_id,
-                        models.CalendarEvent.status == "scheduled",
-                        models.CalendarEvent.start_time < end_time,
-                        models.CalendarEvent.end_time > start_time
+                        models.CalendarEvent.status != "cancelled",
+                        models.CalendarEvent.span.overlaps(self._span(start_time, end_time))
                     )
                 )
+                .order_by(models.CalendarEvent.start_time.asc())
             )
             return result.scalars().all()
         except SQLAlchemyError as e:
             logger.error(f"Error checking calendar conflicts: {e}")
             raise DatabaseException("Failed to check calendar conflicts")
     
-    async def get_available_slots(self, date: datetime, user_id: UUID, duration_minutes: int = 60) -> List[Dict[str, datetime]]:
+    async def check_conflicts_batch(
+        self,
+        items: List[schemas.ConflictCheckItem],
+        user_id: UUID
+    ) -> List[Dict[str, Any]]:
+        """Конфлікти для багатьох запропонованих подій (напр. серії) одним запитом.
+
+        Запропоновані проміжки передаються як VALUES і з'єднуються з подіями
+        через ``&&`` — і по користувачу, і по переговорній — з GiST-індексами.
+        """
+        proposed = values(
+            column("idx", Integer),
+            column("user_id", PG_UUID(as_uuid=True)),
+            column("room", String),
+            column("start_time", DateTime),
+            column("end_time", DateTime),
+            name="proposed"
+        ).data([
+            (idx, item.user_id or user_id, item.room, item.start_time, item.end_time)
+            for idx, item in enumerate(items)
+        ])
+        event = models.CalendarEvent
         try:
-            # Get working hours (9:00-18:00 by default)
-            start_of_day = date.replace(hour=9, minute=0, second=0, microsecond=0)
-            end_of_day = date.replace(hour=18, minute=0, second=0, microsecond=0)
-            
-            # Get busy events for the day
-            busy_events = await self.get_all(start_of_day, end_of_day, user_id)
-            
-            # Generate available slots
-            available_slots = []
-            current_time = start_of_day
-            duration = timedelta(minutes=duration_minutes)
-            
-            while current_time + duration <= end_of_day:
-                slot_end = current_time + duration
-                slot_available = True
-                
-                # Check if slot conflicts with any event
-                for event in busy_events:
-                    if current_time < event.end_time and slot_end > event.start_time:
-                        slot_available = False
-                        current_time = event.end_time
-                        break
-                
-                if slot_available:
-                    available_slots.append({
-                        "start": current_time,
-                        "end": slot_end
-                    })
-                    current_time = slot_end
-                else:
-                    current_time = slot_end
-            
-            return available_slots
+            result = await self.db.execute(
+                select(proposed.c.idx, event)
+                .join(
+                    event,
+                    and_(
+                        event.status != "cancelled",
+                        event.span.overlaps(self._span(proposed.c.start_time, proposed.c.end_time)),
+                        or_(
+                            event.created_by_id == proposed.c.user_id,
+                            and_(proposed.c.room.isnot(None), event.room == proposed.c.room)
+                        )
+                    )
+                )
+                .order_by(proposed.c.idx, event.start_time)
+            )
+            conflicts: Dict[int, List[models.CalendarEvent]] = defaultdict(list)
+            for idx, conflicting in result.all():
+                conflicts[idx].append(conflicting)
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking batch calendar conflicts: {e}")
+            raise DatabaseException("Failed to check calendar conflicts")
+        
+        return [
+            {
+                "index": idx,
+                "start_time": item.start_time,
+                "end_time": item.end_time,
+                "room": item.room,
+                "conflicts": conflicts.get(idx, [])
+            }
+            for idx, item in enumerate(items)
+        ]
+    
+    async def get_busy_intervals(
+        self,
+        user_ids: List[UUID],
+        start: datetime,
+        end: datetime
+    ) -> Dict[UUID, List[Interval]]:
+        """Зайнятість кількох користувачів одним запитом (з повтореннями серій), відсортована за початком"""
+        try:
+            result = await self.db.execute(
+                select(models.CalendarEvent)
+                .where(
+                    and_(
+                        models.CalendarEvent.created_by_id.in_(user_ids),
+                        models.CalendarEvent.status != "cancelled",
+                        self._window_filter(start, end)
+                    )
+                )
+                .order_by(models.CalendarEvent.start_time.asc())
+            )
+            events = result.scalars().all()
         except SQLAlchemyError as e:
-            logger.error(f"Error getting available slots: {e}")
-            raise DatabaseException("Failed to get available slots")
\ No newline at end of file
+            logger.error(f"Error fetching busy intervals: {e}")
+            raise DatabaseException("Failed to fetch busy intervals")
+        
+        busy: Dict[UUID, List[Interval]] = defaultdict(list)
+        for occurrence in await self.expand_occurrences(events, start, end):
+            busy[occurrence["created_by_id"]].append((occurrence["start_time"], occurrence["end_time"]))
+        return busy
+    
+    async def find_common_slots(
+        self,
+        queries: List[schemas.FreeBusyQuery]
+    ) -> List[Dict[str, Any]]:
+        """Спільні вільні слоти учасників для пакета запитів (один запит до БД)"""
+        user_ids = list({user_id for query in queries for user_id in query.user_ids})
+        busy_by_user = await self.get_busy_intervals(
+            user_ids,
+            min(query.start for query in queries),
+            max(query.end for query in queries)
+        )
+        
+        results = []
+        for query in queries:
+            busy = merge_busy(*(busy_by_user.get(user_id, []) for user_id in query.user_ids))
+            windows = working_windows(
+                query.start,
+                query.end,
+                query.working_hours_start,
+                query.working_hours_end,
+                query.weekdays_only
+            )
+            slots = find_slots(
+                busy,
+                windows,
+                timedelta(minutes=query.duration_minutes),
+                limit=query.limit,
+                step=timedelta(minutes=query.step_minutes) if query.step_minutes else None
+            )
+            results.append({
+                "user_ids": query.user_ids,
+                "busy_slots": [
+                    {"start": busy_start, "end": busy_end}
+                    for busy_start, busy_end in busy
+                    if busy_start < query.end and busy_end > query.start
+                ],
+                "available_slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end in slots]
+            })
+        return results
+    
+    async def get_available_slots(self, date: datetime, user_id: UUID, duration_minutes: int = 60) -> List[Dict[str, datetime]]:
+        day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        busy_by_user = await self.get_busy_intervals([user_id], day_start, day_start + timedelta(days=1))
+        windows = working_windows(day_start, day_start + timedelta(days=1), WORKDAY_START, WORKDAY_END, weekdays_only=False)
+        slots = find_slots(merge_busy(busy_by_user.get(user_id, [])), windows, timedelta(minutes=duration_minutes))
+        return [{"start": slot_start, "end": slot_end} for slot_start, slot_end in slots]
@@ -46,6 +46,8 @@ class Document(Base):
     file_path = Column(String(500), nullable=False)
     file_size = Column(String(20))  # у байтах
     file_type = Column(String(50))  # MIME type
+    file_sha256 = Column(String(64))  # hex, рахується під час завантаження
+    file_verified_at = Column(DateTime)  # коли вміст звірено з file_sha256
     version = Column(String(20), default="1.0")
     
     # Метадані
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
+from src.core.config import settings
 from src.core.database import get_db
 from src.core.security import get_current_user
 from . import service, schemas
@@ -19,6 +20,61 @@ async def create_document(
     document_service = service.DocumentService(db)
     return await document_service.create(document, current_user.id)
 
+@router.post("/upload", response_model=schemas.DocumentResponse, status_code=status.HTTP_201_CREATED)
+async def upload_document(
+    request: Request,
+    case_id: UUID,
+    filename: str = Query(..., max_length=255),
+    title: Optional[str] = Query(None, max_length=200),
+    description: Optional[str] = None,
+    type: schemas.DocumentType = schemas.DocumentType.OTHER,
+    is_confidential: bool = False,
+    content_type: Optional[str] = Header(None),
+    content_length: Optional[int] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Файл — сирим тілом запиту (не multipart/form-data), метадані — у query.
+
+    Тіло читається потоком і одразу передається в MinIO частинами, без
+    буферизації всього файлу в пам'яті чи на диску воркера.
+    """
+    if content_length is not None and content_length > settings.UPLOAD_MAX_FILE_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    metadata = schemas.DocumentBase(
+        case_id=case_id,
+        title=title or filename[:200],
+        description=description,
+        type=type,
+        is_confidential=is_confidential
+    )
+    document_service = service.DocumentService(db)
+    return await document_service.upload_document(
+        request.stream(), filename, content_type, metadata, current_user.id
+    )
+
+@router.post("/upload-intent", response_model=schemas.DocumentUploadIntent, status_code=status.HTTP_201_CREATED)
+async def create_upload_intent(
+    intent: schemas.DocumentUploadIntentCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Presigned URL (або URL частин multipart upload) для завантаження файлу напряму в MinIO"""
+    document_service = service.DocumentService(db)
+    return await document_service.create_upload_intent(intent, current_user.id)
+
+@router.post("/{document_id}/complete", response_model=schemas.DocumentResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    document_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    document_service = service.DocumentService(db)
+    db_document = await document_service.complete_upload(document_id, current_user.id)
+    if not db_document:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return db_document
+
 @router.get("/", response_model=List[schemas.DocumentResponse])
 async def list_documents(
     skip: int = 0,
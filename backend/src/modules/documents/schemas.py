@@ -40,6 +40,26 @@ class DocumentCreate(DocumentBase):
     file_size: str = Field(..., max_length=20)
     file_type: str = Field(..., max_length=50)
 
+class DocumentUploadIntentCreate(DocumentBase):
+    file_name: str = Field(..., min_length=1, max_length=255)
+    file_size: int = Field(..., ge=0)
+    content_type: str = Field("application/octet-stream", max_length=100)
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$")
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+class DocumentUploadIntent(BaseModel):
+    """Куди клієнт завантажує файл: один PUT (url) або частини (parts по part_size байт)"""
+    document_id: UUID
+    object_name: str
+    expires_at: datetime
+    url: Optional[str] = None
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    parts: List[UploadPartUrl] = []
+
 class DocumentUpdate(BaseModel):
     title: Optional[str] = Field(None, max_length=200)
     description: Optional[str] = None
@@ -55,6 +75,8 @@ class DocumentResponse(DocumentBase):
     file_name: str
     file_size: str
     file_type: str
+    file_sha256: Optional[str] = None
+    file_verified_at: Optional[datetime] = None
     version: str
     created_date: datetime
     modified_date: datetime
@@ -1,69 +1,448 @@
 # backend/src/modules/documents/service.py
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from minio import Minio
+from typing import Any, AsyncIterator, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, cast, BigInteger
+from sqlalchemy.exc import SQLAlchemyError
 from minio.error import S3Error
-import uuid
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+import asyncio
+import logging
 import os
 
-from ...core.config import settings
-from ...core.database import BaseRepository
-from .models import Document
-from .schemas import DocumentCreate, DocumentUpdate
+from src.core.config import settings
+from src.core.exceptions import (
+    NotFoundException, DatabaseException, ExternalServiceException,
+    ValidationException, ConflictException, PayloadTooLargeException
+)
+from src.core.storage import (
+    get_minio_client, stream_to_storage, remove_object, StoredObject,
+    presigned_put_url, start_multipart_upload, presigned_part_urls, list_uploaded_parts, complete_uploaded_parts, object_sha256
+)
+from src.modules.notifications.delivery import NotificationDelivery
+from src.modules.notifications.enums import NotificationType, NotificationPriority
+from src.modules.cases.models import Case
+from . import models, schemas, uploads
+
+logger = logging.getLogger(__name__)
+
+OBJECT_PREFIX = "documents"
+
+def object_key(case_id: UUID, file_name: str) -> str:
+    """Унікальний ключ об'єкта; оригінальна назва зберігається в file_name"""
+    return f"{OBJECT_PREFIX}/{case_id}/{uuid4()}{os.path.splitext(file_name)[1].lower()[:10]}"
+
+def clean_file_name(file_name: str) -> str:
+    # Лише ім'я без шляху клієнта (C:\\..., ../)
+    return os.path.basename(file_name.replace("\\", "/")).strip()[:255] or "file"
 
 class DocumentService:
     """Сервіс для роботи з документами"""
-    
-    def __init__(self, repository: BaseRepository):
-        self.repository = repository
-        self.minio_client = Minio(
-            settings.MINIO_ENDPOINT.replace('http://', '').replace('https://', ''),
-            access_key=settings.MINIO_ACCESS_KEY,
-            secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_SECURE
-        )
-    
-    def upload_document(self, db: Session, file, case_id: int, user_id: int):
-        """Завантаження документа"""
-        try:
-            # Генерація унікального імені файлу
-            file_extension = os.path.splitext(file.filename)[1]
-            file_name = f"{uuid.uuid4()}{file_extension}"
-            
-            # Завантаження в MinIO
-            file_size = len(file.file.read())
-            file.file.seek(0)  # Reset file pointer
-            
-            self.minio_client.put_object(
-                settings.MINIO_BUCKET,
-                file_name,
-                file.file,
-                file_size,
-                file.content_type
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _client_id(self, case_id: UUID):
+        result = await self.db.execute(select(Case.client_id).where(Case.id == case_id))
+        client_id = result.scalar_one_or_none()
+        if client_id is None:
+            raise NotFoundException("Case")
+        return client_id
+
+    def _new_document(self, data: schemas.DocumentBase, client_id, user_id: UUID, **file_fields: Any) -> models.Document:
+        values = data.dict(include=set(schemas.DocumentBase.model_fields))
+        values["type"] = models.DocumentType(data.type.value)
+        values["status"] = models.DocumentStatus(data.status.value)
+        return models.Document(**values, client_id=client_id, created_by_id=user_id, **file_fields)
+
+    async def get_by_id(self, document_id: UUID) -> Optional[models.Document]:
+        try:
+            result = await self.db.execute(
+                select(models.Document).where(models.Document.id == document_id)
+            )
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching document: {e}")
+            raise DatabaseException("Failed to fetch document")
+
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        case_id: Optional[UUID] = None,
+        client_id: Optional[UUID] = None,
+        type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[models.Document]:
+        try:
+            query = select(models.Document)
+            if case_id:
+                query = query.where(models.Document.case_id == case_id)
+            if client_id:
+                query = query.where(models.Document.client_id == client_id)
+            if type:
+                query = query.where(models.Document.type == models.DocumentType(type))
+            if status:
+                query = query.where(models.Document.status == models.DocumentStatus(status))
+            result = await self.db.execute(
+                query.order_by(models.Document.created_at.desc()).offset(skip).limit(limit)
             )
-            
-            # Створення запису в БД
-            document_data = DocumentCreate(
-                case_id=case_id,
-                uploaded_by=user_id,
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching documents: {e}")
+            raise DatabaseException("Failed to fetch documents")
+
+    async def create(self, document_data: schemas.DocumentCreate, user_id: UUID) -> models.Document:
+        """Запис про документ без завантаження файлу (файл уже у сховищі)"""
+        try:
+            db_document = self._new_document(
+                document_data,
+                await self._client_id(document_data.case_id),
+                user_id,
+                file_name=document_data.file_name,
+                file_path=document_data.file_name,
+                file_size=document_data.file_size,
+                file_type=document_data.file_type
+            )
+            self.db.add(db_document)
+            await self.db.commit()
+            await self.db.refresh(db_document)
+            return db_document
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error creating document: {e}")
+            raise DatabaseException("Failed to create document")
+
+    async def upload_document(
+        self,
+        chunks: AsyncIterator[bytes],
+        file_name: str,
+        content_type: Optional[str],
+        metadata: schemas.DocumentBase,
+        user_id: UUID
+    ) -> models.Document:
+        """Потокове завантаження файлу в MinIO і створення запису про документ.
+
+        Справа перевіряється до передачі файлу; якщо запис у БД не вдався,
+        завантажений об'єкт видаляється.
+        """
+        try:
+            client_id = await self._client_id(metadata.case_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking case for upload: {e}")
+            raise DatabaseException("Failed to upload document")
+
+        file_name = clean_file_name(file_name)
+        content_type = (content_type or "application/octet-stream").split(";")[0].strip()
+        try:
+            stored = await stream_to_storage(chunks, object_key(metadata.case_id, file_name), content_type)
+        except S3Error as e:
+            logger.error(f"Error uploading document {file_name}: {e}")
+            raise ExternalServiceException("Failed to store document")
+        return await self._save_uploaded(metadata, client_id, user_id, file_name, content_type, stored)
+
+    async def _save_uploaded(
+        self,
+        metadata: schemas.DocumentBase,
+        client_id,
+        user_id: UUID,
+        file_name: str,
+        content_type: str,
+        stored: StoredObject
+    ) -> models.Document:
+        try:
+            db_document = self._new_document(
+                metadata,
+                client_id,
+                user_id,
                 file_name=file_name,
-                original_name=file.filename,
-                file_size=file_size,
-                mime_type=file.content_type
+                file_path=stored.object_name,
+                file_size=str(stored.size),
+                file_type=content_type[:50],
+                file_sha256=stored.sha256,
+                # Хеш порахований з тих самих байтів, що пішли в сховище
+                file_verified_at=datetime.utcnow()
+            )
+            self.db.add(db_document)
+            await self.db.commit()
+            await self.db.refresh(db_document)
+            return db_document
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error saving uploaded document {stored.object_name}: {e}")
+            try:
+                await remove_object(stored.object_name)
+            except S3Error as cleanup_error:
+                logger.warning(f"Orphaned document object {stored.object_name}: {cleanup_error}")
+            raise DatabaseException("Failed to create document")
+
+    async def create_upload_intent(
+        self,
+        intent_data: schemas.DocumentUploadIntentCreate,
+        user_id: UUID
+    ) -> Dict[str, Any]:
+        """Presigned URL для прямого завантаження файлу в MinIO"""
+        if intent_data.file_size > settings.UPLOAD_DIRECT_MAX_FILE_SIZE:
+            raise PayloadTooLargeException(f"File exceeds {settings.UPLOAD_DIRECT_MAX_FILE_SIZE} bytes")
+        if uploads.part_count(intent_data.file_size) > uploads.MAX_PARTS:
+            raise ValidationException(f"File requires more than {uploads.MAX_PARTS} parts")
+        try:
+            await self._client_id(intent_data.case_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking case for upload intent: {e}")
+            raise DatabaseException("Failed to prepare upload")
+
+        document_id = uuid4()
+        file_name = clean_file_name(intent_data.file_name)
+        content_type = intent_data.content_type.split(";")[0].strip() or "application/octet-stream"
+        object_name = object_key(intent_data.case_id, file_name)
+        expires = settings.UPLOAD_INTENT_EXPIRES
+        expires_at = datetime.utcnow() + timedelta(seconds=expires)
+        result: Dict[str, Any] = {"document_id": document_id, "object_name": object_name, "expires_at": expires_at}
+        upload_id = None
+        try:
+            if uploads.is_multipart(intent_data.file_size):
+                upload_id = await asyncio.to_thread(start_multipart_upload, object_name, content_type)
+                urls = await asyncio.to_thread(
+                    presigned_part_urls, object_name, upload_id, uploads.part_count(intent_data.file_size), expires
+                )
+                result.update(
+                    upload_id=upload_id,
+                    part_size=settings.UPLOAD_DIRECT_PART_SIZE,
+                    parts=[{"part_number": number, "url": url} for number, url in enumerate(urls, start=1)]
+                )
+            else:
+                result["url"] = await asyncio.to_thread(presigned_put_url, object_name, expires)
+            await uploads.save_intent(document_id, {
+                "user_id": str(user_id),
+                "metadata": intent_data.model_dump(mode="json", include=set(schemas.DocumentBase.model_fields)),
+                "file_name": file_name,
+                "content_type": content_type,
+                "size": intent_data.file_size,
+                "sha256": intent_data.sha256.lower(),
+                "object_name": object_name,
+                "upload_id": upload_id,
+            }, uploads.to_epoch(expires_at))
+        except S3Error as e:
+            logger.error(f"Error preparing upload {object_name}: {e}")
+            raise ExternalServiceException("Failed to prepare upload")
+        except Exception as e:
+            logger.error(f"Error saving upload intent {document_id}: {e}")
+            raise ExternalServiceException("Failed to prepare upload")
+        return result
+
+    async def complete_upload(self, document_id: UUID, user_id: UUID) -> Optional[models.Document]:
+        """Звіряє завантажений клієнтом об'єкт із наміром і створює запис про документ"""
+        intent = await uploads.load_intent(document_id)
+        if not intent or intent["user_id"] != str(user_id):
+            return None
+        if not await uploads.lock_intent(document_id):
+            raise ConflictException("Upload is already being completed")
+        # Між читанням і блокуванням намір міг забрати прибиральник прострочених
+        if await uploads.load_intent(document_id) is None:
+            await uploads.unlock_intent(document_id)
+            return None
+
+        object_name = intent["object_name"]
+        try:
+            if intent.get("upload_id"):
+                try:
+                    parts = await asyncio.to_thread(list_uploaded_parts, object_name, intent["upload_id"])
+                except S3Error as e:
+                    # NoSuchUpload — уже завершено попереднім викликом, що не дійшов до запису в БД
+                    if e.code != "NoSuchUpload":
+                        raise
+                else:
+                    # Завершення з неповного набору частин втратило б завантаження — клієнт докачує їх
+                    missing = uploads.missing_parts(intent["size"], {part.part_number: part.size for part in parts})
+                    if missing:
+                        shown = ", ".join(str(number) for number in missing[:20])
+                        raise ValidationException(
+                            f"Parts missing or incomplete: {shown}" + (" ..." if len(missing) > 20 else "")
+                        )
+                    await asyncio.to_thread(complete_uploaded_parts, object_name, intent["upload_id"], parts)
+            try:
+                stat = await asyncio.to_thread(get_minio_client().stat_object, settings.MINIO_BUCKET, object_name)
+            except S3Error as e:
+                if e.code in ("NoSuchKey", "NoSuchObject"):
+                    raise ValidationException("File has not been uploaded")
+                raise
+        except S3Error as e:
+            await uploads.unlock_intent(document_id)
+            logger.error(f"Error completing upload {object_name}: {e}")
+            raise ExternalServiceException("Failed to complete upload")
+        except ValidationException:
+            # Клієнт може дозавантажити частини і повторити
+            await uploads.unlock_intent(document_id)
+            raise
+
+        if stat.size != intent["size"]:
+            await uploads.drop_intent(document_id)
+            try:
+                await remove_object(object_name)
+            except S3Error as e:
+                logger.warning(f"Failed to remove mismatched upload {object_name}: {e}")
+            raise ValidationException(f"Uploaded size {stat.size} does not match declared {intent['size']}")
+
+        metadata = schemas.DocumentBase(**intent["metadata"])
+        try:
+            db_document = self._new_document(
+                metadata,
+                await self._client_id(metadata.case_id),
+                user_id,
+                id=document_id,
+                file_name=intent["file_name"],
+                file_path=object_name,
+                file_size=str(stat.size),
+                file_type=intent["content_type"][:50],
+                # Заявлений хеш; file_verified_at з'явиться після перевірки вмісту воркером
+                file_sha256=intent["sha256"]
             )
-            
-            return self.repository.create(db, document_data)
-            
+            self.db.add(db_document)
+            await self.db.commit()
+            await self.db.refresh(db_document)
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            await uploads.unlock_intent(document_id)
+            logger.error(f"Error creating document for upload {object_name}: {e}")
+            raise DatabaseException("Failed to create document")
+
+        await uploads.drop_intent(document_id)
+        self._schedule_verification(document_id)
+        return db_document
+
+    @staticmethod
+    def _schedule_verification(document_id: UUID) -> None:
+        from src.celery.tasks import verify_document_checksum
+        try:
+            verify_document_checksum.delay(str(document_id))
+        except Exception as e:
+            # Документ лишається неперевіреним (file_verified_at порожній)
+            logger.warning(f"Failed to schedule checksum verification for {document_id}: {e}")
+
+    async def verify_checksum(self, document_id: UUID) -> Optional[bool]:
+        """SHA-256 вмісту проти file_sha256; невідповідний документ видаляється"""
+        db_document = await self.get_by_id(document_id)
+        if not db_document or db_document.file_verified_at or not db_document.file_sha256:
+            return None
+        try:
+            actual = await asyncio.to_thread(object_sha256, db_document.file_path)
         except S3Error as e:
-            raise Exception(f"Error uploading document: {e}")
-    
-    def get_document_url(self, document: Document, expires: int = 3600) -> str:
-        """Отримання URL для доступу до документа"""
+            logger.error(f"Error reading document {document_id} for verification: {e}")
+            raise ExternalServiceException("Failed to verify document")
+        if actual == db_document.file_sha256:
+            try:
+                db_document.file_verified_at = datetime.utcnow()
+                await self.db.commit()
+            except SQLAlchemyError as e:
+                await self.db.rollback()
+                logger.error(f"Error marking document {document_id} verified: {e}")
+                raise DatabaseException("Failed to verify document")
+            return True
+        logger.error(f"Document {document_id} checksum mismatch: declared {db_document.file_sha256}, actual {actual}")
+        await self._reject_upload(db_document)
+        return False
+
+    async def _reject_upload(self, db_document: models.Document) -> None:
+        user_id, title = db_document.created_by_id, db_document.title
+        await self.delete(db_document.id)
+        delivery = NotificationDelivery(self.db)
+        now = datetime.utcnow()
+        try:
+            await delivery.stage([{
+                "id": uuid4(),
+                "user_id": user_id,
+                "type": NotificationType.IN_APP,
+                "title": f"Документ «{title}» відхилено"[:200],
+                "message": "Вміст завантаженого файлу не збігається із заявленою контрольною сумою. Завантажте файл повторно.",
+                "priority": NotificationPriority.HIGH,
+                "related_entity_type": "document",
+                "related_entity_id": None,
+                "created_at": now,
+                "updated_at": now,
+            }], now)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error notifying about rejected document: {e}")
+            return
+        await delivery.after_commit()
+
+    async def update(self, document_id: UUID, document_data: schemas.DocumentUpdate) -> Optional[models.Document]:
+        try:
+            db_document = await self.get_by_id(document_id)
+            if not db_document:
+                return None
+            for field, value in document_data.dict(exclude_unset=True).items():
+                if field == "status" and value is not None:
+                    value = models.DocumentStatus(value.value)
+                setattr(db_document, field, value)
+            await self.db.commit()
+            await self.db.refresh(db_document)
+            return db_document
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error updating document: {e}")
+            raise DatabaseException("Failed to update document")
+
+    async def delete(self, document_id: UUID) -> bool:
+        try:
+            db_document = await self.get_by_id(document_id)
+            if not db_document:
+                return False
+            file_path = db_document.file_path
+            await self.db.delete(db_document)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error deleting document: {e}")
+            raise DatabaseException("Failed to delete document")
+        if file_path and file_path.startswith(f"{OBJECT_PREFIX}/"):
+            try:
+                await remove_object(file_path)
+            except S3Error as e:
+                logger.warning(f"Failed to remove document object {file_path}: {e}")
+        return True
+
+    async def get_stats(self) -> Dict[str, Any]:
+        try:
+            result = await self.db.execute(
+                select(
+                    models.Document.type,
+                    models.Document.status,
+                    func.count(),
+                    func.coalesce(func.sum(cast(models.Document.file_size, BigInteger)), 0)
+                ).group_by(models.Document.type, models.Document.status)
+            )
+            by_type: Dict[str, int] = {}
+            by_status: Dict[str, int] = {}
+            total = total_size = 0
+            for doc_type, doc_status, count, size in result.all():
+                type_key = doc_type.value if doc_type else models.DocumentType.OTHER.value
+                status_key = doc_status.value if doc_status else models.DocumentStatus.DRAFT.value
+                by_type[type_key] = by_type.get(type_key, 0) + count
+                by_status[status_key] = by_status.get(status_key, 0) + count
+                total += count
+                total_size += size
+            return {
+                "total_documents": total,
+                "by_type": by_type,
+                "by_status": by_status,
+                "total_size": str(total_size)
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting document stats: {e}")
+            raise DatabaseException("Failed to get document statistics")
+
+    async def get_document_url(self, document: models.Document, expires: int = 3600) -> str:
+        """Отримання тимчасового URL для доступу до документа"""
         try:
-            return self.minio_client.presigned_get_object(
+            return await asyncio.to_thread(
+                get_minio_client().presigned_get_object,
                 settings.MINIO_BUCKET,
-                document.file_name,
+                document.file_path,
                 expires=timedelta(seconds=expires)
             )
         except S3Error as e:
-            raise Exception(f"Error generating document URL: {e}")
\ No newline at end of file
+            logger.error(f"Error generating document URL: {e}")
+            raise ExternalServiceException("Failed to generate document URL")
@@ -0,0 +1,121 @@
+"""Пряме завантаження документів у MinIO за presigned URL.
+
+1. ``POST /documents/upload-intent`` — клієнт заявляє назву, розмір і SHA-256
+   і отримує URL для PUT (або для кожної частини multipart upload).
+2. Клієнт завантажує файл напряму в MinIO, повз API та nginx.
+3. ``POST /documents/{id}/complete`` — бекенд завершує multipart upload,
+   HEAD-запитом звіряє розмір і створює запис ``Document``.
+
+HEAD не може засвідчити SHA-256 довільного (особливо multipart) об'єкта,
+тому вміст звіряється з заявленим хешем фоновим завданням у воркері —
+до того ``file_verified_at`` порожній. Невикористані наміри після
+закінчення строку прибирає ``sweep_expired`` разом із завантаженими даними.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import asyncio
+import json
+import logging
+
+from minio.error import S3Error
+
+from src.core.config import settings
+from src.core.redis import get_redis
+from src.core.storage import abort_multipart_upload, remove_object
+
+logger = logging.getLogger(__name__)
+
+INTENTS_KEY = "documents:upload:intents"
+EXPIRY_KEY = "documents:upload:expiry"
+LOCK_PREFIX = "documents:upload:lock"
+# Завантаження, розпочате перед закінченням строку URL, має встигнути завершитись
+COMPLETE_GRACE = 3600
+# Обмеження S3 на кількість частин multipart upload
+MAX_PARTS = 10000
+
+# Атомарно забирає наміри, строк яких минув: KEYS = expiry, intents; ARGV = now, limit, lock prefix.
+# Намір, який саме завершується (є блокування), лишається до наступного проходу
+_CLAIM_EXPIRED_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local result = {}
+for _, id in ipairs(ids) do
+    if redis.call('EXISTS', ARGV[3] .. ':' .. id) == 0 then
+        redis.call('ZREM', KEYS[1], id)
+        local intent = redis.call('HGET', KEYS[2], id)
+        redis.call('HDEL', KEYS[2], id)
+        if intent then table.insert(result, intent) end
+    end
+end
+return {result, #ids}
+"""
+
+def to_epoch(value: datetime) -> float:
+    # Час у застосунку — UTC без часового поясу
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def part_count(size: int) -> int:
+    return max(1, -(-size // settings.UPLOAD_DIRECT_PART_SIZE))
+
+def missing_parts(size: int, uploaded: Dict[int, int]) -> List[int]:
+    """Номери частин, яких бракує або розмір яких не відповідає розбиттю ``size``"""
+    count = part_count(size)
+    missing = []
+    for number in range(1, count + 1):
+        expected = settings.UPLOAD_DIRECT_PART_SIZE if number < count else size - settings.UPLOAD_DIRECT_PART_SIZE * (count - 1)
+        if uploaded.get(number) != expected:
+            missing.append(number)
+    return missing
+
+def is_multipart(size: int) -> bool:
+    return size > settings.UPLOAD_DIRECT_PART_SIZE
+
+async def save_intent(document_id: UUID, intent: Dict[str, Any], expires_at: float) -> None:
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hset(INTENTS_KEY, str(document_id), json.dumps(intent))
+        pipe.zadd(EXPIRY_KEY, {str(document_id): expires_at + COMPLETE_GRACE})
+        await pipe.execute()
+
+async def load_intent(document_id: UUID) -> Optional[Dict[str, Any]]:
+    raw = await get_redis().hget(INTENTS_KEY, str(document_id))
+    return json.loads(raw) if raw else None
+
+async def lock_intent(document_id: UUID) -> bool:
+    """Одне завершення наміру одночасно (повторне натискання, ретраї клієнта)"""
+    return bool(await get_redis().set(f"{LOCK_PREFIX}:{document_id}", 1, nx=True, ex=300))
+
+async def unlock_intent(document_id: UUID) -> None:
+    await get_redis().delete(f"{LOCK_PREFIX}:{document_id}")
+
+async def drop_intent(document_id: UUID) -> None:
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hdel(INTENTS_KEY, str(document_id))
+        pipe.zrem(EXPIRY_KEY, str(document_id))
+        pipe.delete(f"{LOCK_PREFIX}:{document_id}")
+        await pipe.execute()
+
+async def sweep_expired(now: Optional[datetime] = None, limit: int = 500) -> Dict[str, int]:
+    """Скасовує незавершені завантаження і видаляє дані прострочених намірів"""
+    now = now or datetime.utcnow()
+    stats = {"expired": 0, "aborted": 0, "removed": 0}
+    while True:
+        raw, scanned = await get_redis().eval(
+            _CLAIM_EXPIRED_SCRIPT, 2, EXPIRY_KEY, INTENTS_KEY, to_epoch(now), limit, LOCK_PREFIX
+        )
+        for item in raw:
+            intent = json.loads(item)
+            stats["expired"] += 1
+            try:
+                if intent.get("upload_id"):
+                    await asyncio.to_thread(abort_multipart_upload, intent["object_name"], intent["upload_id"])
+                    stats["aborted"] += 1
+                else:
+                    await remove_object(intent["object_name"])
+                    stats["removed"] += 1
+            except S3Error as e:
+                # NoSuchUpload/NoSuchKey — клієнт нічого не завантажив
+                if e.code not in ("NoSuchUpload", "NoSuchKey"):
+                    logger.warning(f"Failed to clean up upload {intent['object_name']}: {e}")
+        # Заблоковані наміри лишаються в голові черги — не перебираємо їх знову
+        if scanned < limit or not raw:
+            return stats
@@ -0,0 +1,128 @@
+"""Виявлення подвійного бронювання зали, судді та юриста.
+
+Засідання групуються за (ресурс, значення, день), для кожної групи будується
+статичне дерево інтервалів. Побудова O(n log n), запит O(log n + k), тож
+перевірка тисяч запропонованих засідань не потребує запиту на кожне.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+COURTROOM = "courtroom"
+JUDGE = "judge"
+LAWYER = "lawyer"
+
+Resource = Tuple[str, Hashable]
+
+@dataclass(frozen=True)
+class Slot:
+    ref: Hashable  # id наявного засідання або ("proposed", індекс)
+    start: datetime
+    end: datetime
+    payload: Any = None
+
+class IntervalTree:
+    """Статичне дерево інтервалів: відсортований масив як неявне BST + max(end) піддерева"""
+
+    def __init__(self, slots: Iterable[Slot]):
+        self._slots: List[Slot] = sorted(slots, key=lambda slot: (slot.start, slot.end))
+        self._max_end: List[Optional[datetime]] = [None] * len(self._slots)
+        self._build(0, len(self._slots))
+
+    def _build(self, lo: int, hi: int) -> Optional[datetime]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        max_end = self._slots[mid].end
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > max_end:
+                max_end = child
+        self._max_end[mid] = max_end
+        return max_end
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Slot]:
+        """Інтервали, що перетинаються з [start, end)"""
+        found = []
+        stack = [(0, len(self._slots))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            # Жоден інтервал піддерева не закінчується після start
+            if self._max_end[mid] <= start:
+                continue
+            stack.append((lo, mid))
+            slot = self._slots[mid]
+            if slot.start < end:
+                if slot.end > start:
+                    found.append(slot)
+                # Праворуч початки не менші — має сенс лише якщо цей почався до end
+                stack.append((mid + 1, hi))
+        return found
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+def hearing_resources(
+    location: Optional[str],
+    courtroom: Optional[str],
+    judge: Optional[str],
+    lawyer_id: Optional[UUID]
+) -> List[Resource]:
+    """Ресурси, які не можуть бути зайняті двома засіданнями одночасно"""
+    resources: List[Resource] = []
+    if normalize(courtroom):
+        # Зала визначається разом із судом (location)
+        resources.append((COURTROOM, (normalize(location), normalize(courtroom))))
+    if normalize(judge):
+        resources.append((JUDGE, normalize(judge)))
+    if lawyer_id is not None:
+        resources.append((LAWYER, lawyer_id))
+    return resources
+
+def _days(start: datetime, end: datetime) -> List[date]:
+    days = []
+    day = start.date()
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+class HearingConflictIndex:
+    """Індекс зайнятості ресурсів по днях для пакетної перевірки"""
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, Hashable, date], List[Slot]] = defaultdict(list)
+        self._trees: Dict[Tuple[str, Hashable, date], IntervalTree] = {}
+
+    def add(self, slot: Slot, resources: Sequence[Resource]) -> None:
+        for kind, value in resources:
+            for day in _days(slot.start, slot.end):
+                self._groups[(kind, value, day)].append(slot)
+        self._trees.clear()
+
+    def build(self) -> "HearingConflictIndex":
+        self._trees = {key: IntervalTree(slots) for key, slots in self._groups.items()}
+        return self
+
+    def conflicts(self, slot: Slot, resources: Sequence[Resource]) -> List[Tuple[str, Slot]]:
+        """(тип ресурсу, засідання) для всіх перетинів, крім самого slot"""
+        if not self._trees and self._groups:
+            self.build()
+        found: Dict[Tuple[str, Hashable], Slot] = {}
+        for kind, value in resources:
+            for day in _days(slot.start, slot.end):
+                tree = self._trees.get((kind, value, day))
+                if tree is None:
+                    continue
+                for other in tree.overlapping(slot.start, slot.end):
+                    if other.ref != slot.ref:
+                        found[(kind, other.ref)] = other
+        return sorted(((kind, other) for (kind, _), other in found.items()), key=lambda item: (item[1].start, item[0]))
@@ -3,10 +3,23 @@ from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 from src.core.database import Base
 import enum
 
+DEFAULT_HEARING_DURATION = timedelta(hours=1)
+_DURATION_RE = re.compile(r"^\s*(?:(\d+(?:[.,]\d+)?)\s*h)?\s*(?:(\d+)\s*m(?:in)?)?\s*$", re.IGNORECASE)
+
+def parse_duration(value: str) -> timedelta:
+    """Тривалість засідання з рядка "1h", "1.5h", "90m", "1h30m" (за замовчуванням 1 година)"""
+    match = _DURATION_RE.match(value or "")
+    if not match or not any(match.groups()):
+        return DEFAULT_HEARING_DURATION
+    hours, minutes = match.groups()
+    duration = timedelta(hours=float(hours.replace(",", ".")) if hours else 0, minutes=int(minutes or 0))
+    return duration or DEFAULT_HEARING_DURATION
+
 # Визначення Enum типів
 class HearingType(str, enum.Enum):
     PRELIMINARY = "preliminary"
@@ -40,7 +53,7 @@ class Hearing(Base):
     description = Column(Text)
     
     # Деталі засідання
-    hearing_date = Column(DateTime, nullable=False)
+    hearing_date = Column(DateTime, nullable=False, index=True)
     duration = Column(String(20))  # 1h, 2h, etc.
     location = Column(String(200))
     courtroom = Column(String(100))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
@@ -13,11 +13,34 @@ router = APIRouter(prefix="/hearings", tags=["hearings"])
 @router.post("/", response_model=schemas.HearingResponse, status_code=status.HTTP_201_CREATED)
 async def create_hearing(
     hearing: schemas.HearingCreate,
+    allow_conflicts: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     hearing_service = service.HearingService(db)
-    return await hearing_service.create(hearing, current_user.id)
+    return await hearing_service.create(hearing, current_user.id, allow_conflicts)
+
+@router.post("/import", response_model=schemas.HearingImportResponse)
+async def import_hearings(
+    request: schemas.HearingImportRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    hearing_service = service.HearingService(db)
+    result = await hearing_service.import_hearings(request.hearings, current_user.id, request.skip_conflicting)
+    if result["conflicts"] and not result["created_ids"]:
+        response.status_code = status.HTTP_409_CONFLICT
+    return result
+
+@router.post("/conflicts", response_model=List[schemas.HearingConflictReport])
+async def check_hearing_conflicts(
+    request: schemas.HearingConflictCheckRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    hearing_service = service.HearingService(db)
+    return await hearing_service.find_conflicts(request.slots)
 
 @router.get("/", response_model=List[schemas.HearingResponse])
 async def list_hearings(
@@ -49,11 +72,12 @@ async def get_hearing(
 async def update_hearing(
     hearing_id: UUID,
     hearing: schemas.HearingUpdate,
+    allow_conflicts: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     hearing_service = service.HearingService(db)
-    db_hearing = await hearing_service.update(hearing_id, hearing)
+    db_hearing = await hearing_service.update(hearing_id, hearing, allow_conflicts)
     if not db_hearing:
         raise HTTPException(status_code=404, detail="Hearing not found")
     return db_hearing
@@ -72,4 +72,39 @@ class HearingStats(BaseModel):
     upcoming_hearings: int
     completed_hearings: int
     by_type: dict
-    by_status: dict
\ No newline at end of file
+    by_status: dict
+
+class HearingSlot(BaseModel):
+    """Запропонований час засідання для перевірки конфліктів"""
+    hearing_id: Optional[UUID] = None  # наявне засідання, що переноситься
+    hearing_date: datetime
+    duration: Optional[str] = Field(None, max_length=20)
+    location: Optional[str] = Field(None, max_length=200)
+    courtroom: Optional[str] = Field(None, max_length=100)
+    judge: Optional[str] = Field(None, max_length=100)
+    lawyer_id: Optional[UUID] = None
+
+class HearingConflictCheckRequest(BaseModel):
+    slots: List[HearingSlot] = Field(..., min_items=1, max_items=10000)
+
+class HearingConflict(BaseModel):
+    resource: str  # courtroom, judge, lawyer
+    hearing_id: Optional[UUID] = None  # наявне засідання
+    proposed_index: Optional[int] = None  # інше засідання з цього ж пакета
+    title: Optional[str] = None
+    start: datetime
+    end: datetime
+
+class HearingConflictReport(BaseModel):
+    index: int
+    hearing_id: Optional[UUID] = None
+    conflicts: List[HearingConflict]
+
+class HearingImportRequest(BaseModel):
+    hearings: List[HearingCreate] = Field(..., min_items=1, max_items=10000)
+    skip_conflicting: bool = False  # імпортувати без конфліктних замість відмови
+
+class HearingImportResponse(BaseModel):
+    created_ids: List[UUID]
+    conflicts: List[HearingConflictReport]
+
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, or_, insert
 from sqlalchemy.exc import SQLAlchemyError
 from uuid import UUID
 from typing import Optional, List, Dict, Any
@@ -8,10 +8,26 @@ from datetime import datetime, timedelta
 import json
 
 from . import models, schemas
-from src.core.exceptions import NotFoundException, DatabaseException
+from .conflicts import HearingConflictIndex, Slot, hearing_resources, normalize
+from src.core.exceptions import NotFoundException, DatabaseException, ConflictException
+from src.modules.calendar.feed import invalidate_feed
+from src.modules.notifications.reminders import HEARING, schedule_hearing_reminders, cancel_reminders
 
 logger = logging.getLogger(__name__)
 
+# Скасовані та відкладені засідання не займають залу/суддю
+INACTIVE_STATUSES = (models.HearingStatus.CANCELLED, models.HearingStatus.ADJOURNED)
+# Найдовше засідання, яке може почати перетинатися з вікном ще до його початку
+MAX_HEARING_SPAN = timedelta(days=1)
+# Поля, зміна яких може створити накладку (юрист — власник засідання)
+SCHEDULING_FIELDS = {"hearing_date", "duration", "location", "courtroom", "judge", "created_by_id"}
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+def is_active_status(status) -> bool:
+    return _status_value(status) not in {status.value for status in INACTIVE_STATUSES}
+
 class HearingService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -56,34 +72,192 @@ class HearingService:
             logger.error(f"Error fetching hearings: {e}")
             raise DatabaseException("Failed to fetch hearings")
     
-    async def create(self, hearing_data: schemas.HearingCreate, user_id: UUID) -> models.Hearing:
+    @staticmethod
+    def _to_row(hearing_data: schemas.HearingCreate, user_id: UUID) -> Dict[str, Any]:
+        # Convert lists to JSON strings for database storage
+        return {
+            **hearing_data.dict(exclude={'participants', 'required_attendees', 'documents_required'}),
+            "created_by_id": user_id,
+            "participants": json.dumps(hearing_data.participants) if hearing_data.participants else None,
+            "required_attendees": json.dumps(hearing_data.required_attendees) if hearing_data.required_attendees else None,
+            "documents_required": json.dumps(hearing_data.documents_required) if hearing_data.documents_required else None,
+        }
+    
+    @staticmethod
+    def _slot_for(hearing_data: schemas.HearingCreate, user_id: UUID) -> schemas.HearingSlot:
+        return schemas.HearingSlot(
+            hearing_date=hearing_data.hearing_date,
+            duration=hearing_data.duration,
+            location=hearing_data.location,
+            courtroom=hearing_data.courtroom,
+            judge=hearing_data.judge,
+            lawyer_id=user_id
+        )
+    
+    async def find_conflicts(self, slots: List[schemas.HearingSlot]) -> List[Dict[str, Any]]:
+        """Конфлікти зали/судді/юриста для пакета засідань: один запит + дерева інтервалів"""
+        proposals = []
+        for index, slot in enumerate(slots):
+            start = slot.hearing_date
+            end = start + models.parse_duration(slot.duration)
+            resources = hearing_resources(slot.location, slot.courtroom, slot.judge, slot.lawyer_id)
+            proposals.append((index, slot, Slot(("proposed", index), start, end), resources))
+        
+        courtrooms = {normalize(slot.courtroom) for slot in slots if normalize(slot.courtroom)}
+        judges = {normalize(slot.judge) for slot in slots if normalize(slot.judge)}
+        lawyers = {slot.lawyer_id for slot in slots if slot.lawyer_id}
+        rescheduled = {slot.hearing_id for slot in slots if slot.hearing_id}
+        
+        resource_filters = []
+        if courtrooms:
+            resource_filters.append(func.lower(func.trim(models.Hearing.courtroom)).in_(courtrooms))
+        if judges:
+            resource_filters.append(func.lower(func.trim(models.Hearing.judge)).in_(judges))
+        if lawyers:
+            resource_filters.append(models.Hearing.created_by_id.in_(lawyers))
+        if not resource_filters:
+            return []
+        
+        query = select(models.Hearing).where(
+            and_(
+                models.Hearing.hearing_date >= min(p[2].start for p in proposals) - MAX_HEARING_SPAN,
+                models.Hearing.hearing_date < max(p[2].end for p in proposals),
+                models.Hearing.status.notin_(INACTIVE_STATUSES),
+                or_(*resource_filters)
+            )
+        )
+        if rescheduled:
+            # Засідання, що переносяться, порівнюються за новим часом
+            query = query.where(models.Hearing.id.notin_(rescheduled))
         try:
-            # Convert lists to JSON strings for database storage
-            participants_json = json.dumps(hearing_data.participants or []) if hearing_data.participants else None
-            required_attendees_json = json.dumps(hearing_data.required_attendees or []) if hearing_data.required_attendees else None
-            documents_required_json = json.dumps(hearing_data.documents_required or []) if hearing_data.documents_required else None
-            
-            db_hearing = models.Hearing(
-                **hearing_data.dict(exclude={'participants', 'required_attendees', 'documents_required'}),
-                created_by_id=user_id,
-                participants=participants_json,
-                required_attendees=required_attendees_json,
-                documents_required=documents_required_json
+            result = await self.db.execute(query)
+            existing = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching hearings for conflict check: {e}")
+            raise DatabaseException("Failed to check hearing conflicts")
+        
+        index = HearingConflictIndex()
+        for hearing in existing:
+            start = hearing.hearing_date
+            index.add(
+                Slot(hearing.id, start, start + models.parse_duration(hearing.duration), hearing),
+                hearing_resources(hearing.location, hearing.courtroom, hearing.judge, hearing.created_by_id)
             )
+        for _, _, slot, resources in proposals:
+            index.add(slot, resources)
+        index.build()
+        
+        reports = []
+        for position, slot_data, slot, resources in proposals:
+            conflicts = []
+            for resource, other in index.conflicts(slot, resources):
+                proposed = isinstance(other.ref, tuple)
+                conflicts.append({
+                    "resource": resource,
+                    "hearing_id": None if proposed else other.ref,
+                    "proposed_index": other.ref[1] if proposed else None,
+                    "title": None if proposed else other.payload.title,
+                    "start": other.start,
+                    "end": other.end,
+                })
+            if conflicts:
+                reports.append({"index": position, "hearing_id": slot_data.hearing_id, "conflicts": conflicts})
+        return reports
+    
+    async def create(
+        self,
+        hearing_data: schemas.HearingCreate,
+        user_id: UUID,
+        allow_conflicts: bool = False
+    ) -> models.Hearing:
+        if not allow_conflicts:
+            reports = await self.find_conflicts([self._slot_for(hearing_data, user_id)])
+            if reports:
+                resources = sorted({conflict["resource"] for conflict in reports[0]["conflicts"]})
+                raise ConflictException(f"Hearing overlaps existing hearings ({', '.join(resources)})")
+        try:
+            db_hearing = models.Hearing(**self._to_row(hearing_data, user_id))
             
             self.db.add(db_hearing)
             await self.db.commit()
             await self.db.refresh(db_hearing)
+            await invalidate_feed(db_hearing.created_by_id, "hearings")
+            await schedule_hearing_reminders(db_hearing)
             return db_hearing
         except SQLAlchemyError as e:
             await self.db.rollback()
             logger.error(f"Error creating hearing: {e}")
             raise DatabaseException("Failed to create hearing")
     
+    async def import_hearings(
+        self,
+        hearings: List[schemas.HearingCreate],
+        user_id: UUID,
+        skip_conflicting: bool = False
+    ) -> Dict[str, Any]:
+        """Імпорт розкладу суду: усі конфлікти в одній відповіді, вставка одним запитом"""
+        reports = await self.find_conflicts([self._slot_for(hearing, user_id) for hearing in hearings])
+        if reports and not skip_conflicting:
+            return {"created_ids": [], "conflicts": reports}
+        
+        conflicting = {report["index"] for report in reports}
+        rows = [
+            self._to_row(hearing, user_id)
+            for index, hearing in enumerate(hearings)
+            if index not in conflicting
+        ]
+        if not rows:
+            return {"created_ids": [], "conflicts": reports}
+        try:
+            result = await self.db.execute(
+                insert(models.Hearing).returning(models.Hearing),
+                rows
+            )
+            created = result.scalars().all()
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error importing hearings: {e}")
+            raise DatabaseException("Failed to import hearings")
+        
+        await invalidate_feed(user_id, "hearings")
+        for hearing in created:
+            await schedule_hearing_reminders(hearing)
+        logger.info(f"Imported {len(created)} hearings, {len(conflicting)} skipped due to conflicts")
+        return {"created_ids": [hearing.id for hearing in created], "conflicts": reports}
+    
+    async def _check_reschedule(self, db_hearing: models.Hearing, update_data: Dict[str, Any]) -> None:
+        """Та сама перевірка накладок, що й при створенні, для нового часу/зали/судді"""
+        changed = {
+            field for field, value in update_data.items()
+            if _status_value(getattr(db_hearing, field)) != _status_value(value)
+        }
+        value = lambda field: update_data.get(field, getattr(db_hearing, field))
+        if not is_active_status(value("status")):
+            return
+        # Відновлене після скасування/відкладення засідання знову займає ресурси
+        reactivated = "status" in changed and not is_active_status(db_hearing.status)
+        if not (changed & SCHEDULING_FIELDS or reactivated):
+            return
+        slot = schemas.HearingSlot(
+            hearing_id=db_hearing.id,
+            hearing_date=value("hearing_date"),
+            duration=value("duration"),
+            location=value("location"),
+            courtroom=value("courtroom"),
+            judge=value("judge"),
+            lawyer_id=value("created_by_id")
+        )
+        reports = await self.find_conflicts([slot])
+        if reports:
+            resources = sorted({conflict["resource"] for conflict in reports[0]["conflicts"]})
+            raise ConflictException(f"Hearing overlaps existing hearings ({', '.join(resources)})")
+    
     async def update(
         self, 
         hearing_id: UUID, 
-        hearing_data: schemas.HearingUpdate
+        hearing_data: schemas.HearingUpdate,
+        allow_conflicts: bool = False
     ) -> Optional[models.Hearing]:
         try:
             db_hearing = await self.get_by_id(hearing_id)
@@ -91,12 +265,16 @@ class HearingService:
                 return None
             
             update_data = hearing_data.dict(exclude_unset=True)
+            if not allow_conflicts:
+                await self._check_reschedule(db_hearing, update_data)
             for field, value in update_data.items():
                 setattr(db_hearing, field, value)
             
             self.db.add(db_hearing)
             await self.db.commit()
             await self.db.refresh(db_hearing)
+            await invalidate_feed(db_hearing.created_by_id, "hearings")
+            await schedule_hearing_reminders(db_hearing)
             return db_hearing
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -109,8 +287,11 @@ class HearingService:
             if not db_hearing:
                 return False
             
+            owner_id = db_hearing.created_by_id
             await self.db.delete(db_hearing)
             await self.db.commit()
+            await invalidate_feed(owner_id, "hearings")
+            await cancel_reminders(HEARING, hearing_id)
             return True
         except SQLAlchemyError as e:
             await self.db.rollback()
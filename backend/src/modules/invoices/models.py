@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Numeric, Boolean, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Numeric, Boolean, Enum, Integer
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -56,6 +56,9 @@ class Invoice(Base):
     payment_method = Column(Enum(PaymentMethod))
     payment_reference = Column(String(100))
     
+    # Ключ пакетного виставлення ("YYYY-MM:client_id") — захист від дублікатів при повторному запуску
+    batch_key = Column(String(64), unique=True, index=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -76,11 +79,32 @@ class InvoiceItem(Base):
     unit_price = Column(Numeric(10, 2), default=0.0)
     total = Column(Numeric(12, 2), default=0.0)
     
-    # Посилання на time entry або іншу сутність
-    time_entry_id = Column(UUID(as_uuid=True), ForeignKey("time_entries.id"))
+    # Посилання на time entry або іншу сутність.
+    # Без FK: time_entries партиціонована, її ключ — (id, start_time)
+    time_entry_id = Column(UUID(as_uuid=True), index=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     invoice = relationship("Invoice", back_populates="items")
-    time_entry = relationship("TimeEntry")
\ No newline at end of file
+    time_entry = relationship(
+        "TimeEntry",
+        primaryjoin="foreign(InvoiceItem.time_entry_id) == TimeEntry.id",
+        viewonly=True
+    )
+
+class ARAging(Base):
+    """Матеріалізоване представлення ar_aging (тільки читання, див. міграцію)"""
+    __tablename__ = "ar_aging"
+    __table_args__ = {"info": {"is_view": True}}
+
+    client_id = Column(UUID(as_uuid=True), primary_key=True)
+    current_amount = Column(Numeric(12, 2))
+    days_1_30 = Column(Numeric(12, 2))
+    days_31_60 = Column(Numeric(12, 2))
+    days_61_90 = Column(Numeric(12, 2))
+    days_over_90 = Column(Numeric(12, 2))
+    total_due = Column(Numeric(12, 2))
+    invoice_count = Column(Integer)
+    oldest_due_date = Column(DateTime)
+    refreshed_at = Column(DateTime)
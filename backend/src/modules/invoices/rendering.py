@@ -0,0 +1,149 @@
+"""Рендеринг рахунків у PDF.
+
+Шаблони компілюються один раз на процес, PDF рендеряться в обмеженому пулі
+процесів воркера Celery, а результат зберігається в MinIO під хешем вмісту
+рахунку — незмінений рахунок повторно не рендериться.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from src.core.config import settings
+from src.core.storage import get_minio_client, object_exists
+from . import models
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+INVOICE_TEMPLATE = "invoice.html"
+ARTIFACT_PREFIX = "invoices"
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_size = 0
+_render_pool_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _get_environment() -> Environment:
+    # auto_reload=False: скомпільований шаблон живе весь час життя процесу
+    return Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+
+@lru_cache(maxsize=None)
+def _get_template(name: str):
+    return _get_environment().get_template(name)
+
+@lru_cache(maxsize=None)
+def template_fingerprint(name: str = INVOICE_TEMPLATE) -> str:
+    """Хеш вихідного коду шаблону — зміна шаблону інвалідує кеш PDF"""
+    return hashlib.sha256((TEMPLATES_DIR / name).read_bytes()).hexdigest()[:16]
+
+def _money(value) -> str:
+    return f"{(value or 0):.2f}"
+
+def _client_name(client) -> str:
+    if client is None:
+        return ""
+    if client.company_name:
+        return client.company_name
+    return " ".join(p for p in (client.last_name, client.first_name, client.middle_name) if p)
+
+def build_invoice_context(invoice: models.Invoice) -> Dict[str, Any]:
+    """Серіалізує рахунок з позиціями у JSON-сумісний контекст шаблону.
+
+    Очікує завантажені зв'язки ``items`` та ``client``.
+    """
+    items = sorted(invoice.items, key=lambda item: (item.created_at or invoice.created_at, str(item.id)))
+    client = invoice.client
+    return {
+        "invoice": {
+            "id": str(invoice.id),
+            "invoice_number": invoice.invoice_number,
+            "issue_date": invoice.issue_date.date().isoformat() if invoice.issue_date else None,
+            "due_date": invoice.due_date.date().isoformat() if invoice.due_date else None,
+            "subtotal": _money(invoice.subtotal),
+            "tax_amount": _money(invoice.tax_amount),
+            "discount_amount": _money(invoice.discount_amount),
+            "total_amount": _money(invoice.total_amount),
+            "notes": invoice.notes,
+            "terms": invoice.terms,
+        },
+        "client": {
+            "name": _client_name(client),
+            "tax_id": client.tax_id if client else None,
+            "address": client.address if client else None,
+        },
+        "items": [
+            {
+                "description": item.description,
+                "quantity": _money(item.quantity),
+                "unit_price": _money(item.unit_price),
+                "total": _money(item.total),
+            }
+            for item in items
+        ],
+    }
+
+def content_hash(context: Dict[str, Any]) -> str:
+    """SHA-256 вмісту рахунку разом з версією шаблону"""
+    payload = json.dumps(context, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    digest.update(template_fingerprint().encode("ascii"))
+    return digest.hexdigest()
+
+def artifact_key(context: Dict[str, Any]) -> str:
+    return f"{ARTIFACT_PREFIX}/{context['invoice']['id']}/{content_hash(context)}.pdf"
+
+def render_invoice_pdf(context: Dict[str, Any]) -> bytes:
+    """Рендер одного PDF. Виконується в процесі пулу — має бути picklable."""
+    from weasyprint import HTML  # важкий імпорт лише в процесах рендерингу
+
+    html = _get_template(INVOICE_TEMPLATE).render(**context)
+    return HTML(string=html, base_url=str(TEMPLATES_DIR)).write_pdf()
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Обмежений пул процесів рендерингу (створюється ліниво, один на воркер)"""
+    global _render_pool, _render_pool_size
+    # Воркер запущений з --pool=threads — два завдання не мають створити два пули
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool_size = settings.INVOICE_RENDER_WORKERS or os.cpu_count() or 1
+            _render_pool = ProcessPoolExecutor(max_workers=_render_pool_size)
+            logger.info(f"Invoice render pool started with {_render_pool_size} processes")
+    return _render_pool
+
+def render_and_store(contexts: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Рендерить відсутні в сховищі PDF паралельно і повертає {invoice_id: object_key}"""
+    client = get_minio_client()
+    keys = {ctx["invoice"]["id"]: artifact_key(ctx) for ctx in contexts}
+    pending = [ctx for ctx in contexts if not object_exists(keys[ctx["invoice"]["id"]])]
+    if not pending:
+        return keys
+
+    pool = get_render_pool()
+    # Вікнами, щоб не тримати в пам'яті PDF усього пакета одночасно
+    window = _render_pool_size * 4
+    for start in range(0, len(pending), window):
+        batch = pending[start:start + window]
+        for ctx, pdf in zip(batch, pool.map(render_invoice_pdf, batch)):
+            key = keys[ctx["invoice"]["id"]]
+            client.put_object(
+                settings.MINIO_BUCKET,
+                key,
+                io.BytesIO(pdf),
+                len(pdf),
+                content_type="application/pdf",
+            )
+    logger.info(f"Rendered {len(pending)} invoice PDFs, {len(contexts) - len(pending)} served from cache")
+    return keys
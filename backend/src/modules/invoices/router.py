@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
+from datetime import timedelta
 
+from src.core.config import settings
 from src.core.database import get_db
 from src.core.security import get_current_user
-from . import service, schemas
+from src.core.storage import get_minio_client, object_exists
+from . import service, schemas, rendering
 from src.modules.auth.models import User
+from src.celery.tasks import generate_month_end_invoices, render_invoices
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
@@ -19,6 +25,15 @@ async def create_invoice(
     invoice_service = service.InvoiceService(db)
     return await invoice_service.create(invoice)
 
+@router.post("/batch/month-end", response_model=schemas.BatchInvoicingResponse, status_code=status.HTTP_202_ACCEPTED)
+async def run_month_end_invoicing(
+    batch: schemas.BatchInvoicingRequest,
+    current_user: User = Depends(get_current_user)
+):
+    # Запуск можна повторювати: вже виставлені клієнти пропускаються
+    task = generate_month_end_invoices.delay(batch.period, batch.due_days)
+    return {"task_id": task.id, "period": batch.period}
+
 @router.get("/", response_model=List[schemas.InvoiceResponse])
 async def list_invoices(
     skip: int = 0,
@@ -31,6 +46,32 @@ async def list_invoices(
     invoice_service = service.InvoiceService(db)
     return await invoice_service.get_all(skip, limit, status, client_id)
 
+@router.get("/aging", response_model=schemas.ARAgingPage)
+async def list_ar_aging(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[UUID] = None,
+    min_total: Optional[float] = None,
+    overdue_only: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    invoice_service = service.InvoiceService(db)
+    rows = await invoice_service.get_aging(limit, cursor, min_total, overdue_only)
+    next_cursor = rows[-1].client_id if len(rows) == limit else None
+    return {"items": rows, "next_cursor": next_cursor}
+
+@router.get("/aging/{client_id}", response_model=schemas.ARAgingResponse)
+async def get_client_ar_aging(
+    client_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    invoice_service = service.InvoiceService(db)
+    aging = await invoice_service.get_client_aging(client_id)
+    if not aging:
+        raise HTTPException(status_code=404, detail="No open balance for client")
+    return aging
+
 @router.get("/{invoice_id}", response_model=schemas.InvoiceResponse)
 async def get_invoice(
     invoice_id: UUID,
@@ -43,6 +84,47 @@ async def get_invoice(
         raise HTTPException(status_code=404, detail="Invoice not found")
     return db_invoice
 
+@router.get("/{invoice_id}/pdf", response_model=schemas.InvoicePdfResponse)
+async def get_invoice_pdf(
+    invoice_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    invoice_service = service.InvoiceService(db)
+    invoices = await invoice_service.get_for_render([invoice_id])
+    if not invoices:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Ключ залежить від вмісту рахунку: незмінений рахунок віддається з кешу одразу
+    key = rendering.artifact_key(rendering.build_invoice_context(invoices[0]))
+    if await run_in_threadpool(object_exists, key):
+        url = await run_in_threadpool(
+            get_minio_client().presigned_get_object,
+            settings.MINIO_BUCKET,
+            key,
+            timedelta(seconds=settings.INVOICE_PDF_URL_EXPIRES)
+        )
+        return {"status": "ready", "url": url}
+    
+    task = render_invoices.delay([str(invoice_id)])
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"status": "pending", "task_id": task.id}
+    )
+
+@router.post("/render", response_model=schemas.InvoicePdfResponse, status_code=status.HTTP_202_ACCEPTED)
+async def render_invoices_bulk(
+    render: schemas.InvoiceRenderRequest,
+    current_user: User = Depends(get_current_user)
+):
+    if not render.invoice_ids and not render.period:
+        raise HTTPException(status_code=422, detail="invoice_ids or period is required")
+    task = render_invoices.delay(
+        [str(i) for i in render.invoice_ids] if render.invoice_ids else None,
+        render.period
+    )
+    return {"status": "pending", "task_id": task.id}
+
 @router.patch("/{invoice_id}/status", response_model=schemas.InvoiceResponse)
 async def update_invoice_status(
     invoice_id: UUID,
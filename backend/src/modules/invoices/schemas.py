@@ -83,4 +83,40 @@ class InvoiceStats(BaseModel):
     total_revenue: float
     pending_revenue: float
     overdue_amount: float
-    by_status: dict
\ No newline at end of file
+    by_status: dict
+
+class BatchInvoicingRequest(BaseModel):
+    period: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$")  # YYYY-MM
+    due_days: int = Field(14, ge=0, le=365)
+
+class BatchInvoicingResponse(BaseModel):
+    task_id: str
+    period: str
+
+class InvoiceRenderRequest(BaseModel):
+    invoice_ids: Optional[List[UUID]] = None
+    period: Optional[str] = Field(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$")  # рахунки місячного запуску
+
+class InvoicePdfResponse(BaseModel):
+    status: str  # ready, pending
+    url: Optional[str] = None
+    task_id: Optional[str] = None
+
+class ARAgingResponse(BaseModel):
+    client_id: UUID
+    current_amount: float
+    days_1_30: float
+    days_31_60: float
+    days_61_90: float
+    days_over_90: float
+    total_due: float
+    invoice_count: int
+    oldest_due_date: Optional[datetime]
+    refreshed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ARAgingPage(BaseModel):
+    items: List[ARAgingResponse]
+    next_cursor: Optional[UUID] = None
@@ -1,16 +1,34 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func  # Виправлений імпорт - func з sqlalchemy, не з sqlalchemy.future
+from sqlalchemy import select, func, insert, update, text  # Виправлений імпорт - func з sqlalchemy, не з sqlalchemy.future
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
-from uuid import UUID
-from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import selectinload
+from uuid import UUID, uuid4
+from typing import Optional, List, Dict, Any, Tuple
+from decimal import Decimal
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from . import models, schemas
+from src.core.config import settings
 from src.core.exceptions import NotFoundException, DatabaseException
+from src.core.redis import get_redis
+from src.modules.cases.models import Case
+from src.modules.time_tracking.models import TimeEntry
 
 logger = logging.getLogger(__name__)
 
+AR_AGING_REFRESH_KEY = "ar_aging:refresh_scheduled"
+
+# Postgres обмежує кількість параметрів у запиті (32767), тому позиції вставляємо пачками
+ITEM_INSERT_BATCH = 1000
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    """Межі розрахункового періоду "YYYY-MM": [перший день місяця, перший день наступного)"""
+    start = datetime.strptime(period, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
 class InvoiceService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -35,6 +53,27 @@ class InvoiceService:
             logger.error(f"Error fetching invoice: {e}")
             raise DatabaseException("Failed to fetch invoice")
     
+    async def get_for_render(
+        self,
+        invoice_ids: Optional[List[UUID]] = None,
+        period: Optional[str] = None
+    ) -> List[models.Invoice]:
+        """Рахунки з позиціями та клієнтом для рендерингу PDF"""
+        try:
+            query = select(models.Invoice).options(
+                selectinload(models.Invoice.items),
+                selectinload(models.Invoice.client)
+            )
+            if invoice_ids:
+                query = query.where(models.Invoice.id.in_(invoice_ids))
+            if period:
+                query = query.where(models.Invoice.batch_key.startswith(f"{period}:"))
+            result = await self.db.execute(query)
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching invoices for rendering: {e}")
+            raise DatabaseException("Failed to fetch invoices for rendering")
+    
     async def get_all(
         self, 
         skip: int = 0, 
@@ -144,6 +183,8 @@ class InvoiceService:
             self.db.add(db_invoice)  # Додано self.db.add()
             await self.db.commit()
             await self.db.refresh(db_invoice)
+            if status in ("paid", "partial", "cancelled"):
+                await self.schedule_ar_aging_refresh()
             return db_invoice
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -178,4 +219,189 @@ class InvoiceService:
             }
         except SQLAlchemyError as e:
             logger.error(f"Error getting invoice stats: {e}")
-            raise DatabaseException("Failed to get invoice statistics")
\ No newline at end of file
+            raise DatabaseException("Failed to get invoice statistics")
+    
+    async def get_clients_with_unbilled_time(self, period: str) -> List[UUID]:
+        """Клієнти, що мають невиставлений оплачуваний час до кінця періоду"""
+        try:
+            _, period_end = period_bounds(period)
+            result = await self.db.execute(
+                select(Case.client_id).distinct()
+                .join(TimeEntry, TimeEntry.case_id == Case.id)
+                .where(
+                    TimeEntry.billable.is_(True),
+                    TimeEntry.billed.is_(False),
+                    TimeEntry.start_time < period_end,
+                    TimeEntry.end_time.isnot(None),
+                    TimeEntry.duration.isnot(None)
+                )
+            )
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching clients with unbilled time: {e}")
+            raise DatabaseException("Failed to fetch unbilled clients")
+    
+    async def create_from_time_entries(
+        self,
+        client_id: UUID,
+        period: str,
+        due_days: int = 14
+    ) -> Optional[UUID]:
+        """Рахунок клієнта з невиставлених записів часу за період (одна транзакція).
+        
+        Повторний виклик для того ж періоду нічого не створює: рахунок захищений
+        унікальним batch_key, а використані записи часу позначаються як billed.
+        """
+        try:
+            _, period_end = period_bounds(period)
+            batch_key = f"{period}:{client_id}"
+            
+            # SKIP LOCKED — паралельний повтор того ж клієнта не чекає на блокування
+            result = await self.db.execute(
+                select(
+                    TimeEntry.id,
+                    TimeEntry.case_id,
+                    TimeEntry.description,
+                    TimeEntry.duration,
+                    TimeEntry.rate
+                )
+                .join(Case, Case.id == TimeEntry.case_id)
+                .where(
+                    Case.client_id == client_id,
+                    TimeEntry.billable.is_(True),
+                    TimeEntry.billed.is_(False),
+                    TimeEntry.start_time < period_end,
+                    # Запущений таймер ще не має тривалості — його рахуємо наступного разу
+                    TimeEntry.end_time.isnot(None),
+                    TimeEntry.duration.isnot(None)
+                )
+                .order_by(TimeEntry.start_time)
+                .with_for_update(of=TimeEntry, skip_locked=True)
+            )
+            entries = result.all()
+            if not entries:
+                await self.db.rollback()
+                return None
+            
+            invoice_id = uuid4()
+            now = datetime.utcnow()
+            items = []
+            for entry in entries:
+                quantity = Decimal(entry.duration or 0)
+                unit_price = Decimal(entry.rate or 0)
+                items.append({
+                    "id": uuid4(),
+                    "invoice_id": invoice_id,
+                    "description": entry.description,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
+                    "total": (quantity * unit_price).quantize(Decimal("0.01")),
+                    "time_entry_id": entry.id,
+                    "created_at": now
+                })
+            subtotal = sum((item["total"] for item in items), Decimal("0.00"))
+            case_ids = {entry.case_id for entry in entries}
+            
+            inserted = await self.db.execute(
+                pg_insert(models.Invoice)
+                .values(
+                    id=invoice_id,
+                    invoice_number=f"INV-{period.replace('-', '')}-{client_id.hex[:12].upper()}",
+                    batch_key=batch_key,
+                    client_id=client_id,
+                    case_id=case_ids.pop() if len(case_ids) == 1 else None,
+                    status=models.InvoiceStatus.DRAFT,
+                    issue_date=now,
+                    due_date=now + timedelta(days=due_days),
+                    subtotal=subtotal,
+                    total_amount=subtotal,
+                    balance_due=subtotal,
+                    created_at=now,
+                    updated_at=now
+                )
+                .on_conflict_do_nothing(index_elements=[models.Invoice.batch_key])
+                .returning(models.Invoice.id)
+            )
+            if inserted.scalar_one_or_none() is None:
+                # Рахунок за цей період уже створив попередній запуск
+                await self.db.rollback()
+                logger.info(f"Invoice {batch_key} already exists, skipping")
+                return None
+            
+            for i in range(0, len(items), ITEM_INSERT_BATCH):
+                await self.db.execute(
+                    insert(models.InvoiceItem).values(items[i:i + ITEM_INSERT_BATCH])
+                )
+            await self.db.execute(
+                update(TimeEntry)
+                .where(
+                    TimeEntry.id.in_([entry.id for entry in entries]),
+                    TimeEntry.end_time.isnot(None),
+                    TimeEntry.duration.isnot(None)
+                )
+                .values(billed=True, updated_at=now)
+            )
+            
+            await self.db.commit()
+            logger.info(f"Invoice {batch_key} created with {len(items)} items")
+            return invoice_id
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error creating invoice from time entries for client {client_id}: {e}")
+            raise DatabaseException("Failed to create invoice from time entries")
+    
+    async def refresh_ar_aging(self) -> None:
+        """Оновлення ar_aging без блокування читачів"""
+        try:
+            await self.db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY ar_aging"))
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error refreshing ar_aging: {e}")
+            raise DatabaseException("Failed to refresh AR aging")
+    
+    async def schedule_ar_aging_refresh(self) -> None:
+        """Відкладене оновлення ar_aging: платежі в межах вікна дають один REFRESH"""
+        from src.celery.tasks import refresh_ar_aging
+        
+        debounce = settings.AR_AGING_REFRESH_DEBOUNCE
+        try:
+            if await get_redis().set(AR_AGING_REFRESH_KEY, 1, nx=True, ex=debounce):
+                refresh_ar_aging.apply_async(countdown=debounce)
+        except Exception as e:
+            # Плановий REFRESH все одно підхопить зміни
+            logger.warning(f"Failed to schedule ar_aging refresh: {e}")
+    
+    async def get_aging(
+        self,
+        limit: int = 50,
+        cursor: Optional[UUID] = None,
+        min_total: Optional[float] = None,
+        overdue_only: bool = False
+    ) -> List[models.ARAging]:
+        """Сторінка ar_aging з keyset-пагінацією за client_id"""
+        try:
+            query = select(models.ARAging)
+            if cursor:
+                query = query.where(models.ARAging.client_id > cursor)
+            if min_total is not None:
+                query = query.where(models.ARAging.total_due >= min_total)
+            if overdue_only:
+                query = query.where(models.ARAging.total_due > models.ARAging.current_amount)
+            result = await self.db.execute(
+                query.order_by(models.ARAging.client_id).limit(limit)
+            )
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching AR aging: {e}")
+            raise DatabaseException("Failed to fetch AR aging")
+    
+    async def get_client_aging(self, client_id: UUID) -> Optional[models.ARAging]:
+        try:
+            result = await self.db.execute(
+                select(models.ARAging).where(models.ARAging.client_id == client_id)
+            )
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching client AR aging: {e}")
+            raise DatabaseException("Failed to fetch AR aging")
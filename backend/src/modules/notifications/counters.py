@@ -0,0 +1,100 @@
+"""Лічильники непрочитаних повідомлень у Redis.
+
+Кожне створення або прочитання повідомлення змінює лічильник
+``notifications:unread:{user_id}`` після коміту, тож бейдж читається одним GET
+без звернення до Postgres. Періодична звірка порівнює лічильники з БД і
+виправляє розбіжність лише якщо лічильник не змінився під час підрахунку.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+import logging
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.core.exceptions import DatabaseException
+from src.core.redis import get_redis
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_PREFIX = "notifications:unread"
+
+# Встановлює значення, лише якщо лічильник досі дорівнює знімку (ARGV[1], "" — ключа не було)
+_COMPARE_AND_SET_SCRIPT = """
+local current = redis.call('GET', KEYS[1]) or ''
+if current ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == '0' then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+def unread_key(user_id: UUID) -> str:
+    return f"{UNREAD_PREFIX}:{user_id}"
+
+async def adjust_unread(deltas: Dict[UUID, int]) -> None:
+    """Змінює лічильники кількох користувачів одним конвеєром"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id and delta}
+    if not deltas:
+        return
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for user_id, delta in deltas.items():
+                pipe.incrby(unread_key(user_id), delta)
+            await pipe.execute()
+    except Exception as e:
+        # Звірка відновить значення
+        logger.warning(f"Failed to update unread counters: {e}")
+
+async def count_created(user_ids: Iterable[UUID]) -> None:
+    """+1 для кожного створеного повідомлення (user_id може повторюватись)"""
+    await adjust_unread(Counter(user_ids))
+
+async def get_unread_count(user_id: UUID) -> int:
+    try:
+        value = await get_redis().get(unread_key(user_id))
+    except Exception as e:
+        logger.warning(f"Unread counter unavailable for {user_id}: {e}")
+        return 0
+    # Від'ємне значення можливе лише через дрейф до наступної звірки
+    return max(0, int(value or 0))
+
+async def _snapshot(redis) -> Dict[str, str]:
+    keys = [key async for key in redis.scan_iter(match=f"{UNREAD_PREFIX}:*", count=1000)]
+    values = await redis.mget(keys) if keys else []
+    return {key: value for key, value in zip(keys, values) if value is not None}
+
+async def reconcile_unread(db: AsyncSession) -> Dict[str, int]:
+    """Звіряє лічильники з БД; повертає кількість перевірених і виправлених"""
+    redis = get_redis()
+    # Знімок до підрахунку: зміна після нього означає конкурентний запис — пропускаємо
+    snapshot = await _snapshot(redis)
+    try:
+        result = await db.execute(
+            select(Notification.user_id, func.count())
+            .where(Notification.is_read.is_(False))
+            .group_by(Notification.user_id)
+        )
+        expected = {unread_key(user_id): count for user_id, count in result.all()}
+    except SQLAlchemyError as e:
+        logger.error(f"Error counting unread notifications: {e}")
+        raise DatabaseException("Failed to reconcile unread counters")
+
+    repaired = skipped = 0
+    for key in snapshot.keys() | expected.keys():
+        wanted = expected.get(key, 0)
+        current: Optional[str] = snapshot.get(key)
+        if int(current or 0) == wanted:
+            continue
+        if await redis.eval(_COMPARE_AND_SET_SCRIPT, 1, key, current or "", str(wanted)):
+            repaired += 1
+        else:
+            skipped += 1
+    return {"checked": len(snapshot.keys() | expected.keys()), "repaired": repaired, "skipped": skipped}
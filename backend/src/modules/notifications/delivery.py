@@ -0,0 +1,271 @@
+"""Злиття сплесків повідомлень у дайджести.
+
+Масові операції (імпорт, пакетне виставлення рахунків, перепризначення задач)
+створюють сотні повідомлень за секунди. Повідомлення однієї групи
+(користувач, related_entity_type, type) зливаються:
+
+* ``immediate`` — перше повідомлення групи записується одразу, наступні
+  протягом ``NOTIFICATION_COALESCE_WINDOW`` накопичуються і виходять одним
+  дайджестом наприкінці вікна;
+* ``hourly`` / ``daily`` — усе накопичується до кінця години / доби.
+
+Накопичене зберігається в Redis (список на групу + ZSET строків) і
+записується одним рядком та одним листом. Важливі й термінові не зливаються.
+"""
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+import json
+import logging
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.core.redis import get_redis
+from src.modules.auth.models import User
+from .models import Notification
+from .enums import DigestMode, NotificationType, NotificationPriority
+from .counters import count_created
+from .push import publish_notifications
+from .mailer import OutgoingEmail, enqueue_emails
+
+logger = logging.getLogger(__name__)
+
+GATE_PREFIX = "notifications:coalesce:gate"
+BUFFER_PREFIX = "notifications:coalesce:buffer"
+DUE_KEY = "notifications:coalesce:due"
+PRIORITY_ORDER = list(NotificationPriority)
+# Важливі повідомлення (напр. нагадування про засідання) не затримуються
+BYPASS_PRIORITIES = (NotificationPriority.HIGH, NotificationPriority.URGENT)
+
+# Забирає групи, строк яких настав, разом з накопиченими елементами (атомарно)
+_CLAIM_SCRIPT = """
+local groups = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local result = {}
+for _, group in ipairs(groups) do
+    redis.call('ZREM', KEYS[1], group)
+    local buffer = ARGV[3] .. ':' .. group
+    local items = redis.call('LRANGE', buffer, 0, -1)
+    redis.call('DEL', buffer)
+    table.insert(result, {group, items})
+end
+return result
+"""
+
+def group_key(row: Dict[str, Any]) -> str:
+    kind = getattr(row.get("type"), "value", row.get("type")) or NotificationType.IN_APP.value
+    return f"{row['user_id']}:{row.get('related_entity_type') or '-'}:{kind}"
+
+def flush_at(mode: str, now: datetime) -> datetime:
+    """Кінець поточного вікна злиття"""
+    if mode == DigestMode.HOURLY.value:
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    if mode == DigestMode.DAILY.value:
+        send_at = now.replace(hour=settings.NOTIFICATION_DIGEST_DAILY_HOUR, minute=0, second=0, microsecond=0)
+        return send_at if send_at > now else send_at + timedelta(days=1)
+    return now + timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW)
+
+def _epoch(value: datetime) -> float:
+    # Час у застосунку — UTC без часового поясу
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def _dump(row: Dict[str, Any]) -> str:
+    return json.dumps({
+        "user_id": str(row["user_id"]),
+        "type": getattr(row.get("type"), "value", row.get("type")),
+        "title": row["title"],
+        "message": row["message"],
+        "priority": getattr(row.get("priority"), "value", row.get("priority")),
+        "related_entity_type": row.get("related_entity_type"),
+        "related_entity_id": str(row["related_entity_id"]) if row.get("related_entity_id") else None,
+    }, ensure_ascii=False)
+
+def _load(raw: str) -> Dict[str, Any]:
+    item = json.loads(raw)
+    return {
+        "user_id": UUID(item["user_id"]),
+        "type": NotificationType(item["type"] or NotificationType.IN_APP.value),
+        "title": item["title"],
+        "message": item["message"],
+        "priority": NotificationPriority(item["priority"] or NotificationPriority.NORMAL.value),
+        "related_entity_type": item["related_entity_type"],
+        "related_entity_id": UUID(item["related_entity_id"]) if item["related_entity_id"] else None,
+    }
+
+def digest_row(items: List[Dict[str, Any]], now: datetime) -> Dict[str, Any]:
+    """Один рядок замість групи повідомлень"""
+    first = items[0]
+    row = dict(first, id=uuid4(), created_at=now, updated_at=now)
+    if len(items) == 1:
+        return row
+    lines = [f"• {item['title']}" for item in items[:settings.NOTIFICATION_DIGEST_MAX_ITEMS]]
+    if len(items) > settings.NOTIFICATION_DIGEST_MAX_ITEMS:
+        lines.append(f"і ще {len(items) - settings.NOTIFICATION_DIGEST_MAX_ITEMS}")
+    entity_ids = {item["related_entity_id"] for item in items}
+    row.update(
+        title=f"Нових повідомлень: {len(items)}"[:200],
+        message="\n".join(lines),
+        priority=max((item["priority"] for item in items), key=PRIORITY_ORDER.index),
+        related_entity_id=first["related_entity_id"] if len(entity_ids) == 1 else None,
+    )
+    return row
+
+class NotificationDelivery:
+    """Запис повідомлень через етап злиття.
+
+    ``stage`` виконується в транзакції виклику: вирішує, які рядки писати
+    одразу, і вставляє їх. ``after_commit`` відкладає решту в Redis і
+    запускає доставку (лічильники, push, email) для записаних.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._written: List[Dict[str, Any]] = []
+        self._buffered: List[Tuple[Dict[str, Any], str, datetime]] = []
+
+    async def _modes(self, user_ids: Iterable[UUID]) -> Dict[UUID, str]:
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(User.id, User.notification_digest).where(User.id.in_(user_ids))
+        )
+        return {user_id: mode or DigestMode.IMMEDIATE.value for user_id, mode in result.all()}
+
+    async def stage(self, rows: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        now = now or datetime.utcnow()
+        if not rows:
+            return []
+        modes = await self._modes(row["user_id"] for row in rows)
+        redis = get_redis()
+        immediate = []
+        for row in rows:
+            mode = modes.get(row["user_id"], DigestMode.IMMEDIATE.value)
+            if row.get("priority") in BYPASS_PRIORITIES:
+                immediate.append(row)
+                continue
+            group = group_key(row)
+            if mode == DigestMode.IMMEDIATE.value:
+                try:
+                    # Перше повідомлення вікна відкриває його і йде одразу
+                    opened = await redis.set(
+                        f"{GATE_PREFIX}:{group}", 1, nx=True, ex=settings.NOTIFICATION_COALESCE_WINDOW
+                    )
+                except Exception as e:
+                    logger.warning(f"Notification coalescing unavailable: {e}")
+                    opened = True
+                if opened:
+                    immediate.append(row)
+                    continue
+            self._buffered.append((row, group, flush_at(mode, now)))
+
+        immediate = [dict(row, id=row.get("id") or uuid4()) for row in immediate]
+        if immediate:
+            await self.db.execute(insert(Notification), immediate)
+        self._written.extend(immediate)
+        return immediate
+
+    async def after_commit(self) -> None:
+        if self._buffered:
+            try:
+                async with get_redis().pipeline(transaction=False) as pipe:
+                    for row, group, due in self._buffered:
+                        pipe.rpush(f"{BUFFER_PREFIX}:{group}", _dump(row))
+                        # NX: строк групи задає перше відкладене повідомлення
+                        pipe.zadd(DUE_KEY, {group: _epoch(due)}, nx=True)
+                    await pipe.execute()
+            except Exception as e:
+                # Без Redis повідомлення не губимо — пишемо їх одразу, без злиття
+                logger.warning(f"Failed to buffer {len(self._buffered)} notifications: {e}")
+                await self._write_now([row for row, _, _ in self._buffered])
+            self._buffered = []
+        written, self._written = self._written, []
+        await announce(self.db, written)
+
+    async def _write_now(self, rows: List[Dict[str, Any]]) -> None:
+        rows = [dict(row, id=row.get("id") or uuid4()) for row in rows]
+        try:
+            await self.db.execute(insert(Notification), rows)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error writing unbuffered notifications: {e}")
+            return
+        self._written.extend(rows)
+
+async def announce(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Доставка записаних рядків: лічильники, push і email для type=EMAIL"""
+    if not rows:
+        return
+    await count_created(row["user_id"] for row in rows)
+    await publish_notifications(rows)
+
+    email_rows = [row for row in rows if row.get("type") == NotificationType.EMAIL]
+    if not email_rows:
+        return
+    try:
+        result = await db.execute(
+            select(User.id, User.email).where(User.id.in_({row["user_id"] for row in email_rows}))
+        )
+        addresses = dict(result.all())
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading notification recipients: {e}")
+        return
+    emails = [
+        OutgoingEmail(
+            to_email=addresses[row["user_id"]],
+            subject=row["title"],
+            html=escape(row["message"]).replace("\n", "<br>"),
+        )
+        for row in email_rows if addresses.get(row["user_id"])
+    ]
+    try:
+        await enqueue_emails(get_redis(), emails)
+    except Exception as e:
+        logger.warning(f"Failed to queue {len(emails)} notification emails: {e}")
+
+async def flush_digests(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Записує дайджести груп, вікно яких закінчилось"""
+    now = now or datetime.utcnow()
+    redis = get_redis()
+    stats = {"groups": 0, "merged": 0}
+    while True:
+        claimed = await redis.eval(
+            _CLAIM_SCRIPT, 1, DUE_KEY, _epoch(now), settings.NOTIFICATION_DIGEST_BATCH_SIZE, BUFFER_PREFIX
+        )
+        if not claimed:
+            return stats
+        rows, raw_by_group = [], []
+        for group, items in claimed:
+            loaded = []
+            for raw in items:
+                try:
+                    loaded.append(_load(raw))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Malformed buffered notification dropped: {e}")
+            if loaded:
+                rows.append(digest_row(loaded, now))
+                raw_by_group.append((group, items))
+                stats["merged"] += len(loaded)
+        try:
+            if rows:
+                await db.execute(insert(Notification), rows)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            # Повертаємо накопичене, щоб спробувати на наступному проході
+            async with redis.pipeline(transaction=False) as pipe:
+                for group, items in raw_by_group:
+                    pipe.rpush(f"{BUFFER_PREFIX}:{group}", *items)
+                    pipe.zadd(DUE_KEY, {group: _epoch(now)}, nx=True)
+                await pipe.execute()
+            logger.error(f"Error writing notification digests: {e}")
+            raise DatabaseException("Failed to write notification digests")
+        stats["groups"] += len(rows)
+        await announce(db, rows)
+        if len(claimed) < settings.NOTIFICATION_DIGEST_BATCH_SIZE:
+            return stats
@@ -0,0 +1,120 @@
+"""Кеш скомпільованих email-шаблонів.
+
+Шаблони з ``EMAIL_TEMPLATES_DIR`` компілюються один раз (``precompile`` під
+час старту воркера) і живуть у пам'яті процесу. Зміна будь-якого файлу
+каталогу (перевірка mtime не частіше ніж раз на
+``EMAIL_TEMPLATE_CHECK_INTERVAL``) скидає кеш цілком — так підхоплюються і
+базові шаблони/include, від яких залежить лист. ``render_many`` рендерить
+пачку отримувачів одним скомпільованим шаблоном.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+import logging
+import os
+import threading
+import time
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".html", ".txt", ".xml")
+# Рядкові шаблони (теми листів) — обмежений кеш
+SUBJECT_CACHE_SIZE = 256
+
+class EmailTemplates:
+    """Потокобезпечний кеш шаблонів з інвалідацією за mtime"""
+
+    def __init__(self, directory: Optional[str] = None, check_interval: Optional[float] = None):
+        self.directory = directory or settings.EMAIL_TEMPLATES_DIR
+        self.check_interval = (
+            check_interval if check_interval is not None else settings.EMAIL_TEMPLATE_CHECK_INTERVAL
+        )
+        # auto_reload=False: Jinja не робить stat на кожен get_template, актуальність перевіряємо самі;
+        # cache_size=-1 — без LRU-витіснення, шаблонів небагато
+        self.env = Environment(
+            loader=FileSystemLoader(self.directory),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=False,
+            cache_size=-1,
+        )
+        # Тема — заголовок plain text: без автоекранування HTML ("O'Brien & Co")
+        self.subject_env = Environment(autoescape=False)
+        self._lock = threading.Lock()
+        self._subjects: Dict[str, Template] = {}
+        self._mtimes: Dict[str, int] = {}
+        self._checked_at = 0.0
+
+    def _scan(self) -> Dict[str, int]:
+        mtimes = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+        return mtimes
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        mtimes = self._scan()
+        with self._lock:
+            self._checked_at = now
+            if mtimes != self._mtimes:
+                if self._mtimes:
+                    logger.info(f"Email templates changed in {self.directory}, cache reset")
+                self._mtimes = mtimes
+                self.env.cache.clear()
+
+    def get(self, name: str) -> Template:
+        self._refresh()
+        # Без auto_reload кеш Environment віддає скомпільований шаблон без звернення до диска
+        return self.env.get_template(name)
+
+    def subject(self, source: str) -> Template:
+        """Тема листа може містити змінні (напр. «Рахунок {{ number }}»)"""
+        template = self._subjects.get(source)
+        if template is None:
+            with self._lock:
+                if len(self._subjects) >= SUBJECT_CACHE_SIZE:
+                    self._subjects.clear()
+                template = self._subjects[source] = self.subject_env.from_string(source)
+        return template
+
+    def precompile(self) -> int:
+        """Компіляція всіх шаблонів каталогу; повертає їх кількість"""
+        if not os.path.isdir(self.directory):
+            logger.warning(f"Email templates directory {self.directory} not found")
+            return 0
+        self._checked_at = 0.0
+        self._refresh()
+        names = self.env.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_EXTENSIONS))
+        compiled = 0
+        for name in names:
+            try:
+                self.get(name)
+                compiled += 1
+            except Exception as e:
+                # Зламаний шаблон не повинен зупиняти старт воркера — помилка буде при рендерингу
+                logger.error(f"Failed to compile email template {name}: {e}")
+        return compiled
+
+    def render(self, name: str, context: Mapping[str, Any]) -> str:
+        return self.get(name).render(context)
+
+    def render_many(
+        self,
+        name: str,
+        contexts: Iterable[Mapping[str, Any]],
+        shared: Optional[Mapping[str, Any]] = None
+    ) -> List[str]:
+        """Пачка листів одним шаблоном; ``shared`` — спільні змінні, контекст отримувача їх перекриває"""
+        template = self.get(name)
+        shared = dict(shared or {})
+        return [template.render({**shared, **context}) for context in contexts]
+
+email_templates = EmailTemplates()
@@ -12,6 +12,11 @@ class NotificationPriority(str, enum.Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+class DigestMode(str, enum.Enum):
+    IMMEDIATE = "immediate"
+    HOURLY = "hourly"
+    DAILY = "daily"
+
 class NotificationStatus(str, enum.Enum):
     PENDING = "pending"
     SENT = "sent"
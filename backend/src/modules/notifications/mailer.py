@@ -0,0 +1,408 @@
+"""Доставка email у воркері Celery.
+
+Листи ставляться в чергу Redis ``email:outbox`` і розсилаються періодичним
+завданням пачками. Кожен процес воркера тримає власний event loop у фоновому
+потоці з пулом постійних SMTP-з'єднань (aiosmtplib), тож STARTTLS і логін
+виконуються один раз на з'єднання, а не на лист. Ліміт на домен отримувача —
+лічильник у Redis на хвилину, спільний для всіх воркерів; лист понад ліміт
+відкладається на наступне вікно. Тимчасові помилки повторюються з
+експоненційною затримкою, постійні (5xx) і вичерпані спроби йдуть у
+``email:dead``.
+
+Пачка не видаляється з черги до результату: листи переносяться в
+``email:processing`` (ZSET, оцінка — час захоплення) і знімаються звідти
+разом із записом результату. Захоплення воркера, що впав, повертаються в
+чергу після ``EMAIL_VISIBILITY_TIMEOUT`` — доставка щонайменше один раз.
+
+Для локальної перевірки достатньо SMTP-приймача, напр.
+``python -m aiosmtpd -n -l localhost:1025`` і ``SMTP_PORT=1025``,
+``SMTP_STARTTLS=false`` без ``SMTP_USER``.
+"""
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+
+import aiosmtplib
+from redis import asyncio as aioredis
+
+from src.core.config import settings
+from .email_templates import email_templates
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "email:outbox"
+DEFERRED_KEY = "email:deferred"
+PROCESSING_KEY = "email:processing"
+DEAD_KEY = "email:dead"
+RATE_PREFIX = "email:rate"
+
+# Переносить відкладені листи, час яких настав, у кінець основної черги
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+    redis.call('RPUSH', KEYS[2], unpack(due))
+end
+return #due
+"""
+
+# Атомарно забирає до ARGV[2] листів з голови черги в processing: KEYS = outbox, processing
+_CLAIM_SCRIPT = """
+local items = redis.call('LPOP', KEYS[1], ARGV[2])
+if not items then return {} end
+for _, item in ipairs(items) do
+    redis.call('ZADD', KEYS[2], ARGV[1], item)
+end
+return items
+"""
+
+# Повертає в чергу листи, захоплені раніше за ARGV[1]: KEYS = outbox, processing
+_REQUEUE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('RPUSH', KEYS[1], unpack(stale))
+end
+return #stale
+"""
+
+@dataclass
+class OutgoingEmail:
+    to_email: str
+    subject: str
+    html: str
+    from_email: Optional[str] = None
+    attempts: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    @property
+    def domain(self) -> str:
+        return self.to_email.rsplit("@", 1)[-1].lower()
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "OutgoingEmail":
+        return cls(**json.loads(raw))
+
+    def to_mime(self) -> MIMEMultipart:
+        message = MIMEMultipart()
+        message["From"] = self.from_email or settings.EMAIL_FROM
+        message["To"] = self.to_email
+        # Тема буває з даних користувача: переведення рядка дописало б власні заголовки
+        message["Subject"] = " ".join(self.subject.splitlines())
+        message["Message-ID"] = f"<{self.id}@{(settings.EMAIL_FROM or 'localhost').rsplit('@', 1)[-1]}>"
+        message.attach(MIMEText(self.html, "html", "utf-8"))
+        return message
+
+def retry_delay(attempts: int) -> int:
+    return min(settings.EMAIL_RETRY_BASE_DELAY * 2 ** max(0, attempts - 1), 6 * 3600)
+
+def is_permanent(error: Exception) -> bool:
+    if isinstance(error, (ValueError, TypeError)):
+        # Лист не збирається (заголовки, кодування) — повтор нічого не змінить
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= getattr(refused, "code", 0) < 600 for refused in error.recipients)
+    return isinstance(code, int) and 500 <= code < 600
+
+def render_template(template_name: str, context: Dict[str, Any]) -> str:
+    return email_templates.render(template_name, context)
+
+def render_emails(
+    template_name: str,
+    subject: str,
+    recipients: Iterable[Dict[str, Any]],
+    shared: Optional[Dict[str, Any]] = None
+) -> List[OutgoingEmail]:
+    """Листи пачки отримувачів ({"to_email", "context"}) одним скомпільованим шаблоном"""
+    recipients = [recipient for recipient in recipients if recipient.get("to_email")]
+    contexts = [recipient.get("context") or {} for recipient in recipients]
+    bodies = email_templates.render_many(template_name, contexts, shared)
+    subject_template = email_templates.subject(subject)
+    shared = shared or {}
+    return [
+        OutgoingEmail(
+            to_email=recipient["to_email"],
+            subject=subject_template.render({**shared, **context}),
+            html=html
+        )
+        for recipient, context, html in zip(recipients, contexts, bodies)
+    ]
+
+def enqueue_emails_sync(redis, emails: Iterable[OutgoingEmail]) -> int:
+    """Постановка в чергу з синхронного коду (Celery)"""
+    payloads = [email.to_json() for email in emails]
+    if payloads:
+        redis.rpush(OUTBOX_KEY, *payloads)
+    return len(payloads)
+
+async def enqueue_emails(redis, emails: Iterable[OutgoingEmail]) -> int:
+    payloads = [email.to_json() for email in emails]
+    if payloads:
+        await redis.rpush(OUTBOX_KEY, *payloads)
+    return len(payloads)
+
+class SMTPPool:
+    """Обмежений пул постійних SMTP-з'єднань одного event loop"""
+
+    def __init__(self, size: int):
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            timeout=settings.SMTP_TIMEOUT,
+            start_tls=settings.SMTP_STARTTLS,
+        )
+        await client.connect()
+        if settings.SMTP_USER:
+            await client.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return client
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            client, released_at = self._idle.pop()
+            if not client.is_connected:
+                continue
+            if time.monotonic() - released_at > settings.EMAIL_SMTP_IDLE_TIMEOUT:
+                try:
+                    await client.noop()
+                except aiosmtplib.SMTPException:
+                    client.close()
+                    continue
+            return client
+        return await self._connect()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        async with self._slots:
+            client = await self._checkout()
+            broken = False
+            try:
+                yield client
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError):
+                broken = True
+                raise
+            finally:
+                if broken or not client.is_connected:
+                    client.close()
+                else:
+                    self._idle.append((client, time.monotonic()))
+
+    async def close(self) -> None:
+        while self._idle:
+            client, _ = self._idle.pop()
+            try:
+                await client.quit()
+            except aiosmtplib.SMTPException:
+                client.close()
+
+class EmailDispatcher:
+    """Прохід по черзі: ліміти доменів, розсилка пачками, повтори"""
+
+    def __init__(self, redis, pool: SMTPPool):
+        self.redis = redis
+        self.pool = pool
+
+    async def _allowance(self, domain: str, wanted: int, now: float) -> int:
+        limit = settings.EMAIL_DOMAIN_RATE_LIMITS.get(domain, settings.EMAIL_DEFAULT_DOMAIN_RATE)
+        key = f"{RATE_PREFIX}:{domain}:{int(now // 60)}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incrby(key, wanted)
+            pipe.expire(key, 120)
+            used, _ = await pipe.execute()
+        allowed = max(0, min(wanted, limit - (used - wanted)))
+        if allowed < wanted:
+            # Невикористаний резерв повертаємо іншим воркерам
+            await self.redis.decrby(key, wanted - allowed)
+        return allowed
+
+    async def _settle(
+        self,
+        claimed: List[str],
+        deferred: Optional[Dict[str, float]] = None,
+        dead: Optional[List[str]] = None
+    ) -> None:
+        """Запис результату і зняття захоплення — однією транзакцією"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if deferred:
+                pipe.zadd(DEFERRED_KEY, deferred)
+            if dead:
+                pipe.rpush(DEAD_KEY, *dead)
+            if claimed:
+                pipe.zrem(PROCESSING_KEY, *claimed)
+            await pipe.execute()
+
+    async def _send_chunk(self, emails: List[OutgoingEmail]) -> Tuple[int, List[Tuple[OutgoingEmail, Exception]]]:
+        """Послідовна відправка пачки через одне з'єднання"""
+        sent, failed = 0, []
+        pending = list(emails)
+        while pending:
+            connected = False
+            try:
+                async with self.pool.connection() as client:
+                    connected = True
+                    while pending:
+                        email = pending[0]
+                        try:
+                            await client.send_message(email.to_mime())
+                            sent += 1
+                        except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPResponseException) as e:
+                            failed.append((email, e))
+                        except (aiosmtplib.SMTPException, OSError):
+                            # Помилки з'єднання обробляє зовнішній блок
+                            raise
+                        except Exception as e:
+                            # Один зіпсований лист не зупиняє решту пачки
+                            failed.append((email, e))
+                        pending.pop(0)
+            except (aiosmtplib.SMTPException, OSError) as e:
+                if not connected:
+                    # Сервер недоступний — уся пачка йде на повтор
+                    failed.extend((email, e) for email in pending)
+                    break
+                # З'єднання втрачено: поточний лист — спроба, решта піде новим з'єднанням
+                failed.append((pending.pop(0), e))
+        return sent, failed
+
+    def _handle_failures(
+        self,
+        failures: List[Tuple[OutgoingEmail, Exception]],
+        now: float
+    ) -> Tuple[Dict[str, float], List[str]]:
+        """Повтори (payload -> час) і листи для ``email:dead``"""
+        retried, dead = {}, []
+        for email, error in failures:
+            email.attempts += 1
+            if is_permanent(error) or email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                logger.error(f"Email {email.id} to {email.to_email} dropped after {email.attempts} attempts: {error}")
+                dead.append(email.to_json())
+            else:
+                logger.warning(f"Email {email.id} to {email.to_email} failed, retrying: {error}")
+                retried[email.to_json()] = now + retry_delay(email.attempts)
+        return retried, dead
+
+    async def requeue_stale(self, now: Optional[float] = None) -> int:
+        """Повертає в чергу захоплення воркерів, що не завершили пачку"""
+        cutoff = (now or time.time()) - settings.EMAIL_VISIBILITY_TIMEOUT
+        requeued = await self.redis.eval(_REQUEUE_SCRIPT, 2, OUTBOX_KEY, PROCESSING_KEY, cutoff)
+        if requeued:
+            logger.warning(f"Requeued {requeued} emails from stalled deliveries")
+        return requeued
+
+    async def run_batch(self) -> Dict[str, int]:
+        now = time.time()
+        await self.redis.eval(_PROMOTE_SCRIPT, 2, DEFERRED_KEY, OUTBOX_KEY, now, settings.EMAIL_BATCH_SIZE)
+        raw = await self.redis.eval(_CLAIM_SCRIPT, 2, OUTBOX_KEY, PROCESSING_KEY, now, settings.EMAIL_BATCH_SIZE)
+        stats = {"taken": len(raw), "sent": 0, "deferred": 0, "retried": 0, "dead": 0}
+        if not raw:
+            return stats
+
+        by_domain: Dict[str, List[Tuple[OutgoingEmail, str]]] = {}
+        malformed = []
+        for item in raw:
+            try:
+                email = OutgoingEmail.from_json(item)
+            except (ValueError, TypeError) as e:
+                logger.error(f"Malformed queued email dropped: {e}")
+                malformed.append(item)
+                continue
+            by_domain.setdefault(email.domain, []).append((email, item))
+        if malformed:
+            await self._settle(malformed)
+
+        ready: List[OutgoingEmail] = []
+        ready_claims: List[str] = []
+        next_window = (now // 60 + 1) * 60
+        for domain, claims in by_domain.items():
+            allowed = await self._allowance(domain, len(claims), now)
+            ready.extend(email for email, _ in claims[:allowed])
+            ready_claims.extend(item for _, item in claims[:allowed])
+            over_limit = claims[allowed:]
+            if over_limit:
+                await self._settle(
+                    [item for _, item in over_limit],
+                    deferred={email.to_json(): next_window for email, _ in over_limit}
+                )
+            stats["deferred"] += len(over_limit)
+
+        # Пачки по з'єднаннях пулу: листи одного домену разом
+        size = max(1, -(-len(ready) // settings.EMAIL_SMTP_POOL_SIZE))
+        chunks = [ready[offset:offset + size] for offset in range(0, len(ready), size)]
+        results = await asyncio.gather(
+            *(self._send_chunk(chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+        failures = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                # Результат пачки невідомий — уся пачка йде на повтор, захоплення все одно знімаються
+                logger.error(f"Email chunk of {len(chunk)} failed unexpectedly: {result}")
+                failures.extend((email, result) for email in chunk)
+                continue
+            sent, failed = result
+            stats["sent"] += sent
+            failures.extend(failed)
+        retried, dead = self._handle_failures(failures, now)
+        await self._settle(ready_claims, deferred=retried, dead=dead)
+        stats["retried"], stats["dead"] = len(retried), len(dead)
+        return stats
+
+    async def drain(self, budget: float) -> Dict[str, int]:
+        """Проходи, поки черга не порожня або не вичерпано час"""
+        started = time.monotonic()
+        totals: Dict[str, int] = {"requeued": await self.requeue_stale()}
+        while True:
+            stats = await self.run_batch()
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+            if stats["taken"] < settings.EMAIL_BATCH_SIZE or time.monotonic() - started > budget:
+                return totals
+
+class _MailerRuntime:
+    """Фоновий event loop процесу: пул SMTP живе між завданнями Celery"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatcher: Optional[EmailDispatcher] = None
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        if not settings.EMAIL_FROM:
+            # Без відправника кожен лист відхилить сервер — краще не захоплювати чергу
+            raise RuntimeError("EMAIL_FROM must be set to deliver emails")
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="smtp-pool", daemon=True).start()
+
+        async def init():
+            redis = aioredis.from_url(str(settings.REDIS_URL), encoding="utf8", decode_responses=True)
+            return EmailDispatcher(redis, SMTPPool(settings.EMAIL_SMTP_POOL_SIZE))
+
+        self._dispatcher = asyncio.run_coroutine_threadsafe(init(), loop).result()
+        return loop
+
+    def run(self, coro_factory) -> Any:
+        with self._lock:
+            if self._loop is None:
+                self._loop = self._start()
+        return asyncio.run_coroutine_threadsafe(coro_factory(self._dispatcher), self._loop).result()
+
+mailer_runtime = _MailerRuntime()
+
+def deliver_queued_emails(budget: Optional[float] = None) -> Dict[str, int]:
+    """Синхронна точка входу для завдання Celery"""
+    budget = budget if budget is not None else max(1, settings.EMAIL_DELIVERY_INTERVAL - 1)
+    return mailer_runtime.run(lambda dispatcher: dispatcher.drain(budget))
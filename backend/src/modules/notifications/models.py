@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Enum, Index, PrimaryKeyConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -10,8 +10,25 @@ from .enums import NotificationType, NotificationPriority, NotificationStatus
 
 class Notification(Base):
     __tablename__ = "notifications"
+    # Партиціонування за місяцями created_at — ключ партиції входить у первинний ключ
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        # Стрічка і масове прочитання непрочитаних: keyset за (created_at, id)
+        Index(
+            "ix_notifications_user_unread",
+            "user_id", "created_at", "id",
+            postgresql_where=text("is_read IS false")
+        ),
+        # Очищення старих прочитаних пакетами за (created_at, id)
+        Index(
+            "ix_notifications_read_created",
+            "created_at", "id",
+            postgresql_where=text("is_read IS true")
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     type = Column(Enum(NotificationType), default=NotificationType.IN_APP)
     title = Column(String(200), nullable=False)
@@ -25,7 +42,7 @@ class Notification(Base):
     sent_at = Column(DateTime)
     delivered_at = Column(DateTime)
     read_at = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Зв'язки
@@ -52,4 +69,31 @@ class Notification(Base):
 
     def mark_as_failed(self):
         """Позначити повідомлення як невдале"""
-        self.status = NotificationStatus.FAILED
\ No newline at end of file
+        self.status = NotificationStatus.FAILED
+
+class ScheduledNotification(Base):
+    """Відкладене повідомлення — довговічна копія елемента черги Redis"""
+    __tablename__ = "scheduled_notifications"
+    __table_args__ = (
+        # Звірка з чергою читає лише ще не видані
+        Index(
+            "ix_scheduled_notifications_pending",
+            "scheduled_for",
+            postgresql_where=text("dispatched_at IS NULL")
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    type = Column(Enum(NotificationType), default=NotificationType.IN_APP, nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+    priority = Column(Enum(NotificationPriority), default=NotificationPriority.NORMAL, nullable=False)
+    related_entity_type = Column(String(50))
+    related_entity_id = Column(UUID(as_uuid=True))
+    scheduled_for = Column(DateTime, nullable=False)
+    dispatched_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ScheduledNotification(id={self.id}, scheduled_for={self.scheduled_for})>"
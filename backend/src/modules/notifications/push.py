@@ -0,0 +1,210 @@
+"""Доставка повідомлень у реальному часі (WebSocket/SSE).
+
+Кожне створене повідомлення додається в обмежений потік Redis
+``notifications:stream:{user_id}`` (для відновлення після розриву) і
+публікується в канал ``notifications:live:{user_id}``. Кожен процес uvicorn
+тримає одне pub/sub-з'єднання (``NotificationHub``) і підписується лише на
+канали користувачів, підключених саме до нього; події розкладаються по
+обмежених чергах з'єднань. Переповнена черга закриває з'єднання — клієнт
+перепідключається з останнім id і дочитує пропущене з потоку.
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+import asyncio
+import json
+import logging
+
+from src.core.config import settings
+from src.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "notifications:stream"
+CHANNEL_PREFIX = "notifications:live"
+PAYLOAD_FIELDS = (
+    "id", "type", "title", "message", "priority",
+    "related_entity_type", "related_entity_id", "created_at",
+)
+
+def stream_key(user_id: UUID) -> str:
+    return f"{STREAM_PREFIX}:{user_id}"
+
+def channel_name(user_id: UUID) -> str:
+    return f"{CHANNEL_PREFIX}:{user_id}"
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def event_payload(notification: Any) -> str:
+    """JSON події з моделі або словника рядка INSERT"""
+    get = notification.get if isinstance(notification, dict) else lambda field: getattr(notification, field, None)
+    return json.dumps({field: _plain(get(field)) for field in PAYLOAD_FIELDS}, ensure_ascii=False)
+
+def _stream_id(value: str) -> Tuple[int, int]:
+    ms, _, seq = value.partition("-")
+    return int(ms), int(seq or 0)
+
+def parse_last_id(value: Optional[str]) -> Optional[str]:
+    """Id запису потоку з Last-Event-ID; некоректне значення ігнорується"""
+    if not value:
+        return None
+    try:
+        _stream_id(value)
+    except ValueError:
+        return None
+    return value
+
+async def publish_notifications(notifications: Iterable[Any]) -> None:
+    """Запис у потоки відновлення та публікація одним конвеєром (після коміту)"""
+    items = []
+    for notification in notifications:
+        user_id = notification["user_id"] if isinstance(notification, dict) else notification.user_id
+        if user_id:
+            items.append((user_id, event_payload(notification)))
+    if not items:
+        return
+    try:
+        redis = get_redis()
+        # Id запису потоку потрібен у повідомленні каналу, тому спершу XADD
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, data in items:
+                pipe.xadd(stream_key(user_id), {"data": data}, maxlen=settings.NOTIFICATION_PUSH_REPLAY_SIZE, approximate=True)
+                pipe.expire(stream_key(user_id), settings.NOTIFICATION_PUSH_REPLAY_TTL)
+            results = await pipe.execute()
+        async with redis.pipeline(transaction=False) as pipe:
+            for (user_id, data), entry_id in zip(items, results[::2]):
+                pipe.publish(channel_name(user_id), json.dumps({"id": entry_id, "data": data}))
+            await pipe.execute()
+    except Exception as e:
+        # Повідомлення вже збережені в БД — клієнт побачить їх у списку
+        logger.warning(f"Failed to publish {len(items)} notifications: {e}")
+
+class Subscriber:
+    def __init__(self, user_id: UUID):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.NOTIFICATION_PUSH_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, item: Tuple[str, str]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Повільний клієнт: звільняємо пам'ять і сигналізуємо про закриття
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+class NotificationHub:
+    """Одне pub/sub-з'єднання процесу, розподіл подій по локальних з'єднаннях"""
+
+    def __init__(self):
+        self._subscribers: Dict[UUID, Set[Subscriber]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, user_id: UUID) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = get_redis().pubsub()
+            local = self._subscribers.setdefault(user_id, set())
+            if not local:
+                await self._pubsub.subscribe(channel_name(user_id))
+            local.add(subscriber)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber) -> None:
+        async with self._lock:
+            local = self._subscribers.get(subscriber.user_id)
+            if local is None:
+                return
+            local.discard(subscriber)
+            if not local:
+                del self._subscribers[subscriber.user_id]
+                try:
+                    await self._pubsub.unsubscribe(channel_name(subscriber.user_id))
+                except Exception as e:
+                    logger.warning(f"Failed to unsubscribe notification channel: {e}")
+
+    async def _read(self) -> None:
+        while True:
+            if not self._pubsub.subscribed:
+                await asyncio.sleep(1)
+                continue
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification pub/sub read failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                user_id = UUID(message["channel"].rsplit(":", 1)[1])
+                event = json.loads(message["data"])
+            except (ValueError, KeyError, IndexError) as e:
+                logger.warning(f"Malformed notification event: {e}")
+                continue
+            for subscriber in list(self._subscribers.get(user_id, ())):
+                subscriber.offer((event["id"], event["data"]))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        self._subscribers.clear()
+        self._pubsub = self._reader = None
+
+notification_hub = NotificationHub()
+
+async def notification_events(user_id: UUID, last_id: Optional[str] = None) -> AsyncIterator[Optional[Tuple[str, str]]]:
+    """(id, JSON) подій користувача; None — час надіслати heartbeat.
+
+    Підписка відбувається до читання потоку, тож подія, що прийшла під час
+    відновлення, не загубиться, а дублікати відкидаються за id.
+    """
+    last_id = parse_last_id(last_id)
+    subscriber = await notification_hub.subscribe(user_id)
+    try:
+        seen = _stream_id(last_id) if last_id else None
+        if last_id:
+            entries = await get_redis().xrange(
+                stream_key(user_id), min=f"({last_id}", max="+", count=settings.NOTIFICATION_PUSH_REPLAY_SIZE
+            )
+            for entry_id, fields in entries:
+                seen = _stream_id(entry_id)
+                yield entry_id, fields["data"]
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.NOTIFICATION_PUSH_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is None:
+                return
+            if seen is not None and _stream_id(item[0]) <= seen:
+                continue
+            yield item
+    finally:
+        await notification_hub.unsubscribe(subscriber)
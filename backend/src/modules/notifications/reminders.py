@@ -0,0 +1,452 @@
+"""Планувальник нагадувань для засідань, подій календаря та задач.
+
+Нагадування зберігаються в Redis ZSET ``reminders:due`` (score — час
+спрацювання, UTC epoch) і заповнюються сервісами при створенні/зміні
+сутностей. Диспетчер забирає прострочені елементи Lua-скриптом — кожен
+елемент атомарно переноситься в ``reminders:processing`` і дістається
+рівно одному воркеру. Якщо воркер впав, елемент повертається в чергу після
+``REMINDER_VISIBILITY_TIMEOUT``. Нічна звірка з БД виправляє розбіжності.
+"""
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+import json
+import logging
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.core.redis import get_redis
+from src.modules.calendar.models import CalendarEvent
+from src.modules.calendar.recurrence import parse_rule, iter_occurrences
+from src.modules.hearings.models import Hearing, HearingStatus
+from src.modules.tasks.models import Task, TaskStatus
+from .enums import NotificationType, NotificationPriority
+from .delivery import NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+DUE_KEY = "reminders:due"
+PROCESSING_KEY = "reminders:processing"
+ENTITY_KEY_PREFIX = "reminders:entity"
+
+HEARING = "hearing"
+EVENT = "calendar_event"
+TASK = "task"
+# Наступне повторення серії шукаємо в межах цього горизонту
+RECURRENCE_LOOKAHEAD = timedelta(days=400)
+
+# Замінює всі нагадування сутності: KEYS = due, entity set; ARGV = score, member, ...
+_REPLACE_SCRIPT = """
+local old = redis.call('SMEMBERS', KEYS[2])
+if #old > 0 then redis.call('ZREM', KEYS[1], unpack(old)) end
+redis.call('DEL', KEYS[2])
+for i = 1, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call('SADD', KEYS[2], ARGV[i + 1])
+end
+return #ARGV / 2
+"""
+
+# Атомарно забирає до ARGV[2] прострочених елементів: KEYS = due, processing
+_CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+local claimed = {}
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+    local entry = due[i] .. '|' .. due[i + 1]
+    redis.call('ZADD', KEYS[2], ARGV[1], entry)
+    table.insert(claimed, entry)
+end
+return claimed
+"""
+
+# Повертає в чергу елементи, забрані воркером, що не завершив обробку
+_REQUEUE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, entry in ipairs(stale) do
+    local sep = string.find(entry, '|', 1, true)
+    redis.call('ZADD', KEYS[1], string.sub(entry, sep + 1), string.sub(entry, 1, sep - 1))
+    redis.call('ZREM', KEYS[2], entry)
+end
+return #stale
+"""
+
+def to_epoch(value: datetime) -> int:
+    # Час у БД — UTC без часового поясу
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+def from_epoch(value: float) -> datetime:
+    return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+
+def entity_key(kind: str, entity_id: UUID) -> str:
+    return f"{ENTITY_KEY_PREFIX}:{kind}:{entity_id}"
+
+def make_member(kind: str, entity_id: UUID, tag: str) -> str:
+    return f"{kind}:{entity_id}:{tag}"
+
+def split_member(member: str) -> Tuple[str, UUID, str]:
+    kind, entity_id, tag = member.split(":", 2)
+    return kind, UUID(entity_id), tag
+
+def event_offsets(reminders: Optional[str]) -> List[int]:
+    """Хвилини до початку з JSON-поля CalendarEvent.reminders"""
+    if not reminders:
+        return []
+    try:
+        items = json.loads(reminders)
+    except ValueError:
+        return []
+    offsets = set()
+    for item in items if isinstance(items, list) else []:
+        value = item.get("minutes", item.get("minutes_before")) if isinstance(item, dict) else item
+        try:
+            offsets.add(max(0, int(value)))
+        except (TypeError, ValueError):
+            continue
+    return sorted(offsets)
+
+def next_event_start(event: CalendarEvent, after: datetime) -> Optional[datetime]:
+    """Найближчий початок події (або повторення серії) після ``after``"""
+    if not event.is_recurring or not event.recurrence_pattern:
+        return event.start_time if event.start_time > after else None
+    try:
+        rule = parse_rule(event.recurrence_pattern, event.recurrence_end)
+    except ValueError:
+        return event.start_time if event.start_time > after else None
+    # Вікно iter_occurrences включає початок — повторення рівно в ``after`` вже не наступне
+    window_start = after + timedelta(microseconds=1)
+    return next(iter_occurrences(event.start_time, rule, window_start, after + RECURRENCE_LOOKAHEAD), None)
+
+def next_event_reminder(event: CalendarEvent, offset: int, after: datetime) -> Optional[int]:
+    """Час найближчого нагадування за ``offset`` хвилин, пізнішого за ``after``"""
+    lead = timedelta(minutes=offset)
+    start = next_event_start(event, after + lead)
+    return to_epoch(start - lead) if start is not None else None
+
+def hearing_reminders(hearing: Hearing, now: datetime) -> Dict[str, int]:
+    if hearing.status in (HearingStatus.CANCELLED, HearingStatus.COMPLETED) or hearing.hearing_date <= now:
+        return {}
+    return {
+        make_member(HEARING, hearing.id, str(offset)): to_epoch(hearing.hearing_date - timedelta(minutes=offset))
+        for offset in settings.REMINDER_HEARING_OFFSETS
+        if hearing.hearing_date - timedelta(minutes=offset) > now
+    }
+
+def event_reminders(event: CalendarEvent, now: datetime) -> Dict[str, int]:
+    if event.status == "cancelled" or not event.send_notifications:
+        return {}
+    offsets = event_offsets(event.reminders)
+    if not offsets:
+        return {}
+    # Для серій кожен відступ — до найближчого повторення, нагадування якого ще попереду:
+    # довгий відступ може вже вказувати на наступне повторення, поки коротші — на поточне
+    reminders = {}
+    for offset in offsets:
+        at = next_event_reminder(event, offset, now)
+        if at is not None:
+            reminders[make_member(EVENT, event.id, str(offset))] = at
+    return reminders
+
+def task_reminders(task: Task, now: datetime) -> Dict[str, int]:
+    if task.status in (TaskStatus.DONE, TaskStatus.CANCELLED) or not task.reminder_date or task.reminder_date <= now:
+        return {}
+    return {make_member(TASK, task.id, "at"): to_epoch(task.reminder_date)}
+
+class ReminderScheduler:
+    """Операції з чергою нагадувань у Redis"""
+
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+
+    async def replace(self, kind: str, entity_id: UUID, reminders: Dict[str, int]) -> None:
+        args: List[Any] = []
+        for member, score in reminders.items():
+            args.extend((score, member))
+        await self.redis.eval(_REPLACE_SCRIPT, 2, DUE_KEY, entity_key(kind, entity_id), *args)
+
+    async def add_many(self, kind: str, reminders: Dict[UUID, Dict[str, int]]) -> None:
+        """Додавання нагадувань для нових сутностей одним конвеєром (без заміни наявних)"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entity_id, members in reminders.items():
+                if members:
+                    pipe.zadd(DUE_KEY, members)
+                    pipe.sadd(entity_key(kind, entity_id), *members)
+            await pipe.execute()
+
+    async def claim(self, now: datetime, limit: int) -> List[str]:
+        """Забрані записи у вигляді member|score"""
+        return await self.redis.eval(_CLAIM_SCRIPT, 2, DUE_KEY, PROCESSING_KEY, to_epoch(now), limit)
+
+    async def complete(self, entries: Iterable[str]) -> None:
+        entries = list(entries)
+        if entries:
+            await self.redis.zrem(PROCESSING_KEY, *entries)
+
+    async def requeue_stale(self, now: datetime) -> int:
+        cutoff = to_epoch(now) - settings.REMINDER_VISIBILITY_TIMEOUT
+        return await self.redis.eval(_REQUEUE_SCRIPT, 2, DUE_KEY, PROCESSING_KEY, cutoff)
+
+    async def sync(self, kind: str, entity_id: UUID, wanted: Dict[str, int], actual: Dict[str, int]) -> None:
+        """Точкове виправлення майбутніх нагадувань без зачіпання вже прострочених"""
+        extra = [member for member in actual if member not in wanted]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if wanted:
+                pipe.zadd(DUE_KEY, wanted)
+                pipe.sadd(entity_key(kind, entity_id), *wanted)
+            if extra:
+                pipe.zrem(DUE_KEY, *extra)
+                pipe.srem(entity_key(kind, entity_id), *extra)
+            await pipe.execute()
+
+    async def scheduled_after(self, now: datetime) -> Dict[str, int]:
+        entries = await self.redis.zrangebyscore(DUE_KEY, f"({to_epoch(now)}", "+inf", withscores=True)
+        return {member: int(score) for member, score in entries}
+
+async def _safe_replace(kind: str, entity_id: UUID, reminders: Dict[str, int]) -> None:
+    # Недоступний Redis не повинен ламати збереження — нічна звірка відновить чергу
+    try:
+        await ReminderScheduler().replace(kind, entity_id, reminders)
+    except Exception as e:
+        logger.warning(f"Failed to schedule reminders for {kind} {entity_id}: {e}")
+
+async def schedule_hearing_reminders(hearing: Hearing) -> None:
+    await _safe_replace(HEARING, hearing.id, hearing_reminders(hearing, datetime.utcnow()))
+
+async def schedule_event_reminders(event: CalendarEvent) -> None:
+    await _safe_replace(EVENT, event.id, event_reminders(event, datetime.utcnow()))
+
+async def schedule_task_reminders(task: Task) -> None:
+    await _safe_replace(TASK, task.id, task_reminders(task, datetime.utcnow()))
+
+async def schedule_new_task_reminders(tasks: Iterable[Task]) -> None:
+    now = datetime.utcnow()
+    reminders = {task.id: task_reminders(task, now) for task in tasks}
+    reminders = {task_id: members for task_id, members in reminders.items() if members}
+    if not reminders:
+        return
+    try:
+        await ReminderScheduler().add_many(TASK, reminders)
+    except Exception as e:
+        logger.warning(f"Failed to schedule reminders for {len(reminders)} new tasks: {e}")
+
+async def cancel_reminders(kind: str, entity_id: UUID) -> None:
+    await _safe_replace(kind, entity_id, {})
+
+class ReminderDispatcher:
+    """Видача прострочених нагадувань у вигляді сповіщень"""
+
+    def __init__(self, db: AsyncSession, scheduler: Optional[ReminderScheduler] = None):
+        self.db = db
+        self.scheduler = scheduler or ReminderScheduler()
+
+    async def _load(self, model, ids: List[UUID]) -> Dict[UUID, Any]:
+        if not ids:
+            return {}
+        result = await self.db.execute(select(model).where(model.id.in_(ids)))
+        return {item.id: item for item in result.scalars().all()}
+
+    async def dispatch(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Обробляє всі прострочені нагадування пакетами"""
+        now = now or datetime.utcnow()
+        stats = {"requeued": await self.scheduler.requeue_stale(now), "sent": 0, "skipped": 0}
+        while True:
+            claimed = await self.scheduler.claim(now, settings.REMINDER_BATCH_SIZE)
+            if not claimed:
+                break
+            sent, skipped = await self._dispatch_batch(claimed, now)
+            stats["sent"] += sent
+            stats["skipped"] += skipped
+            if len(claimed) < settings.REMINDER_BATCH_SIZE:
+                break
+        return stats
+
+    async def _dispatch_batch(self, claimed: List[str], now: datetime) -> Tuple[int, int]:
+        parsed = []
+        ids = defaultdict(set)
+        for entry in claimed:
+            member, _, score = entry.rpartition("|")
+            try:
+                score = int(float(score))
+                kind, entity_id, tag = split_member(member)
+            except ValueError:
+                logger.warning(f"Malformed reminder {member}")
+                continue
+            parsed.append((member, score, kind, entity_id, tag))
+            ids[kind].add(entity_id)
+
+        try:
+            hearings = await self._load(Hearing, list(ids[HEARING]))
+            events = await self._load(CalendarEvent, list(ids[EVENT]))
+            tasks = await self._load(Task, list(ids[TASK]))
+        except SQLAlchemyError as e:
+            logger.error(f"Error loading reminder entities: {e}")
+            raise DatabaseException("Failed to load reminder entities")
+
+        rows = []
+        reminded_hearings = set()
+        # Наступне нагадування серії за тим самим відступом: {event_id: {member: score}}
+        followups: Dict[UUID, Dict[str, int]] = defaultdict(dict)
+        for member, score, kind, entity_id, tag in parsed:
+            if kind == HEARING and entity_id in hearings:
+                hearing = hearings[entity_id]
+                # Засідання перенесли/скасували після планування — нагадування застаріло
+                if hearing.status in (HearingStatus.CANCELLED, HearingStatus.COMPLETED):
+                    continue
+                if not tag.isdigit() or to_epoch(hearing.hearing_date - timedelta(minutes=int(tag))) != score:
+                    continue
+                rows.append(self._row(
+                    hearing.created_by_id, HEARING, hearing.id,
+                    f"Нагадування: засідання «{hearing.title}»",
+                    f"Засідання {hearing.hearing_date:%d.%m.%Y %H:%M}"
+                    + (f", {hearing.location}" if hearing.location else "")
+                    + (f", зала {hearing.courtroom}" if hearing.courtroom else ""),
+                    NotificationPriority.HIGH, now
+                ))
+                reminded_hearings.add(hearing.id)
+            elif kind == EVENT and entity_id in events:
+                event = events[entity_id]
+                if event.status == "cancelled" or not event.send_notifications:
+                    continue
+                if not tag.isdigit():
+                    continue
+                lead = timedelta(minutes=int(tag))
+                # Повторення, якому належить нагадування: його початок — score + відступ
+                start = next_event_start(event, from_epoch(score) + lead - timedelta(seconds=1))
+                if start is None or to_epoch(start - lead) != score:
+                    continue
+                rows.append(self._row(
+                    event.created_by_id, EVENT, event.id,
+                    f"Нагадування: {event.title}",
+                    f"Початок {start:%d.%m.%Y %H:%M}" + (f", {event.location}" if event.location else ""),
+                    NotificationPriority.NORMAL, now
+                ))
+                if event.is_recurring:
+                    # Після запізнілого запуску пропущені повторення не надолужуємо
+                    following = next_event_reminder(event, int(tag), max(start - lead, now))
+                    if following is not None:
+                        followups[event.id][member] = following
+            elif kind == TASK and entity_id in tasks:
+                task = tasks[entity_id]
+                if task.status in (TaskStatus.DONE, TaskStatus.CANCELLED) or not task.reminder_date:
+                    continue
+                if to_epoch(task.reminder_date) != score:
+                    continue
+                due = f", термін {task.due_date:%d.%m.%Y}" if task.due_date else ""
+                rows.append(self._row(
+                    task.assigned_to_id, TASK, task.id,
+                    f"Нагадування: задача «{task.title}»",
+                    f"Задача очікує виконання{due}",
+                    NotificationPriority.NORMAL, now
+                ))
+
+        delivery = NotificationDelivery(self.db)
+        try:
+            await delivery.stage(rows, now)
+            if reminded_hearings:
+                await self.db.execute(
+                    update(Hearing)
+                    .where(Hearing.id.in_(reminded_hearings))
+                    .values(reminders_sent=True, last_reminder_sent=now)
+                )
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error dispatching reminders: {e}")
+            # Елементи залишаються в processing і повернуться в чергу після тайм-ауту
+            raise DatabaseException("Failed to dispatch reminders")
+
+        await self.scheduler.complete(claimed)
+        await delivery.after_commit()
+        # Серії: спрацьований відступ одразу переходить на наступне повторення
+        if followups:
+            await self.scheduler.add_many(EVENT, followups)
+        return len(rows), len(claimed) - len(rows)
+
+    @staticmethod
+    def _row(user_id, entity_type, entity_id, title, message, priority, now) -> Dict[str, Any]:
+        return {
+            "id": uuid4(),  # id потрібен у події для WebSocket/SSE
+            "user_id": user_id,
+            "type": NotificationType.IN_APP,
+            "title": title[:200],
+            "message": message,
+            "priority": priority,
+            "related_entity_type": entity_type,
+            "related_entity_id": entity_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Звіряє майбутні нагадування в Redis з БД і виправляє розбіжності"""
+        now = datetime.utcnow()
+        try:
+            hearings = (await self.db.execute(
+                select(Hearing).where(
+                    and_(
+                        Hearing.hearing_date > now,
+                        Hearing.status.notin_([HearingStatus.CANCELLED, HearingStatus.COMPLETED])
+                    )
+                )
+            )).scalars().all()
+            events = (await self.db.execute(
+                select(CalendarEvent).where(
+                    and_(
+                        CalendarEvent.status != "cancelled",
+                        CalendarEvent.send_notifications.is_(True),
+                        CalendarEvent.reminders.isnot(None),
+                        or_(
+                            CalendarEvent.start_time > now,
+                            and_(
+                                CalendarEvent.is_recurring.is_(True),
+                                or_(CalendarEvent.recurrence_end.is_(None), CalendarEvent.recurrence_end > now)
+                            )
+                        )
+                    )
+                )
+            )).scalars().all()
+            tasks = (await self.db.execute(
+                select(Task).where(
+                    and_(
+                        Task.reminder_date > now,
+                        Task.status.notin_([TaskStatus.DONE, TaskStatus.CANCELLED])
+                    )
+                )
+            )).scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error loading entities for reminder reconciliation: {e}")
+            raise DatabaseException("Failed to reconcile reminders")
+
+        expected: Dict[Tuple[str, UUID], Dict[str, int]] = {}
+        for hearing in hearings:
+            expected[(HEARING, hearing.id)] = hearing_reminders(hearing, now)
+        for event in events:
+            expected[(EVENT, event.id)] = event_reminders(event, now)
+        for task in tasks:
+            expected[(TASK, task.id)] = task_reminders(task, now)
+
+        actual: Dict[Tuple[str, UUID], Dict[str, int]] = defaultdict(dict)
+        for member, score in (await self.scheduler.scheduled_after(now)).items():
+            try:
+                kind, entity_id, _ = split_member(member)
+            except ValueError:
+                continue
+            actual[(kind, entity_id)][member] = score
+
+        fixed = removed = 0
+        for key in set(expected) | set(actual):
+            wanted = expected.get(key, {})
+            if wanted != actual.get(key, {}):
+                await self.scheduler.sync(key[0], key[1], wanted, actual.get(key, {}))
+                if wanted:
+                    fixed += 1
+                else:
+                    removed += 1
+        stats = {"entities": len(expected), "fixed": fixed, "removed": removed}
+        logger.info(f"Reminder reconciliation: {stats}")
+        return stats
@@ -0,0 +1,175 @@
+"""Очищення старих прочитаних повідомлень.
+
+Прочитані повідомлення, старші за ``NOTIFICATION_RETENTION_DAYS``, видаляються
+невеликими пакетами в порядку (created_at, id): кожен пакет — окрема коротка
+транзакція ``DELETE ... RETURNING``, між пакетами пауза, тож довгих блокувань
+і сплесків WAL немає. Видалені рядки перед комітом зберігаються в MinIO як
+NDJSON.gz — якщо завантаження не вдалося, транзакція відкочується і рядки
+залишаються на місці. Цілі місячні партиції й далі архівує PartitionManager.
+"""
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+import asyncio
+import gzip
+import json
+import logging
+import time
+
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.core.metrics import record_job_metrics
+from src.core.redis import get_redis
+from src.core.storage import get_minio_client
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+JOB = "notification_retention"
+LOCK_KEY = "notifications:retention:lock"
+ARCHIVE_PREFIX = "archive/notifications/read"
+
+# Знімає блокування лише власник запуску (після тайм-ауту його міг взяти інший)
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def archive_key(run_id: str, started: datetime, batch: int) -> str:
+    return f"{ARCHIVE_PREFIX}/{started:%Y/%m/%d}/{run_id}-{batch:05d}.ndjson.gz"
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+def to_ndjson_gz(rows: List[Dict[str, Any]]) -> bytes:
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+        for row in rows:
+            archive.write(json.dumps(row, default=_json_default, ensure_ascii=False).encode("utf-8"))
+            archive.write(b"\n")
+    return buffer.getvalue()
+
+class NotificationRetention:
+    """Пакетне видалення (з архівуванням) прочитаних повідомлень"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.utcnow()
+        run_id = uuid4().hex
+        redis = get_redis()
+        # Запуски не перекриваються: тривалий попередній ще працює — пропускаємо
+        if not await redis.set(LOCK_KEY, run_id, nx=True, ex=settings.NOTIFICATION_RETENTION_MAX_SECONDS + 60):
+            logger.info("Notification retention already running, skipped")
+            return {"skipped": True}
+
+        cutoff = now - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+        started = time.monotonic()
+        stats = {"batches": 0, "deleted": 0, "archived_bytes": 0, "complete": False}
+        position: Optional[Tuple[datetime, UUID]] = None
+        try:
+            while time.monotonic() - started < settings.NOTIFICATION_RETENTION_MAX_SECONDS:
+                deleted, size, position = await self._purge_batch(cutoff, position, run_id, now, stats["batches"])
+                if not deleted:
+                    stats["complete"] = True
+                    break
+                stats["batches"] += 1
+                stats["deleted"] += deleted
+                stats["archived_bytes"] += size
+                if deleted < settings.NOTIFICATION_RETENTION_BATCH_SIZE:
+                    stats["complete"] = True
+                    break
+                await asyncio.sleep(settings.NOTIFICATION_RETENTION_BATCH_PAUSE)
+        except Exception:
+            await record_job_metrics(JOB, counters={"failures_total": 1})
+            raise
+        finally:
+            await redis.eval(_RELEASE_SCRIPT, 1, LOCK_KEY, run_id)
+
+        duration = time.monotonic() - started
+        await record_job_metrics(
+            JOB,
+            counters={
+                "rows_deleted_total": stats["deleted"],
+                "archived_bytes_total": stats["archived_bytes"],
+                "batches_total": stats["batches"],
+            },
+            gauges={
+                "last_success_timestamp": now.replace(tzinfo=timezone.utc).timestamp(),
+                "last_duration_seconds": round(duration, 3),
+                "last_rows_deleted": stats["deleted"],
+                # 0 — бюджет часу вичерпано, залишок буде видалено наступним запуском
+                "last_run_complete": int(stats["complete"]),
+            }
+        )
+        stats["duration"] = round(duration, 3)
+        logger.info(f"Notification retention: {stats}")
+        return stats
+
+    async def _purge_batch(
+        self,
+        cutoff: datetime,
+        position: Optional[Tuple[datetime, UUID]],
+        run_id: str,
+        started: datetime,
+        batch: int
+    ) -> Tuple[int, int, Optional[Tuple[datetime, UUID]]]:
+        """Один пакет: DELETE ... RETURNING, архів у MinIO, коміт"""
+        conditions = [Notification.is_read.is_(True), Notification.created_at < cutoff]
+        candidates = select(Notification.id, Notification.created_at).where(*conditions)
+        if position:
+            # Keyset: не переглядаємо мертві записи індексу, які ще не прибрав вакуум
+            candidates = candidates.where(tuple_(Notification.created_at, Notification.id) > tuple_(*position))
+        candidates = candidates.order_by(Notification.created_at, Notification.id).limit(
+            settings.NOTIFICATION_RETENTION_BATCH_SIZE
+        )
+        columns = list(Notification.__table__.c)
+        try:
+            result = await self.db.execute(
+                delete(Notification)
+                .where(tuple_(Notification.id, Notification.created_at).in_(candidates), *conditions)
+                .returning(*columns)
+                .execution_options(synchronize_session=False)
+            )
+            rows = [dict(row._mapping) for row in result.all()]
+            if not rows:
+                await self.db.rollback()
+                return 0, 0, position
+            size = 0
+            if settings.NOTIFICATION_RETENTION_ARCHIVE:
+                data = to_ndjson_gz(rows)
+                size = len(data)
+                await asyncio.to_thread(
+                    get_minio_client().put_object,
+                    settings.MINIO_BUCKET,
+                    archive_key(run_id, started, batch),
+                    BytesIO(data),
+                    size,
+                    content_type="application/gzip"
+                )
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error purging read notifications: {e}")
+            raise DatabaseException("Failed to purge read notifications")
+        except Exception:
+            # Архів не збережено — рядки не видаляємо
+            await self.db.rollback()
+            raise
+        last = max(rows, key=lambda row: (row["created_at"], row["id"]))
+        return len(rows), size, (last["created_at"], last["id"])
@@ -1,24 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
 from uuid import UUID
+import json
 
-from src.core.database import get_db
-from src.core.security import get_current_user
-from . import service, schemas
+from src.core.database import get_db, db_manager
+from src.core.security import get_current_user, verify_token
+from . import service, schemas, counters
+from .push import notification_events
+from .models import ScheduledNotification
 from src.modules.auth.models import User
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
-@router.post("/", response_model=schemas.NotificationResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=Union[schemas.NotificationResponse, schemas.ScheduledNotificationResponse],
+    status_code=status.HTTP_201_CREATED
+)
 async def create_notification(
     notification: schemas.NotificationCreate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    return notification_service.create_notification(
-        db=db,
+    notification_service = service.NotificationService(db)
+    created = await notification_service.create_notification(
         user_id=current_user.id,
         title=notification.title,
         message=notification.message,
@@ -28,32 +37,170 @@ async def create_notification(
         related_entity_id=notification.related_entity_id,
         scheduled_for=notification.scheduled_for
     )
+    if isinstance(created, ScheduledNotification):
+        # Відкладене: буде видане диспетчером у scheduled_for
+        response.status_code = status.HTTP_202_ACCEPTED
+        return schemas.ScheduledNotificationResponse.model_validate(created)
+    return created
 
-@router.get("/", response_model=List[schemas.NotificationResponse])
+@router.delete("/scheduled/{scheduled_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_scheduled_notification(
+    scheduled_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification_service = service.NotificationService(db)
+    if not await notification_service.cancel_scheduled_notification(scheduled_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Scheduled notification not found")
+
+@router.get("/", response_model=schemas.NotificationPage)
 async def list_notifications(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     unread_only: Optional[bool] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    return notification_service.get_user_notifications(
-        db=db,
+    notification_service = service.NotificationService(db)
+    return await notification_service.get_user_notifications(
         user_id=current_user.id,
         unread_only=unread_only or False,
-        limit=limit,
-        offset=skip
+        cursor=cursor,
+        limit=limit
     )
 
+@router.post("/mark-all-as-read", response_model=dict)
+async def mark_all_notifications_as_read(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification_service = service.NotificationService(db)
+    count = await notification_service.mark_all_notifications_as_read(current_user.id)
+    return {"message": f"Marked {count} notifications as read"}
+
+@router.post("/mark-as-read", response_model=schemas.NotificationMarkReadResult)
+async def mark_notifications_as_read(
+    request: schemas.NotificationMarkRead,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification_service = service.NotificationService(db)
+    ids = await notification_service.mark_notifications_as_read(current_user.id, request.ids)
+    return schemas.NotificationMarkReadResult(updated=len(ids), ids=ids)
+
+@router.get("/preferences", response_model=schemas.NotificationPreferences)
+async def get_notification_preferences(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification_service = service.NotificationService(db)
+    preferences = await notification_service.get_preferences(current_user.id)
+    if preferences is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return preferences
+
+@router.put("/preferences", response_model=schemas.NotificationPreferences)
+async def update_notification_preferences(
+    preferences: schemas.NotificationPreferences,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification_service = service.NotificationService(db)
+    updated = await notification_service.update_preferences(current_user.id, preferences)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated
+
+@router.get("/unread/count", response_model=schemas.UnreadNotificationCount)
+async def get_unread_notification_count(
+    current_user: User = Depends(get_current_user)
+):
+    # Лише лічильник у Redis — бейдж опитується на кожній сторінці
+    count = await counters.get_unread_count(current_user.id)
+    return schemas.UnreadNotificationCount(count=count)
+
+async def _stream_user_id(token: Optional[str]) -> UUID:
+    """Користувач за JWT; браузерні EventSource/WebSocket передають токен у query"""
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    payload = verify_token(token)
+    # Окрема коротка сесія: довгоживуче з'єднання не повинно тримати з'єднання з БД
+    async with db_manager.get_async_db() as db:
+        result = await db.execute(
+            select(User.id).where(and_(User.email == payload.get("sub"), User.is_active.is_(True)))
+        )
+        user_id = result.scalar_one_or_none()
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    return user_id
+
+def _bearer(authorization: Optional[str], token: Optional[str]) -> Optional[str]:
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return token
+
+@router.get("/stream")
+async def stream_notifications(
+    token: Optional[str] = None,
+    last_id: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Server-Sent Events; після розриву браузер сам надсилає Last-Event-ID"""
+    user_id = await _stream_user_id(_bearer(authorization, token))
+
+    async def body():
+        yield "retry: 3000\n\n"
+        async for event in notification_events(user_id, last_event_id or last_id):
+            if event is None:
+                yield ": ping\n\n"
+            else:
+                yield f"id: {event[0]}\nevent: notification\ndata: {event[1]}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # GZipMiddleware пропускає відповіді із заданим Content-Encoding — інакше події буферизуються
+            "Content-Encoding": "identity",
+        }
+    )
+
+@router.websocket("/ws")
+async def notifications_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    last_id: Optional[str] = None
+):
+    try:
+        user_id = await _stream_user_id(_bearer(websocket.headers.get("authorization"), token))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    try:
+        async for event in notification_events(user_id, last_id):
+            if event is None:
+                await websocket.send_text(json.dumps({"type": "ping"}))
+            else:
+                await websocket.send_text(
+                    f'{{"type": "notification", "id": {json.dumps(event[0])}, "data": {event[1]}}}'
+                )
+        # Черга переповнилась — клієнт має перепідключитися з останнім id
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/{notification_id}", response_model=schemas.NotificationResponse)
 async def get_notification(
     notification_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    db_notification = notification_service.get_notification_by_id(db, str(notification_id))
+    notification_service = service.NotificationService(db)
+    db_notification = await notification_service.get_notification_by_id(notification_id, current_user.id)
     if not db_notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     return db_notification
@@ -62,11 +209,11 @@ async def get_notification(
 async def update_notification(
     notification_id: UUID,
     notification: schemas.NotificationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    db_notification = notification_service.update_notification(db, str(notification_id), notification)
+    notification_service = service.NotificationService(db)
+    db_notification = await notification_service.update_notification(notification_id, current_user.id, notification)
     if not db_notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     return db_notification
@@ -74,40 +221,22 @@ async def update_notification(
 @router.delete("/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_notification(
     notification_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    success = notification_service.delete_notification(db, str(notification_id))
+    notification_service = service.NotificationService(db)
+    success = await notification_service.delete_notification(notification_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Notification not found")
 
 @router.post("/{notification_id}/mark-as-read", response_model=schemas.NotificationResponse)
 async def mark_notification_as_read(
     notification_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification_service = service.NotificationService()
-    db_notification = notification_service.mark_notification_as_read(db, str(notification_id))
+    notification_service = service.NotificationService(db)
+    db_notification = await notification_service.mark_notification_as_read(notification_id, current_user.id)
     if not db_notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     return db_notification
-
-@router.post("/mark-all-as-read", response_model=dict)
-async def mark_all_notifications_as_read(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    notification_service = service.NotificationService()
-    count = notification_service.mark_all_notifications_as_read(db, str(current_user.id))
-    return {"message": f"Marked {count} notifications as read"}
-
-@router.get("/unread/count", response_model=schemas.UnreadNotificationCount)
-async def get_unread_notification_count(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    notification_service = service.NotificationService()
-    count = notification_service.get_unread_notification_count(db, str(current_user.id))
-    return schemas.UnreadNotificationCount(count=count)
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""Черга відкладених повідомлень.
+
+Повідомлення з ``scheduled_for`` у майбутньому записуються в таблицю
+``scheduled_notifications`` і додаються в Redis ZSET
+``notifications:scheduled:due`` (score — час видачі, UTC epoch). Диспетчер
+атомарно забирає прострочені елементи в ``notifications:scheduled:processing``
+(елемент дістається одному воркеру; після збою він повертається в чергу через
+``NOTIFICATION_SCHEDULE_VISIBILITY_TIMEOUT``). Остаточний захист від повторної
+видачі — ``UPDATE ... SET dispatched_at WHERE dispatched_at IS NULL``: рядок
+видається лише тією транзакцією, що його позначила. Звірка з БД повертає в
+чергу елементи, загублені Redis.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import logging
+
+from sqlalchemy import select, update, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.core.redis import get_redis
+from .models import ScheduledNotification
+from .delivery import NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+DUE_KEY = "notifications:scheduled:due"
+PROCESSING_KEY = "notifications:scheduled:processing"
+
+# Атомарно переносить до ARGV[2] прострочених елементів у processing: KEYS = due, processing
+_CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+    redis.call('ZADD', KEYS[2], ARGV[1], member)
+end
+return due
+"""
+
+# Повертає в чергу елементи воркера, що не завершив обробку: ARGV = cutoff, score
+_REQUEUE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, member in ipairs(stale) do
+    redis.call('ZADD', KEYS[1], ARGV[2], member)
+    redis.call('ZREM', KEYS[2], member)
+end
+return #stale
+"""
+
+def to_epoch(value: datetime) -> int:
+    # Час у БД — UTC без часового поясу
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+def as_utc(value: datetime) -> datetime:
+    """Час клієнта з часовим поясом -> UTC без поясу, як у БД"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+async def enqueue(items: Dict[UUID, datetime]) -> None:
+    """Додавання в чергу після коміту; збій Redis виправить звірка"""
+    if not items:
+        return
+    try:
+        await get_redis().zadd(DUE_KEY, {str(item_id): to_epoch(when) for item_id, when in items.items()})
+    except Exception as e:
+        logger.warning(f"Failed to queue {len(items)} scheduled notifications: {e}")
+
+async def schedule_notification(db: AsyncSession, **values: Any) -> ScheduledNotification:
+    """Збереження відкладеного повідомлення і постановка в чергу"""
+    values["scheduled_for"] = as_utc(values["scheduled_for"])
+    scheduled = ScheduledNotification(**values)
+    try:
+        db.add(scheduled)
+        await db.commit()
+        await db.refresh(scheduled)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error scheduling notification for user {values.get('user_id')}: {e}")
+        raise DatabaseException("Failed to schedule notification")
+    await enqueue({scheduled.id: scheduled.scheduled_for})
+    return scheduled
+
+async def cancel_scheduled(db: AsyncSession, scheduled_id: UUID, user_id: UUID) -> bool:
+    """Скасування ще не виданого повідомлення"""
+    try:
+        result = await db.execute(
+            delete(ScheduledNotification)
+            .where(
+                ScheduledNotification.id == scheduled_id,
+                ScheduledNotification.user_id == user_id,
+                ScheduledNotification.dispatched_at.is_(None)
+            )
+            .returning(ScheduledNotification.id)
+        )
+        deleted = result.scalar_one_or_none()
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error cancelling scheduled notification {scheduled_id}: {e}")
+        raise DatabaseException("Failed to cancel scheduled notification")
+    if deleted is None:
+        return False
+    try:
+        await get_redis().zrem(DUE_KEY, str(scheduled_id))
+    except Exception as e:
+        # Диспетчер пропустить елемент без рядка в БД
+        logger.warning(f"Failed to dequeue scheduled notification {scheduled_id}: {e}")
+    return True
+
+class ScheduledNotificationDispatcher:
+    """Видача відкладених повідомлень, строк яких настав"""
+
+    def __init__(self, db: AsyncSession, redis=None):
+        self.db = db
+        self.redis = redis or get_redis()
+
+    async def dispatch(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.utcnow()
+        cutoff = to_epoch(now) - settings.NOTIFICATION_SCHEDULE_VISIBILITY_TIMEOUT
+        stats = {
+            "requeued": await self.redis.eval(_REQUEUE_SCRIPT, 2, DUE_KEY, PROCESSING_KEY, cutoff, to_epoch(now)),
+            "sent": 0,
+            "skipped": 0,
+        }
+        while True:
+            claimed = await self.redis.eval(
+                _CLAIM_SCRIPT, 2, DUE_KEY, PROCESSING_KEY, to_epoch(now), settings.NOTIFICATION_SCHEDULE_BATCH_SIZE
+            )
+            if not claimed:
+                break
+            sent = await self._dispatch_batch(claimed, now)
+            stats["sent"] += sent
+            stats["skipped"] += len(claimed) - sent
+            if len(claimed) < settings.NOTIFICATION_SCHEDULE_BATCH_SIZE:
+                break
+        return stats
+
+    async def _dispatch_batch(self, claimed: List[str], now: datetime) -> int:
+        ids = []
+        for member in claimed:
+            try:
+                ids.append(UUID(member))
+            except ValueError:
+                logger.warning(f"Malformed scheduled notification {member}")
+
+        delivery = NotificationDelivery(self.db)
+        try:
+            rows = []
+            if ids:
+                # Позначка dispatched_at — видача рівно один раз навіть при дублікаті в Redis
+                result = await self.db.execute(
+                    update(ScheduledNotification)
+                    .where(ScheduledNotification.id.in_(ids), ScheduledNotification.dispatched_at.is_(None))
+                    .values(dispatched_at=now)
+                    .returning(
+                        ScheduledNotification.id,
+                        ScheduledNotification.user_id,
+                        ScheduledNotification.type,
+                        ScheduledNotification.title,
+                        ScheduledNotification.message,
+                        ScheduledNotification.priority,
+                        ScheduledNotification.related_entity_type,
+                        ScheduledNotification.related_entity_id,
+                        ScheduledNotification.scheduled_for,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                rows = [self._row(item, now) for item in result.all()]
+            await delivery.stage(rows, now)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error dispatching scheduled notifications: {e}")
+            # Елементи залишаються в processing і повернуться в чергу після тайм-ауту
+            raise DatabaseException("Failed to dispatch scheduled notifications")
+
+        await self.redis.zrem(PROCESSING_KEY, *claimed)
+        await delivery.after_commit()
+        return len(rows)
+
+    @staticmethod
+    def _row(item, now: datetime) -> Dict[str, Any]:
+        return {
+            # Той самий id — повідомлення відстежується до відкладеного запису
+            "id": item.id,
+            "user_id": item.user_id,
+            "type": item.type,
+            "title": item.title,
+            "message": item.message,
+            "priority": item.priority,
+            "related_entity_type": item.related_entity_type,
+            "related_entity_id": item.related_entity_id,
+            "scheduled_for": item.scheduled_for,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Повертає в чергу невидані записи, яких немає в Redis"""
+        queued = set(await self.redis.zrange(DUE_KEY, 0, -1)) | set(await self.redis.zrange(PROCESSING_KEY, 0, -1))
+        stats = {"pending": 0, "restored": 0}
+        position: Optional[Tuple[datetime, UUID]] = None
+        while True:
+            query = select(ScheduledNotification.id, ScheduledNotification.scheduled_for).where(
+                ScheduledNotification.dispatched_at.is_(None)
+            )
+            if position:
+                query = query.where(
+                    tuple_(ScheduledNotification.scheduled_for, ScheduledNotification.id) > tuple_(*position)
+                )
+            try:
+                result = await self.db.execute(
+                    query.order_by(ScheduledNotification.scheduled_for, ScheduledNotification.id)
+                    .limit(settings.NOTIFICATION_SCHEDULE_BATCH_SIZE)
+                )
+                pending = result.all()
+            except SQLAlchemyError as e:
+                logger.error(f"Error loading pending scheduled notifications: {e}")
+                raise DatabaseException("Failed to reconcile scheduled notifications")
+            if not pending:
+                break
+            stats["pending"] += len(pending)
+            missing = {item_id: when for item_id, when in pending if str(item_id) not in queued}
+            if missing:
+                await self.redis.zadd(DUE_KEY, {str(item_id): to_epoch(when) for item_id, when in missing.items()})
+                stats["restored"] += len(missing)
+            position = (pending[-1].scheduled_for, pending[-1].id)
+        if stats["restored"]:
+            logger.warning(f"Scheduled notification queue restored: {stats}")
+        return stats
@@ -4,7 +4,7 @@ from typing import Optional, List
 from uuid import UUID
 from enum import Enum
 
-from .enums import NotificationType, NotificationPriority, NotificationStatus
+from .enums import NotificationType, NotificationPriority, NotificationStatus, DigestMode
 
 class NotificationBase(BaseModel):
     user_id: UUID
@@ -46,6 +46,22 @@ class NotificationResponse(NotificationBase):
     class Config:
         from_attributes = True
 
+class ScheduledNotificationResponse(BaseModel):
+    id: UUID
+    user_id: UUID
+    title: str
+    message: str
+    type: NotificationType
+    priority: NotificationPriority
+    related_entity_type: Optional[str] = None
+    related_entity_id: Optional[UUID] = None
+    scheduled_for: datetime
+    dispatched_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class UnreadNotificationCount(BaseModel):
     count: int
 
@@ -53,4 +69,19 @@ class NotificationListResponse(BaseModel):
     notifications: List[NotificationResponse]
     total: int
     page: int
-    size: int
\ No newline at end of file
+    size: int
+
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_cursor: Optional[str] = None
+
+class NotificationMarkRead(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+
+class NotificationMarkReadResult(BaseModel):
+    updated: int
+    ids: List[UUID]
+
+class NotificationPreferences(BaseModel):
+    digest: DigestMode = DigestMode.IMMEDIATE
+
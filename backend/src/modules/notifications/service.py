@@ -1,255 +1,268 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func, and_
+from typing import Any, Dict, List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, and_, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from uuid import UUID
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText  # Виправлено: MIMEText замість MimeText
-from email.mime.multipart import MIMEMultipart  # Виправлено: MIMEMultipart замість MimeMultipart
 import logging
 
-from ...core.config import settings
-from ...core.database import BaseRepository
-from .models import Notification
-from .schemas import NotificationCreate, NotificationUpdate, NotificationType
+from src.core.redis import get_redis
+from src.modules.auth.models import User
+from src.core.exceptions import DatabaseException
+from src.core.pagination import encode_cursor, decode_cursor
+from .models import Notification, ScheduledNotification
+from .schemas import NotificationUpdate, NotificationPreferences
+from .enums import NotificationType, NotificationPriority, NotificationStatus
+from .counters import adjust_unread, count_created, get_unread_count
+from .push import publish_notifications
+from .mailer import OutgoingEmail, enqueue_emails
+from .scheduled import as_utc, schedule_notification, cancel_scheduled
 
 logger = logging.getLogger(__name__)
 
 class NotificationService:
     """Сервіс для роботи з повідомленнями"""
-    
-    def __init__(self, repository: BaseRepository):
-        self.repository = repository
-    
-    def create_notification(
-        self, 
-        db: Session, 
-        user_id: str, 
-        title: str, 
-        message: str, 
-        notification_type: NotificationType,
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_notification(
+        self,
+        user_id: UUID,
+        title: str,
+        message: str,
+        notification_type: NotificationType = NotificationType.IN_APP,
+        priority: NotificationPriority = NotificationPriority.NORMAL,
         related_entity_type: Optional[str] = None,
-        related_entity_id: Optional[str] = None
-    ) -> Notification:
-        """Створення повідомлення"""
+        related_entity_id: Optional[UUID] = None,
+        scheduled_for: Optional[datetime] = None
+    ) -> Union[Notification, ScheduledNotification]:
+        """Створення повідомлення; з майбутнім scheduled_for — постановка в чергу відкладених"""
+        if scheduled_for and as_utc(scheduled_for) > datetime.utcnow():
+            return await schedule_notification(
+                self.db,
+                user_id=user_id,
+                title=title,
+                message=message,
+                type=notification_type,
+                priority=priority,
+                related_entity_type=related_entity_type,
+                related_entity_id=related_entity_id,
+                scheduled_for=scheduled_for
+            )
         try:
-            notification_data = NotificationCreate(
+            db_notification = Notification(
                 user_id=user_id,
                 title=title,
                 message=message,
                 type=notification_type,
+                priority=priority,
                 related_entity_type=related_entity_type,
                 related_entity_id=related_entity_id,
+                scheduled_for=scheduled_for,
                 is_read=False
             )
-            
-            db_notification = self.repository.create(db, notification_data)
-            logger.info(f"Notification created for user {user_id}: {title}")
+            self.db.add(db_notification)
+            await self.db.commit()
+            await self.db.refresh(db_notification)
+            await count_created([user_id])
+            await publish_notifications([db_notification])
             return db_notification
-        except Exception as e:
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             logger.error(f"Error creating notification for user {user_id}: {e}")
-            raise
-    
-    def send_email_notification(
-        self, 
-        to_email: str, 
-        subject: str, 
+            raise DatabaseException("Failed to create notification")
+
+    async def cancel_scheduled_notification(self, scheduled_id: UUID, user_id: UUID) -> bool:
+        """Скасування відкладеного повідомлення, якщо його ще не видано"""
+        return await cancel_scheduled(self.db, scheduled_id, user_id)
+
+    async def send_email_notification(
+        self,
+        to_email: str,
+        subject: str,
         body: str,
         from_email: Optional[str] = None
     ) -> bool:
-        """Відправка email повідомлення"""
+        """Постановка email у чергу доставки воркера (без блокування event loop)"""
         try:
-            message = MIMEMultipart()  # Виправлено: MIMEMultipart замість MimeMultipart
-            message["From"] = from_email or settings.EMAIL_FROM
-            message["To"] = to_email
-            message["Subject"] = subject
-            
-            message.attach(MIMEText(body, "html"))  # Виправлено: MIMEText замість MimeText
-            
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(message)
-            
-            logger.info(f"Email notification sent to {to_email}: {subject}")
+            await enqueue_emails(get_redis(), [
+                OutgoingEmail(to_email=to_email, subject=subject, html=body, from_email=from_email)
+            ])
             return True
         except Exception as e:
-            logger.error(f"Error sending email to {to_email}: {e}")
+            logger.error(f"Error queueing email to {to_email}: {e}")
             return False
-    
-    def get_user_notifications(
-        self, 
-        db: Session, 
-        user_id: str, 
+
+    async def get_user_notifications(
+        self,
+        user_id: UUID,
         unread_only: bool = False,
+        cursor: Optional[str] = None,
         limit: int = 50
-    ) -> List[Notification]:
-        """Отримання повідомлень користувача"""
+    ) -> Dict[str, Any]:
+        """Сторінка повідомлень користувача (нові спочатку) за keyset-курсором"""
+        query = select(Notification).where(Notification.user_id == user_id)
+        if unread_only:
+            # Збігається з предикатом часткового індексу ix_notifications_user_unread
+            query = query.where(Notification.is_read.is_(False))
+        if cursor:
+            created_at, notification_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Notification.created_at, Notification.id) < tuple_(created_at, notification_id)
+            )
         try:
-            filters = {"user_id": user_id}
-            if unread_only:
-                filters["is_read"] = False
-            
-            notifications = self.repository.get_multi(
-                db, 
-                filters=filters, 
-                limit=limit
+            result = await self.db.execute(
+                query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
             )
-            
-            logger.info(f"Retrieved {len(notifications)} notifications for user {user_id}")
-            return notifications
-        except Exception as e:
+            items = result.scalars().all()
+        except SQLAlchemyError as e:
             logger.error(f"Error retrieving notifications for user {user_id}: {e}")
-            raise
-    
-    def get_notification_by_id(
-        self, 
-        db: Session, 
-        notification_id: str
+            raise DatabaseException("Failed to fetch notifications")
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def get_notification_by_id(
+        self,
+        notification_id: UUID,
+        user_id: UUID
     ) -> Optional[Notification]:
         """Отримання повідомлення за ID"""
         try:
-            result = db.execute(
-                select(Notification).where(Notification.id == notification_id)
+            result = await self.db.execute(
+                select(Notification).where(
+                    and_(Notification.id == notification_id, Notification.user_id == user_id)
+                )
             )
-            notification = result.scalar_one_or_none()
-            
-            if notification:
-                logger.info(f"Retrieved notification {notification_id}")
-            else:
-                logger.warning(f"Notification {notification_id} not found")
-            
-            return notification
-        except Exception as e:
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
             logger.error(f"Error retrieving notification {notification_id}: {e}")
-            raise
-    
-    def update_notification(
-        self, 
-        db: Session, 
-        notification_id: str, 
+            raise DatabaseException("Failed to fetch notification")
+
+    async def update_notification(
+        self,
+        notification_id: UUID,
+        user_id: UUID,
         notification_update: NotificationUpdate
     ) -> Optional[Notification]:
         """Оновлення повідомлення"""
         try:
-            db_notification = self.get_notification_by_id(db, notification_id)
+            db_notification = await self.get_notification_by_id(notification_id, user_id)
             if not db_notification:
                 return None
-            
+
+            was_read = bool(db_notification.is_read)
             update_data = notification_update.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_notification, field, value)
-            
-            db.add(db_notification)
-            db.commit()
-            db.refresh(db_notification)
-            
-            logger.info(f"Notification {notification_id} updated")
+
+            await self.db.commit()
+            await self.db.refresh(db_notification)
+            if bool(db_notification.is_read) != was_read:
+                await adjust_unread({user_id: 1 if was_read else -1})
             return db_notification
-        except Exception as e:
-            db.rollback()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             logger.error(f"Error updating notification {notification_id}: {e}")
-            raise
-    
-    def delete_notification(
-        self, 
-        db: Session, 
-        notification_id: str
+            raise DatabaseException("Failed to update notification")
+
+    async def delete_notification(
+        self,
+        notification_id: UUID,
+        user_id: UUID
     ) -> bool:
         """Видалення повідомлення"""
         try:
-            db_notification = self.get_notification_by_id(db, notification_id)
-            if not db_notification:
-                return False
-            
-            db.delete(db_notification)
-            db.commit()
-            
-            logger.info(f"Notification {notification_id} deleted")
-            return True
-        except Exception as e:
-            db.rollback()
+            result = await self.db.execute(
+                delete(Notification)
+                .where(and_(Notification.id == notification_id, Notification.user_id == user_id))
+                .returning(Notification.is_read)
+            )
+            deleted = result.all()
+            await self.db.commit()
+            if deleted and deleted[0].is_read is False:
+                await adjust_unread({user_id: -1})
+            return bool(deleted)
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             logger.error(f"Error deleting notification {notification_id}: {e}")
-            raise
-    
-    def mark_notification_as_read(
-        self, 
-        db: Session, 
-        notification_id: str
-    ) -> Optional[Notification]:
-        """Позначити повідомлення як прочитане"""
-        try:
-            db_notification = self.get_notification_by_id(db, notification_id)
-            if not db_notification:
-                return None
-            
-            db_notification.is_read = True
-            db_notification.read_at = datetime.utcnow()
-            
-            db.add(db_notification)
-            db.commit()
-            db.refresh(db_notification)
-            
-            logger.info(f"Notification {notification_id} marked as read")
-            return db_notification
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error marking notification {notification_id} as read: {e}")
-            raise
-    
-    def mark_all_notifications_as_read(
-        self, 
-        db: Session, 
-        user_id: str
-    ) -> int:
-        """Позначити всі повідомлення користувача як прочитані"""
+            raise DatabaseException("Failed to delete notification")
+
+    async def _mark_read(self, user_id: UUID, *conditions) -> List[UUID]:
+        """Один UPDATE ... RETURNING по непрочитаних повідомленнях користувача"""
+        now = datetime.utcnow()
         try:
-            result = db.execute(
-                select(Notification)
+            result = await self.db.execute(
+                update(Notification)
                 .where(
-                    and_(
-                        Notification.user_id == user_id,
-                        Notification.is_read == False
-                    )
+                    Notification.user_id == user_id,
+                    Notification.is_read.is_(False),
+                    *conditions
                 )
+                .values(is_read=True, read_at=now, status=NotificationStatus.READ, updated_at=now)
+                .returning(Notification.id)
+                .execution_options(synchronize_session=False)
             )
-            notifications = result.scalars().all()
-            
-            count = 0
-            for notification in notifications:
-                notification.is_read = True
-                notification.read_at = datetime.utcnow()
-                db.add(notification)
-                count += 1
-            
-            db.commit()
-            
-            logger.info(f"Marked {count} notifications as read for user {user_id}")
-            return count
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error marking all notifications as read for user {user_id}: {e}")
-            raise
-    
-    def get_unread_notification_count(
-        self, 
-        db: Session, 
-        user_id: str
-    ) -> int:
-        """Отримати кількість непрочитаних повідомлень користувача"""
+            ids = list(result.scalars().all())
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error marking notifications as read for user {user_id}: {e}")
+            raise DatabaseException("Failed to mark notifications as read")
+        # RETURNING містить лише рядки, що справді змінили стан — декремент точний
+        await adjust_unread({user_id: -len(ids)})
+        return ids
+
+    async def mark_notification_as_read(
+        self,
+        notification_id: UUID,
+        user_id: UUID
+    ) -> Optional[Notification]:
+        """Позначити повідомлення як прочитане"""
+        await self._mark_read(user_id, Notification.id == notification_id)
+        return await self.get_notification_by_id(notification_id, user_id)
+
+    async def mark_notifications_as_read(self, user_id: UUID, notification_ids: List[UUID]) -> List[UUID]:
+        """Позначити вибрані повідомлення як прочитані; повертає фактично змінені"""
+        if not notification_ids:
+            return []
+        return await self._mark_read(user_id, Notification.id.in_(notification_ids))
+
+    async def mark_all_notifications_as_read(self, user_id: UUID) -> int:
+        """Позначити всі повідомлення користувача як прочитані"""
+        ids = await self._mark_read(user_id)
+        logger.info(f"Marked {len(ids)} notifications as read for user {user_id}")
+        return len(ids)
+
+    async def get_preferences(self, user_id: UUID) -> Optional[Dict[str, Any]]:
         try:
-            result = db.execute(
-                select(func.count(Notification.id))
-                .where(
-                    and_(
-                        Notification.user_id == user_id,
-                        Notification.is_read == False
-                    )
-                )
+            result = await self.db.execute(select(User.notification_digest).where(User.id == user_id))
+            digest = result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching notification preferences: {e}")
+            raise DatabaseException("Failed to fetch notification preferences")
+        return {"digest": digest} if digest is not None else None
+
+    async def update_preferences(self, user_id: UUID, preferences: NotificationPreferences) -> Optional[Dict[str, Any]]:
+        try:
+            result = await self.db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(notification_digest=preferences.digest.value)
+                .returning(User.notification_digest)
             )
-            count = result.scalar() or 0
-            
-            logger.info(f"User {user_id} has {count} unread notifications")
-            return count
-        except Exception as e:
-            logger.error(f"Error getting unread notification count for user {user_id}: {e}")
-            raise
\ No newline at end of file
+            digest = result.scalar_one_or_none()
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error updating notification preferences: {e}")
+            raise DatabaseException("Failed to update notification preferences")
+        return {"digest": digest} if digest is not None else None
+
+    async def get_unread_notification_count(self, user_id: UUID) -> int:
+        """Кількість непрочитаних з лічильника Redis (без звернення до БД)"""
+        return await get_unread_count(user_id)
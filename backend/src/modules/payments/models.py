@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Numeric, Boolean, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Numeric, Boolean, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -22,11 +22,20 @@ class PaymentMethod(enum.Enum):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Рядок виписки імпортується один раз, навіть при паралельних імпортах
+        Index(
+            "ix_payments_bank_reference",
+            "bank_reference",
+            unique=True,
+            postgresql_where=text("bank_reference IS NOT NULL")
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
     # Відносини
-    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id"), nullable=False)
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id"), nullable=False, index=True)
     client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False)
     processed_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     
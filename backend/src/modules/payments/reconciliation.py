@@ -0,0 +1,138 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+import re
+
+# Кандидати на номер рахунку / референс у призначенні платежу
+_TOKEN_RE = re.compile(r"[A-Za-zА-Яа-яІіЇїЄєҐґ0-9][A-Za-zА-Яа-яІіЇїЄєҐґ0-9\-/.]*")
+# Номер у призначенні часто розбитий пробілами: "INV 2024 001"
+_MAX_JOINED_TOKENS = 3
+# Короткі фрагменти ("5", "2024") трапляються в датах і сумах призначення платежу
+_MIN_TOKEN_LENGTH = 4
+_MIN_NUMERIC_TOKEN_LENGTH = 6
+_NON_ALNUM_RE = re.compile(r"[^0-9A-ZА-ЯІЇЄҐ]")
+
+def normalize_reference(value: Optional[str]) -> str:
+    """Верхній регістр без розділювачів: "inv-2024/001" -> "INV2024001\""""
+    if not value:
+        return ""
+    return _NON_ALNUM_RE.sub("", value.upper())
+
+def is_reference_candidate(value: str) -> bool:
+    if len(value) < _MIN_TOKEN_LENGTH:
+        return False
+    return not value.isdigit() or len(value) >= _MIN_NUMERIC_TOKEN_LENGTH
+
+def normalize_amount(value) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"))
+
+@dataclass
+class OpenInvoice:
+    id: UUID
+    client_id: UUID
+    invoice_number: str
+    payment_reference: Optional[str]
+    tax_id: Optional[str]
+    balance_due: Decimal
+
+@dataclass
+class StatementMatch:
+    line_no: int
+    invoice: OpenInvoice
+    amount: Decimal
+    matched_by: str  # invoice_number, payment_reference, tax_id_amount
+
+@dataclass
+class ReconciliationOutcome:
+    matches: List[StatementMatch] = field(default_factory=list)
+    unmatched: List[int] = field(default_factory=list)
+    ambiguous: List[int] = field(default_factory=list)
+
+class ReconciliationIndex:
+    """Хеш-індекси відкритих рахунків для зіставлення виписки за один прохід.
+
+    Побудова O(n) за кількістю рахунків, зіставлення O(1) на рядок виписки
+    (плюс кількість токенів у призначенні платежу).
+    """
+
+    def __init__(self, invoices: Iterable[OpenInvoice]):
+        self.by_number: Dict[str, OpenInvoice] = {}
+        self.by_reference: Dict[str, OpenInvoice] = {}
+        self.by_tax_amount: Dict[Tuple[str, Decimal], List[OpenInvoice]] = defaultdict(list)
+        # Залишок по рахунку з урахуванням уже зіставлених рядків цієї виписки
+        self.remaining: Dict[UUID, Decimal] = {}
+
+        for invoice in invoices:
+            self.remaining[invoice.id] = normalize_amount(invoice.balance_due)
+            number = normalize_reference(invoice.invoice_number)
+            if number:
+                self.by_number[number] = invoice
+            reference = normalize_reference(invoice.payment_reference)
+            if reference:
+                self.by_reference[reference] = invoice
+            tax_id = normalize_reference(invoice.tax_id)
+            if tax_id:
+                self.by_tax_amount[(tax_id, normalize_amount(invoice.balance_due))].append(invoice)
+
+    def _lookup(self, reference: Optional[str], index: Dict[str, OpenInvoice]) -> Tuple[Optional[OpenInvoice], bool]:
+        """Повертає (рахунок, неоднозначність).
+
+        Спершу найдовші склеєні послідовності токенів; кілька різних рахунків
+        на одному рівні — неоднозначність, рядок лишається незіставленим.
+        """
+        if not reference:
+            return None, False
+        whole = normalize_reference(reference)
+        if whole in index:
+            return index[whole], False
+        tokens = [normalize_reference(token) for token in _TOKEN_RE.findall(reference)]
+        for size in range(min(_MAX_JOINED_TOKENS, len(tokens)), 0, -1):
+            found: Dict[UUID, OpenInvoice] = {}
+            for start in range(len(tokens) - size + 1):
+                joined = "".join(tokens[start:start + size])
+                if not is_reference_candidate(joined):
+                    continue
+                candidate = index.get(joined)
+                if candidate is not None:
+                    found[candidate.id] = candidate
+            if len(found) == 1:
+                return next(iter(found.values())), False
+            if len(found) > 1:
+                return None, True
+        return None, False
+
+    def match_line(self, reference: Optional[str], tax_id: Optional[str], amount: Decimal) -> Tuple[Optional[OpenInvoice], Optional[str], bool]:
+        """Повертає (рахунок, спосіб зіставлення, неоднозначність)"""
+        for index, matched_by in ((self.by_number, "invoice_number"), (self.by_reference, "payment_reference")):
+            invoice, ambiguous = self._lookup(reference, index)
+            if invoice is not None:
+                return invoice, matched_by, False
+            if ambiguous:
+                return None, None, True
+
+        normalized_tax_id = normalize_reference(tax_id)
+        if normalized_tax_id:
+            candidates = [
+                inv for inv in self.by_tax_amount.get((normalized_tax_id, amount), [])
+                if self.remaining[inv.id] > 0
+            ]
+            if len(candidates) == 1:
+                return candidates[0], "tax_id_amount", False
+            if len(candidates) > 1:
+                return None, None, True
+        return None, None, False
+
+    def reconcile(self, lines: Iterable[Tuple[int, Optional[str], Optional[str], Decimal]]) -> ReconciliationOutcome:
+        """Зіставлення всієї виписки: рядки (line_no, reference, tax_id, amount)"""
+        outcome = ReconciliationOutcome()
+        for line_no, reference, tax_id, amount in lines:
+            amount = normalize_amount(amount)
+            invoice, matched_by, ambiguous = self.match_line(reference, tax_id, amount)
+            if invoice is None:
+                (outcome.ambiguous if ambiguous else outcome.unmatched).append(line_no)
+                continue
+            self.remaining[invoice.id] -= amount
+            outcome.matches.append(StatementMatch(line_no, invoice, amount, matched_by))
+        return outcome
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+
+from src.core.database import get_db
+from src.core.security import get_current_user
+from . import service, schemas
+from src.modules.auth.models import User
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+@router.post("/reconcile", response_model=schemas.ReconciliationResult)
+async def reconcile_statement(
+    statement: schemas.StatementImport,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    payment_service = service.PaymentService(db)
+    return await payment_service.reconcile_statement(statement, current_user.id)
+
+@router.post("/reconcile/csv", response_model=schemas.ReconciliationResult)
+async def reconcile_statement_csv(
+    file: UploadFile = File(...),
+    currency: str = "UAH",
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Колонки: transaction_date (YYYY-MM-DD), amount, reference, payer_tax_id, bank_reference
+    content = (await file.read()).decode("utf-8-sig")
+    lines = []
+    for row_no, row in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+        try:
+            lines.append(schemas.StatementLine(
+                transaction_date=datetime.strptime(row["transaction_date"].strip(), "%Y-%m-%d").date(),
+                amount=Decimal(row["amount"].strip().replace(",", ".")),
+                reference=row.get("reference") or None,
+                payer_tax_id=row.get("payer_tax_id") or None,
+                bank_reference=row.get("bank_reference") or None
+            ))
+        except (KeyError, ValueError, InvalidOperation):
+            raise HTTPException(status_code=422, detail=f"Invalid statement row {row_no}")
+    if not lines:
+        raise HTTPException(status_code=422, detail="Statement is empty")
+    
+    payment_service = service.PaymentService(db)
+    return await payment_service.reconcile_statement(
+        schemas.StatementImport(lines=lines, currency=currency, dry_run=dry_run),
+        current_user.id
+    )
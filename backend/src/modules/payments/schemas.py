@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from decimal import Decimal
+from typing import Optional, List
+from uuid import UUID
+
+class StatementLine(BaseModel):
+    transaction_date: date
+    amount: Decimal = Field(..., gt=0)
+    reference: Optional[str] = None  # призначення платежу
+    payer_tax_id: Optional[str] = Field(None, max_length=50)
+    bank_reference: Optional[str] = Field(None, max_length=100)  # ідентифікатор транзакції в банку
+
+class StatementImport(BaseModel):
+    lines: List[StatementLine] = Field(..., min_items=1)
+    currency: str = Field("UAH", max_length=3)
+    dry_run: bool = False
+
+class StatementLineResult(BaseModel):
+    line_no: int
+    status: str  # matched, unmatched, ambiguous, duplicate
+    invoice_id: Optional[UUID] = None
+    invoice_number: Optional[str] = None
+    matched_by: Optional[str] = None
+
+class ReconciliationResult(BaseModel):
+    total_lines: int
+    matched: int
+    unmatched: int
+    ambiguous: int
+    duplicates: int
+    matched_amount: Decimal
+    payments_created: int
+    lines: List[StatementLineResult]
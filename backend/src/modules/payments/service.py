@@ -0,0 +1,203 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, case, func, literal, values, column
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import Numeric
+from collections import defaultdict
+from decimal import Decimal
+from uuid import UUID, uuid4
+from typing import Dict, List
+import logging
+from datetime import datetime
+
+from . import models, schemas
+from .reconciliation import OpenInvoice, ReconciliationIndex
+from src.core.exceptions import DatabaseException
+from src.modules.clients.models import Client
+from src.modules.invoices.models import Invoice, InvoiceStatus
+from src.modules.invoices.service import InvoiceService
+
+logger = logging.getLogger(__name__)
+
+# Ліміт параметрів Postgres (32767) — вставляємо платежі пачками
+PAYMENT_INSERT_BATCH = 2000
+
+CLOSED_INVOICE_STATUSES = [InvoiceStatus.DRAFT, InvoiceStatus.PAID, InvoiceStatus.CANCELLED]
+
+class PaymentService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def _load_open_invoices(self) -> List[OpenInvoice]:
+        result = await self.db.execute(
+            select(
+                Invoice.id,
+                Invoice.client_id,
+                Invoice.invoice_number,
+                Invoice.payment_reference,
+                Client.tax_id,
+                Invoice.balance_due
+            )
+            .join(Client, Client.id == Invoice.client_id)
+            .where(
+                Invoice.status.notin_(CLOSED_INVOICE_STATUSES),
+                Invoice.balance_due > 0
+            )
+        )
+        return [OpenInvoice(*row) for row in result.all()]
+    
+    async def _existing_bank_references(self, references: List[str]) -> set:
+        if not references:
+            return set()
+        result = await self.db.execute(
+            select(models.Payment.bank_reference)
+            .where(models.Payment.bank_reference.in_(references))
+        )
+        return set(result.scalars().all())
+    
+    async def reconcile_statement(
+        self,
+        statement: schemas.StatementImport,
+        user_id: UUID
+    ) -> Dict:
+        """Зіставлення банківської виписки з відкритими рахунками за один прохід.
+        
+        Відкриті рахунки завантажуються одним запитом у хеш-індекси, платежі
+        вставляються пачками, а суми рахунків оновлюються одним UPDATE ... FROM VALUES.
+        Рядки з уже імпортованим bank_reference пропускаються, тож повторне
+        завантаження виписки безпечне; паралельні імпорти розводить унікальний
+        індекс bank_reference (ON CONFLICT DO NOTHING).
+        """
+        try:
+            lines = list(enumerate(statement.lines, start=1))
+            seen_references = await self._existing_bank_references(
+                list({line.bank_reference for _, line in lines if line.bank_reference})
+            )
+            
+            results: Dict[int, schemas.StatementLineResult] = {}
+            to_match = []
+            for line_no, line in lines:
+                if line.bank_reference and line.bank_reference in seen_references:
+                    results[line_no] = schemas.StatementLineResult(line_no=line_no, status="duplicate")
+                    continue
+                if line.bank_reference:
+                    seen_references.add(line.bank_reference)
+                to_match.append((line_no, line.reference, line.payer_tax_id, line.amount))
+            
+            index = ReconciliationIndex(await self._load_open_invoices())
+            outcome = index.reconcile(to_match)
+            
+            for line_no in outcome.unmatched:
+                results[line_no] = schemas.StatementLineResult(line_no=line_no, status="unmatched")
+            for line_no in outcome.ambiguous:
+                results[line_no] = schemas.StatementLineResult(line_no=line_no, status="ambiguous")
+            for match in outcome.matches:
+                results[match.line_no] = schemas.StatementLineResult(
+                    line_no=match.line_no,
+                    status="matched",
+                    invoice_id=match.invoice.id,
+                    invoice_number=match.invoice.invoice_number,
+                    matched_by=match.matched_by
+                )
+            
+            matches = outcome.matches
+            if matches and not statement.dry_run:
+                matches = await self._apply_matches(statement, matches, user_id)
+                # Рядки, які паралельний імпорт уже записав
+                applied = {match.line_no for match in matches}
+                for match in outcome.matches:
+                    if match.line_no not in applied:
+                        results[match.line_no] = schemas.StatementLineResult(line_no=match.line_no, status="duplicate")
+            
+            matched_amount = sum((m.amount for m in matches), Decimal("0.00"))
+            logger.info(
+                f"Statement reconciled: {len(matches)} matched, "
+                f"{len(outcome.unmatched)} unmatched, {len(outcome.ambiguous)} ambiguous"
+            )
+            return {
+                "total_lines": len(lines),
+                "matched": len(matches),
+                "unmatched": len(outcome.unmatched),
+                "ambiguous": len(outcome.ambiguous),
+                "duplicates": len(lines) - len(to_match) + len(outcome.matches) - len(matches),
+                "matched_amount": matched_amount,
+                "payments_created": 0 if statement.dry_run else len(matches),
+                "lines": [results[line_no] for line_no, _ in lines]
+            }
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error reconciling bank statement: {e}")
+            raise DatabaseException("Failed to reconcile bank statement")
+    
+    async def _apply_matches(self, statement: schemas.StatementImport, matches, user_id: UUID) -> List:
+        """Записує платежі й суми рахунків; повертає фактично записані зіставлення"""
+        now = datetime.utcnow()
+        lines = statement.lines
+        payment_ids = [uuid4() for _ in matches]
+        payments = [
+            {
+                "id": payment_id,
+                "invoice_id": match.invoice.id,
+                "client_id": match.invoice.client_id,
+                "processed_by_id": user_id,
+                "amount": match.amount,
+                "currency": statement.currency,
+                "payment_method": models.PaymentMethod.BANK_TRANSFER,
+                "status": models.PaymentStatus.COMPLETED,
+                "reference_number": (lines[match.line_no - 1].reference or "")[:100] or None,
+                "bank_reference": lines[match.line_no - 1].bank_reference,
+                "payment_date": datetime.combine(lines[match.line_no - 1].transaction_date, datetime.min.time()),
+                "processed_date": now,
+                "is_recurring": False,
+                "receipt_sent": False,
+                "created_at": now,
+                "updated_at": now
+            }
+            for payment_id, match in zip(payment_ids, matches)
+        ]
+        inserted = set()
+        for i in range(0, len(payments), PAYMENT_INSERT_BATCH):
+            result = await self.db.execute(
+                pg_insert(models.Payment)
+                .values(payments[i:i + PAYMENT_INSERT_BATCH])
+                .on_conflict_do_nothing(
+                    index_elements=[models.Payment.bank_reference],
+                    index_where=models.Payment.bank_reference.isnot(None)
+                )
+                .returning(models.Payment.id)
+            )
+            inserted.update(result.scalars().all())
+        matches = [match for payment_id, match in zip(payment_ids, matches) if payment_id in inserted]
+        if not matches:
+            await self.db.rollback()
+            return matches
+        
+        # Сума оплат по кожному рахунку — один рядок VALUES на рахунок
+        totals: Dict[UUID, Decimal] = defaultdict(Decimal)
+        for match in matches:
+            totals[match.invoice.id] += match.amount
+        paid = values(
+            column("invoice_id", PG_UUID(as_uuid=True)),
+            column("amount", Numeric(12, 2)),
+            name="paid"
+        ).data(list(totals.items()))
+        
+        new_balance = Invoice.balance_due - paid.c.amount
+        await self.db.execute(
+            update(Invoice)
+            .where(Invoice.id == paid.c.invoice_id)
+            .values(
+                amount_paid=func.coalesce(Invoice.amount_paid, 0) + paid.c.amount,
+                balance_due=func.greatest(new_balance, 0),
+                status=case(
+                    (new_balance <= 0, literal(InvoiceStatus.PAID, Invoice.status.type)),
+                    else_=literal(InvoiceStatus.PARTIAL, Invoice.status.type)
+                ),
+                paid_date=case((new_balance <= 0, now), else_=Invoice.paid_date),
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        await InvoiceService(self.db).schedule_ar_aging_refresh()
+        return matches
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Enum
+from sqlalchemy import Column, String, Date, DateTime, ForeignKey, Text, Boolean, Enum, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -50,6 +50,7 @@ class Task(Base):
     start_date = Column(DateTime)
     completed_date = Column(DateTime)
     reminder_date = Column(DateTime)
+    is_overdue = Column(Boolean, default=False, nullable=False, server_default=text("false"))
     
     # Прогрес
     progress = Column(String(20), default="0%")  # 0%, 25%, 50%, 75%, 100%
@@ -59,7 +60,12 @@ class Task(Base):
     # Додаткові поля
     tags = Column(String(200))  # comma-separated tags
     is_recurring = Column(Boolean, default=False)
-    recurrence_pattern = Column(String(50))  # daily, weekly, monthly
+    recurrence_pattern = Column(String(255))  # daily, weekly, monthly або RRULE
+    materialized_until = Column(DateTime)  # для шаблону серії: до якого моменту створено повторення
+    
+    # Екземпляр повторюваної задачі: (серія, дата повторення) — ключ ідемпотентності
+    series_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="SET NULL"))
+    occurrence_date = Column(Date)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -68,4 +74,19 @@ class Task(Base):
     case = relationship("Case", back_populates="tasks")
     assigned_to = relationship("User", back_populates="tasks", foreign_keys=[assigned_to_id])
     created_by = relationship("User", foreign_keys=[created_by_id])
-    time_entries = relationship("TimeEntry", back_populates="task")
\ No newline at end of file
+    time_entries = relationship("TimeEntry", back_populates="task")
+
+    __table_args__ = (
+        # Колонки канбан-дошки: keyset за (created_at, id) у межах статусу
+        Index("ix_tasks_status_created", "status", "created_at", "id"),
+        Index("ix_tasks_assignee_status_created", "assigned_to_id", "status", "created_at", "id"),
+        # Лише відкриті задачі — сканер прострочених проходить діапазон due_date
+        Index(
+            "ix_tasks_open_due_date",
+            "due_date",
+            postgresql_where=text("status NOT IN ('DONE', 'CANCELLED')")
+        ),
+        UniqueConstraint("series_id", "occurrence_date", name="uq_tasks_series_occurrence"),
+        # Прохід генератора повторень по шаблонах серій
+        Index("ix_tasks_recurring_series", "id", postgresql_where=text("is_recurring")),
+    )
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""Завчасне створення екземплярів повторюваних задач.
+
+Шаблон серії — задача з ``is_recurring``; її ``due_date`` є першим повторенням.
+Генератор проходить шаблони пачками за id і створює екземпляри на горизонт
+``TASK_RECURRENCE_HORIZON_DAYS`` вперед багаторядковими INSERT. Ключ
+ідемпотентності (series_id, occurrence_date) з ``ON CONFLICT DO NOTHING``
+робить повторні запуски безкоштовними, а ``materialized_until`` шаблону —
+водяним знаком, з якого продовжується наступний прохід. Зміна правила серії
+(``reset_series``) прибирає незакриті майбутні екземпляри і генерує їх наново.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid5
+import logging
+
+from sqlalchemy import select, update, delete, and_, or_, func, cast, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models
+from src.core.config import settings
+from src.core.exceptions import DatabaseException
+from src.modules.calendar.feed import invalidate_feed
+from src.modules.calendar.recurrence import parse_rule, iter_occurrences
+from src.modules.notifications.reminders import schedule_new_task_reminders
+
+logger = logging.getLogger(__name__)
+
+# Обмеження кількості параметрів запиту PostgreSQL (32767) при ~20 колонках
+INSERT_CHUNK_SIZE = 1000
+
+def occurrence_id(series_id: UUID, start: datetime) -> UUID:
+    # Детермінований id — той самий екземпляр при повторній генерації
+    return uuid5(series_id, start.date().isoformat())
+
+def _shifted(value: Optional[datetime], anchor: datetime, start: datetime) -> Optional[datetime]:
+    return start + (value - anchor) if value is not None else None
+
+def occurrence_rows(template: models.Task, until: datetime, now: datetime) -> List[Dict[str, Any]]:
+    """Рядки екземплярів шаблону між водяним знаком і until"""
+    anchor = template.due_date or template.start_date or template.created_at
+    if anchor is None:
+        return []
+    rule = parse_rule(template.recurrence_pattern, None)
+    # Перше повторення — сам шаблон; минуле не відтворюємо
+    window_start = max(template.materialized_until or now, anchor + timedelta(microseconds=1))
+    rows = []
+    for start in iter_occurrences(anchor, rule, window_start, until):
+        rows.append({
+            "id": occurrence_id(template.id, start),
+            "series_id": template.id,
+            "occurrence_date": start.date(),
+            "title": template.title,
+            "description": template.description,
+            "case_id": template.case_id,
+            "assigned_to_id": template.assigned_to_id,
+            "created_by_id": template.created_by_id,
+            "type": template.type,
+            "priority": template.priority,
+            "status": models.TaskStatus.TODO,
+            "due_date": _shifted(template.due_date, anchor, start),
+            "start_date": _shifted(template.start_date, anchor, start),
+            "reminder_date": _shifted(template.reminder_date, anchor, start),
+            "is_overdue": False,
+            "progress": "0%",
+            "estimated_hours": template.estimated_hours,
+            "tags": template.tags,
+            "is_recurring": False,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return rows
+
+async def insert_occurrences(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Any]:
+    """INSERT ... ON CONFLICT DO NOTHING пачками; повертає створені екземпляри"""
+    created = []
+    for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            pg_insert(models.Task)
+            .values(rows[offset:offset + INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing()
+            .returning(
+                models.Task.id,
+                models.Task.assigned_to_id,
+                models.Task.status,
+                models.Task.reminder_date
+            )
+        )
+        created.extend(result.all())
+    return created
+
+async def reset_series(db: AsyncSession, template: models.Task, now: datetime) -> Tuple[List[Any], List[Any]]:
+    """Перегенерація серії після зміни правила в транзакції виклику (без коміту).
+
+    Майбутні незакриті екземпляри видаляються; виконані й скасовані лишаються
+    і через ключ (series_id, occurrence_date) не дублюються. Повертає
+    (видалені, створені) рядки з id та виконавцем.
+    """
+    task = models.Task
+    result = await db.execute(
+        delete(task)
+        .where(
+            task.series_id == template.id,
+            task.status.notin_([models.TaskStatus.DONE, models.TaskStatus.CANCELLED]),
+            func.coalesce(task.due_date, task.start_date, cast(task.occurrence_date, DateTime)) >= now
+        )
+        .returning(task.id, task.assigned_to_id)
+        .execution_options(synchronize_session=False)
+    )
+    removed = result.all()
+    template.materialized_until = None
+    if not template.is_recurring or not template.recurrence_pattern or template.status == models.TaskStatus.CANCELLED:
+        return removed, []
+
+    until = now + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS)
+    try:
+        rows = occurrence_rows(template, until, now)
+    except ValueError as e:
+        # Водяний знак лишається порожнім — генератор пропустить серію з тим самим попередженням
+        logger.warning(f"Task series {template.id} has invalid rule: {e}")
+        return removed, []
+    created = await insert_occurrences(db, rows)
+    template.materialized_until = until
+    return removed, created
+
+class RecurringTaskMaterializer:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _next_templates(self, after: Optional[UUID], until: datetime, limit: int) -> List[models.Task]:
+        task = models.Task
+        query = (
+            select(task)
+            .where(
+                and_(
+                    task.is_recurring.is_(True),
+                    task.recurrence_pattern.isnot(None),
+                    task.status != models.TaskStatus.CANCELLED,
+                    or_(task.materialized_until.is_(None), task.materialized_until < until)
+                )
+            )
+            .order_by(task.id.asc())
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(task.id > after)
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
+    async def materialize(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Один прохід по всіх серіях; кожна пачка шаблонів — окрема транзакція"""
+        now = now or datetime.utcnow()
+        until = now + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS)
+        stats = {"series": 0, "created": 0, "invalid": 0}
+        after = None
+        while True:
+            try:
+                templates = await self._next_templates(after, until, settings.TASK_RECURRENCE_BATCH_SIZE)
+                if not templates:
+                    break
+                after = templates[-1].id
+
+                rows: List[Dict[str, Any]] = []
+                for template in templates:
+                    try:
+                        rows.extend(occurrence_rows(template, until, now))
+                    except ValueError as e:
+                        stats["invalid"] += 1
+                        logger.warning(f"Skipping task series {template.id} with invalid rule: {e}")
+
+                created = await insert_occurrences(self.db, rows)
+
+                await self.db.execute(
+                    update(models.Task)
+                    .where(models.Task.id.in_([template.id for template in templates]))
+                    .values(materialized_until=until)
+                    .execution_options(synchronize_session=False)
+                )
+                await self.db.commit()
+            except SQLAlchemyError as e:
+                await self.db.rollback()
+                logger.error(f"Error materializing recurring tasks: {e}")
+                raise DatabaseException("Failed to materialize recurring tasks")
+
+            stats["series"] += len(templates)
+            stats["created"] += len(created)
+            for assignee_id in {row.assigned_to_id for row in created}:
+                await invalidate_feed(assignee_id, "tasks")
+            await schedule_new_task_reminders(created)
+        return stats
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
 from src.core.database import get_db
 from src.core.security import get_current_user
-from . import service, schemas
+from . import service, schemas, models
 from src.modules.auth.models import User
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
@@ -33,6 +33,43 @@ async def list_tasks(
     task_service = service.TaskService(db)
     return await task_service.get_all(skip, limit, status, priority, assigned_to, case_id)
 
+@router.get("/board", response_model=schemas.TaskBoard)
+async def get_task_board(
+    limit: int = Query(20, ge=1, le=100),
+    assigned_to: Optional[UUID] = None,
+    case_id: Optional[UUID] = None,
+    priority: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    task_service = service.TaskService(db)
+    return await task_service.get_board(limit, assigned_to, case_id, priority)
+
+@router.get("/board/{task_status}", response_model=schemas.TaskBoardPage)
+async def get_task_board_column(
+    task_status: schemas.TaskStatus,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    assigned_to: Optional[UUID] = None,
+    case_id: Optional[UUID] = None,
+    priority: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    task_service = service.TaskService(db)
+    return await task_service.get_board_column(
+        models.TaskStatus(task_status.value), cursor, limit, assigned_to, case_id, priority
+    )
+
+@router.patch("/bulk", response_model=schemas.TaskBulkResult)
+async def bulk_update_tasks(
+    request: schemas.TaskBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    task_service = service.TaskService(db)
+    return await task_service.bulk_update(request, current_user.id)
+
 @router.get("/{task_id}", response_model=schemas.TaskResponse)
 async def get_task(
     task_id: UUID,
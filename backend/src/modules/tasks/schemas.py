@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime, date
 from typing import Optional, List
 from uuid import UUID
@@ -39,7 +39,7 @@ class TaskBase(BaseModel):
     estimated_hours: Optional[str] = Field(None, max_length=10)
     tags: Optional[str] = Field(None, max_length=200)
     is_recurring: bool = False
-    recurrence_pattern: Optional[str] = Field(None, max_length=50)
+    recurrence_pattern: Optional[str] = Field(None, max_length=255)
 
 class TaskCreate(TaskBase):
     pass
@@ -61,6 +61,9 @@ class TaskResponse(TaskBase):
     actual_hours: Optional[str]
     completed_date: Optional[datetime]
     reminder_date: Optional[datetime]
+    is_overdue: bool = False
+    series_id: Optional[UUID] = None
+    occurrence_date: Optional[date] = None
     created_at: datetime
     updated_at: datetime
     
@@ -72,4 +75,63 @@ class TaskStats(BaseModel):
     completed_tasks: int
     overdue_tasks: int
     high_priority_tasks: int
-    tasks_by_status: dict
\ No newline at end of file
+    tasks_by_status: dict
+
+class TaskBoardColumn(BaseModel):
+    status: TaskStatus
+    total: int
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+class TaskBoard(BaseModel):
+    columns: List[TaskBoardColumn]
+
+class TaskBoardPage(BaseModel):
+    status: TaskStatus
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+class TaskBulkFilter(BaseModel):
+    assigned_to_id: Optional[UUID] = None
+    case_id: Optional[UUID] = None
+    statuses: Optional[List[TaskStatus]] = Field(None, min_length=1)
+    due_before: Optional[datetime] = None
+    due_after: Optional[datetime] = None
+
+class TaskBulkChanges(BaseModel):
+    assigned_to_id: Optional[UUID] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    due_date: Optional[datetime] = None
+    due_date_shift_days: Optional[int] = Field(None, ge=-3650, le=3650)  # перенесення відносно поточного терміну
+    progress: Optional[str] = Field(None, pattern="^(0%|25%|50%|75%|100%)$")
+
+    @model_validator(mode="after")
+    def check_changes(self):
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("No changes specified")
+        if self.due_date is not None and self.due_date_shift_days is not None:
+            raise ValueError("Use either due_date or due_date_shift_days")
+        return self
+
+class TaskBulkUpdate(BaseModel):
+    ids: Optional[List[UUID]] = Field(None, min_length=1, max_length=5000)
+    filter: Optional[TaskBulkFilter] = None
+    changes: TaskBulkChanges
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Specify either ids or filter")
+        if self.filter is not None and not any(self.filter.model_dump(exclude_none=True).values()):
+            raise ValueError("Filter must not be empty")
+        return self
+
+class TaskBulkOutcome(BaseModel):
+    id: UUID
+    outcome: str  # updated, not_found
+
+class TaskBulkResult(BaseModel):
+    updated: int
+    outcomes: List[TaskBulkOutcome]
+
@@ -1,17 +1,44 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, tuple_, update, case, null, literal, DateTime
+from sqlalchemy.orm import aliased
 from sqlalchemy.exc import SQLAlchemyError
-from uuid import UUID
+from uuid import UUID, uuid4
 from typing import Optional, List, Dict, Any
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from . import models, schemas
-from src.core.exceptions import NotFoundException, DatabaseException
+from .recurrence import reset_series
+from src.core.exceptions import NotFoundException, DatabaseException, ValidationException
+from src.core.pagination import encode_cursor, decode_cursor
+from src.core.redis import get_redis
+from src.modules.calendar.feed import invalidate_feed
+from src.modules.notifications.reminders import (
+    TASK, schedule_task_reminders, schedule_new_task_reminders, cancel_reminders
+)
+from src.modules.notifications.enums import NotificationType, NotificationPriority
+from src.modules.notifications.delivery import NotificationDelivery
 
 logger = logging.getLogger(__name__)
 
+CLOSED_STATUSES = (models.TaskStatus.DONE, models.TaskStatus.CANCELLED)
+OVERDUE_WATERMARK_KEY = "tasks:overdue:watermark"
+# Скільки назв задач показувати у зведених сповіщеннях
+TITLES_IN_MESSAGE = 5
+
+# Прогрес задачі, повернутої з DONE у роботу
+REOPENED_PROGRESS = "0%"
+
+def is_done(status) -> bool:
+    return getattr(status, "value", status) == models.TaskStatus.DONE.value
+
+def is_closed(status) -> bool:
+    return getattr(status, "value", status) in {status.value for status in CLOSED_STATUSES}
+
+def compute_overdue(task: models.Task, now: datetime) -> bool:
+    return bool(task.due_date and task.due_date < now and not is_closed(task.status))
+
 class TaskService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -55,6 +82,101 @@ class TaskService:
             logger.error(f"Error fetching tasks: {e}")
             raise DatabaseException("Failed to fetch tasks")
     
+    @staticmethod
+    def _board_filters(
+        assigned_to: Optional[UUID] = None,
+        case_id: Optional[UUID] = None,
+        priority: Optional[str] = None
+    ) -> List[Any]:
+        filters = []
+        if assigned_to:
+            filters.append(models.Task.assigned_to_id == assigned_to)
+        if case_id:
+            filters.append(models.Task.case_id == case_id)
+        if priority:
+            filters.append(models.Task.priority == priority)
+        return filters
+    
+    @staticmethod
+    def _board_order():
+        return (models.Task.created_at.desc(), models.Task.id.desc())
+    
+    async def get_board(
+        self,
+        limit: int = 20,
+        assigned_to: Optional[UUID] = None,
+        case_id: Optional[UUID] = None,
+        priority: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Перша сторінка кожної колонки дошки разом з кількістю — один віконний запит"""
+        filters = self._board_filters(assigned_to, case_id, priority)
+        ranked = (
+            select(
+                models.Task,
+                func.row_number().over(
+                    partition_by=models.Task.status,
+                    order_by=self._board_order()
+                ).label("rn"),
+                func.count().over(partition_by=models.Task.status).label("total")
+            )
+            .where(*filters)
+            .subquery()
+        )
+        task = aliased(models.Task, ranked)
+        try:
+            result = await self.db.execute(
+                select(task, ranked.c.rn, ranked.c.total)
+                .where(ranked.c.rn <= limit + 1)
+                .order_by(ranked.c.status, ranked.c.rn)
+            )
+            rows = result.all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching task board: {e}")
+            raise DatabaseException("Failed to fetch task board")
+        
+        columns = {status: {"status": status.value, "total": 0, "items": [], "next_cursor": None} for status in models.TaskStatus}
+        for item, rn, total in rows:
+            column = columns[item.status]
+            column["total"] = total
+            if rn <= limit:
+                column["items"].append(item)
+            else:
+                last = column["items"][-1]
+                column["next_cursor"] = encode_cursor(last.created_at, last.id)
+        return {"columns": list(columns.values())}
+    
+    async def get_board_column(
+        self,
+        status: models.TaskStatus,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        assigned_to: Optional[UUID] = None,
+        case_id: Optional[UUID] = None,
+        priority: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Наступна сторінка однієї колонки за keyset-курсором"""
+        query = select(models.Task).where(
+            models.Task.status == status,
+            *self._board_filters(assigned_to, case_id, priority)
+        )
+        if cursor:
+            created_at, task_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(models.Task.created_at, models.Task.id) < tuple_(created_at, task_id)
+            )
+        try:
+            result = await self.db.execute(query.order_by(*self._board_order()).limit(limit + 1))
+            items = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching task board column: {e}")
+            raise DatabaseException("Failed to fetch task board column")
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return {"status": status.value, "items": items, "next_cursor": next_cursor}
+    
     async def create(self, task_data: schemas.TaskCreate, user_id: UUID) -> models.Task:
         try:
             db_task = models.Task(
@@ -62,10 +184,14 @@ class TaskService:
                 created_by_id=user_id,
                 progress="0%"
             )
+            # Створена вже простроченою — сканер з водяним знаком її не побачить
+            db_task.is_overdue = compute_overdue(db_task, datetime.utcnow())
             
             self.db.add(db_task)
             await self.db.commit()
             await self.db.refresh(db_task)
+            await invalidate_feed(db_task.assigned_to_id, "tasks")
+            await schedule_task_reminders(db_task)
             return db_task
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -82,17 +208,39 @@ class TaskService:
             if not db_task:
                 return None
             
+            previous_assignee_id = db_task.assigned_to_id
+            was_recurring = db_task.is_recurring
+            was_done = is_done(db_task.status)
             update_data = task_data.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_task, field, value)
             
-            # Якщо статус змінено на DONE, встановити дату завершення
-            if task_data.status == "done" and db_task.status != "done":
-                db_task.completed_date = datetime.utcnow()
-                db_task.progress = "100%"
+            # Якщо статус змінено на DONE, встановити дату завершення; повернута в роботу — скинути
+            if "status" in update_data and is_done(db_task.status) != was_done:
+                if was_done:
+                    db_task.completed_date = None
+                    if "progress" not in update_data:
+                        db_task.progress = REOPENED_PROGRESS
+                else:
+                    db_task.completed_date = datetime.utcnow()
+                    db_task.progress = "100%"
+            db_task.is_overdue = compute_overdue(db_task, datetime.utcnow())
+            removed, created = [], []
+            series_changed = update_data.keys() & {"recurrence_pattern", "due_date", "is_recurring"}
+            if series_changed and (was_recurring or db_task.is_recurring):
+                # Екземпляри за старим правилом прибираються в тій самій транзакції
+                removed, created = await reset_series(self.db, db_task, datetime.utcnow())
             
             await self.db.commit()
             await self.db.refresh(db_task)
+            affected_users = {db_task.assigned_to_id, previous_assignee_id}
+            affected_users |= {row.assigned_to_id for row in removed} | {row.assigned_to_id for row in created}
+            for affected_user_id in affected_users:
+                await invalidate_feed(affected_user_id, "tasks")
+            await schedule_task_reminders(db_task)
+            for row in removed:
+                await cancel_reminders(TASK, row.id)
+            await schedule_new_task_reminders(created)
             return db_task
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -105,8 +253,11 @@ class TaskService:
             if not db_task:
                 return False
             
+            assignee_id = db_task.assigned_to_id
             await self.db.delete(db_task)
             await self.db.commit()
+            await invalidate_feed(assignee_id, "tasks")
+            await cancel_reminders(TASK, task_id)
             return True
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -115,32 +266,255 @@ class TaskService:
     
     async def get_stats(self, user_id: Optional[UUID] = None) -> Dict[str, Any]:
         try:
-            query = select(models.Task)
+            now = datetime.utcnow()
+            query = select(
+                models.Task.status,
+                func.count(),
+                func.count().filter(
+                    and_(models.Task.due_date < now, models.Task.status.notin_(CLOSED_STATUSES))
+                ),
+                func.count().filter(
+                    models.Task.priority.in_([models.TaskPriority.HIGH, models.TaskPriority.URGENT])
+                )
+            ).group_by(models.Task.status)
             if user_id:
                 query = query.where(models.Task.assigned_to_id == user_id)
             
             result = await self.db.execute(query)
-            tasks = result.scalars().all()
             
             # Статистика по статусах
-            status_counts = {}
-            for status in models.TaskStatus:
-                status_counts[status.value] = len([
-                    t for t in tasks if t.status == status.value
-                ])
+            status_counts = {status.value: 0 for status in models.TaskStatus}
+            total = overdue = high_priority = 0
+            for status, count, overdue_count, high_priority_count in result.all():
+                status_counts[status.value] = count
+                total += count
+                overdue += overdue_count
+                high_priority += high_priority_count
             
             return {
-                "total_tasks": len(tasks),
-                "completed_tasks": len([t for t in tasks if t.status == "done"]),
-                "overdue_tasks": len([
-                    t for t in tasks 
-                    if t.due_date and t.due_date < datetime.utcnow() and t.status != "done"
-                ]),
-                "high_priority_tasks": len([
-                    t for t in tasks if t.priority in ["high", "urgent"]
-                ]),
+                "total_tasks": total,
+                "completed_tasks": status_counts[models.TaskStatus.DONE.value],
+                "overdue_tasks": overdue,
+                "high_priority_tasks": high_priority,
                 "tasks_by_status": status_counts
             }
         except SQLAlchemyError as e:
             logger.error(f"Error getting task stats: {e}")
-            raise DatabaseException("Failed to get task statistics")
\ No newline at end of file
+            raise DatabaseException("Failed to get task statistics")
+    
+    def _bulk_target(self, request: schemas.TaskBulkUpdate):
+        task = models.Task
+        if request.ids is not None:
+            return task.id.in_(request.ids)
+        flt = request.filter
+        conditions = []
+        if flt.assigned_to_id:
+            conditions.append(task.assigned_to_id == flt.assigned_to_id)
+        if flt.case_id:
+            conditions.append(task.case_id == flt.case_id)
+        if flt.statuses:
+            conditions.append(task.status.in_([models.TaskStatus(status.value) for status in flt.statuses]))
+        if flt.due_before:
+            conditions.append(task.due_date < flt.due_before)
+        if flt.due_after:
+            conditions.append(task.due_date >= flt.due_after)
+        if not conditions:
+            raise ValidationException("Filter must not be empty")
+        return and_(*conditions)
+    
+    def _bulk_values(self, changes: schemas.TaskBulkChanges, now: datetime) -> Dict[str, Any]:
+        """SET-частина спільного UPDATE; залежні поля рахуються виразами по рядку"""
+        task = models.Task
+        values: Dict[str, Any] = {"updated_at": now}
+        if changes.assigned_to_id is not None:
+            values["assigned_to_id"] = changes.assigned_to_id
+        if changes.priority is not None:
+            values["priority"] = models.TaskPriority(changes.priority.value)
+        if changes.progress is not None:
+            values["progress"] = changes.progress
+        
+        new_status = None
+        if changes.status is not None:
+            new_status = values["status"] = models.TaskStatus(changes.status.value)
+            if new_status == models.TaskStatus.DONE:
+                # Як і в update(): дата завершення не перезаписується для вже закритих
+                values["completed_date"] = func.coalesce(task.completed_date, now)
+                values["progress"] = "100%"
+            else:
+                values["completed_date"] = null()
+                if changes.progress is None:
+                    # Як і в update(): задача, повернута з DONE, втрачає 100%
+                    values["progress"] = case(
+                        (task.status == models.TaskStatus.DONE, REOPENED_PROGRESS),
+                        else_=task.progress
+                    )
+        
+        due_expr = task.due_date
+        if changes.due_date is not None:
+            values["due_date"] = changes.due_date
+            due_expr = literal(changes.due_date, DateTime)
+        elif changes.due_date_shift_days:
+            values["due_date"] = due_expr = task.due_date + timedelta(days=changes.due_date_shift_days)
+        
+        if new_status is not None:
+            values["is_overdue"] = False if is_closed(new_status) else case((due_expr < now, True), else_=False)
+        else:
+            values["is_overdue"] = case(
+                (task.status.in_(CLOSED_STATUSES), False),
+                (due_expr < now, True),
+                else_=False
+            )
+        return values
+    
+    async def bulk_update(self, request: schemas.TaskBulkUpdate, user_id: UUID) -> Dict[str, Any]:
+        """Масова зміна задач одним UPDATE ... RETURNING з одним зведеним сповіщенням на виконавця"""
+        now = datetime.utcnow()
+        changes = request.changes
+        # Попередні значення беремо з того ж знімка, що й UPDATE (FROM-підзапит)
+        delivery = NotificationDelivery(self.db)
+        previous = (
+            select(models.Task.id, models.Task.assigned_to_id.label("previous_assignee_id"))
+            .where(self._bulk_target(request))
+            .subquery()
+        )
+        try:
+            result = await self.db.execute(
+                update(models.Task)
+                .where(models.Task.id == previous.c.id)
+                .values(**self._bulk_values(changes, now))
+                .returning(
+                    models.Task.id,
+                    models.Task.title,
+                    models.Task.status,
+                    models.Task.reminder_date,
+                    models.Task.assigned_to_id,
+                    previous.c.previous_assignee_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            
+            by_assignee: Dict[UUID, List[Any]] = {}
+            for row in rows:
+                if row.assigned_to_id and row.assigned_to_id != user_id:
+                    by_assignee.setdefault(row.assigned_to_id, []).append(row)
+            notifications = [
+                self._bulk_notification(assignee_id, assigned_rows, changes, now)
+                for assignee_id, assigned_rows in by_assignee.items()
+            ]
+            await delivery.stage(notifications, now)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk updating tasks: {e}")
+            raise DatabaseException("Failed to update tasks")
+        await delivery.after_commit()
+        
+        affected_users = {row.assigned_to_id for row in rows} | {row.previous_assignee_id for row in rows}
+        for affected_user_id in affected_users:
+            await invalidate_feed(affected_user_id, "tasks")
+        if changes.status is not None:
+            # Нагадування залежать лише від статусу і reminder_date
+            for row in rows:
+                await schedule_task_reminders(row)
+        
+        updated_ids = {row.id for row in rows}
+        if request.ids is not None:
+            outcomes = [
+                {"id": task_id, "outcome": "updated" if task_id in updated_ids else "not_found"}
+                for task_id in dict.fromkeys(request.ids)
+            ]
+        else:
+            outcomes = [{"id": row.id, "outcome": "updated"} for row in rows]
+        return {"updated": len(rows), "outcomes": outcomes}
+    
+    @staticmethod
+    def _bulk_notification(user_id: UUID, rows: List[Any], changes: schemas.TaskBulkChanges, now: datetime) -> Dict[str, Any]:
+        reassigned = [row for row in rows if row.previous_assignee_id != row.assigned_to_id]
+        if len(reassigned) == len(rows):
+            title = f"Вам передано задач: {len(rows)}"
+        else:
+            title = f"Оновлено ваших задач: {len(rows)}"
+        lines = [f"• {row.title}" for row in rows[:TITLES_IN_MESSAGE]]
+        if len(rows) > TITLES_IN_MESSAGE:
+            lines.append(f"і ще {len(rows) - TITLES_IN_MESSAGE}")
+        return {
+            "id": uuid4(),
+            "user_id": user_id,
+            "type": NotificationType.IN_APP,
+            "title": title,
+            "message": "\n".join(lines),
+            "priority": NotificationPriority.NORMAL,
+            "related_entity_type": TASK,
+            "related_entity_id": rows[0].id if len(rows) == 1 else None,
+            "created_at": now,
+            "updated_at": now,
+        }
+    
+    async def scan_overdue(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Позначає задачі, що стали простроченими після водяного знака, одним UPDATE
+        і надсилає по одному зведеному сповіщенню кожному виконавцю"""
+        now = now or datetime.utcnow()
+        redis = get_redis()
+        watermark = None
+        try:
+            raw = await redis.get(OVERDUE_WATERMARK_KEY)
+            watermark = datetime.fromisoformat(raw) if raw else None
+        except Exception as e:
+            # Без водяного знака — повний прохід частковим індексом (is_overdue робить його ідемпотентним)
+            logger.warning(f"Overdue watermark unavailable: {e}")
+        
+        conditions = [
+            models.Task.status.notin_(CLOSED_STATUSES),
+            models.Task.due_date < now,
+            models.Task.is_overdue.is_(False)
+        ]
+        if watermark:
+            conditions.append(models.Task.due_date >= watermark)
+        delivery = NotificationDelivery(self.db)
+        
+        try:
+            result = await self.db.execute(
+                update(models.Task)
+                .where(*conditions)
+                .values(is_overdue=True)
+                .returning(models.Task.id, models.Task.assigned_to_id, models.Task.title, models.Task.due_date)
+                .execution_options(synchronize_session=False)
+            )
+            overdue = result.all()
+            
+            by_assignee: Dict[UUID, List[Any]] = {}
+            for row in sorted(overdue, key=lambda row: row.due_date):
+                by_assignee.setdefault(row.assigned_to_id, []).append(row)
+            notifications = [self._overdue_notification(user_id, rows, now) for user_id, rows in by_assignee.items()]
+            await delivery.stage(notifications, now)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error scanning overdue tasks: {e}")
+            raise DatabaseException("Failed to scan overdue tasks")
+        await delivery.after_commit()
+        
+        try:
+            await redis.set(OVERDUE_WATERMARK_KEY, now.isoformat())
+        except Exception as e:
+            logger.warning(f"Failed to store overdue watermark: {e}")
+        return {"overdue": len(overdue), "notified_users": len(by_assignee)}
+    
+    @staticmethod
+    def _overdue_notification(user_id: UUID, rows: List[Any], now: datetime) -> Dict[str, Any]:
+        titles = [f"• {row.title} (термін {row.due_date:%d.%m.%Y})" for row in rows[:TITLES_IN_MESSAGE]]
+        if len(rows) > TITLES_IN_MESSAGE:
+            titles.append(f"і ще {len(rows) - TITLES_IN_MESSAGE}")
+        return {
+            "id": uuid4(),
+            "user_id": user_id,
+            "type": NotificationType.IN_APP,
+            "title": f"Прострочені задачі: {len(rows)}",
+            "message": "\n".join(titles),
+            "priority": NotificationPriority.HIGH,
+            "related_entity_type": TASK,
+            "related_entity_id": rows[0].id if len(rows) == 1 else None,
+            "created_at": now,
+            "updated_at": now,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Numeric, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Numeric, Boolean, PrimaryKeyConstraint
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -7,8 +7,13 @@ from src.core.database import Base
 
 class TimeEntry(Base):
     __tablename__ = "time_entries"
+    # Партиціонування за місяцями start_time — ключ партиції входить у первинний ключ
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "start_time"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), default=uuid.uuid4)
     
     # Відносини
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)